@@ -0,0 +1,138 @@
+"""
+Compare the request throughput of HTTP/1.1 and HTTP/2 with the connection pool settings of the shared HTTP client.
+
+Usage: python benchmarks/http_versions.py [requests] [latency in ms] [handshake delay in ms]
+
+Runs a local stand-in server speaking HTTP/1.1 (h11) and cleartext HTTP/2 (h2), which answers every request after
+the given latency, and delays the first response of each connection by the handshake delay to stand in for the
+TCP and TLS round trips to a remote host. The provider hosts negotiate HTTP/2 with ALPN over TLS instead,
+which makes no difference for the multiplexing measured here.
+"""
+
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+import h11
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+import trio
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lyriks.http.config import HttpConfig  # noqa: E402
+
+DEFAULT_REQUESTS = 500
+DEFAULT_LATENCY = 50  # ms
+DEFAULT_HANDSHAKE_DELAY = 100  # ms
+CONCURRENCY_LEVELS = (4, 16, 64)
+BODY = b'{"result": "ok"}' * 64
+H2_PREFACE = b'PRI * HTTP/2.0'
+
+
+class StandInServer:
+    def __init__(self, latency: float, handshake_delay: float):
+        self.latency = latency
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+
+    async def handle(self, stream: trio.SocketStream):
+        self.connections += 1
+        data = await stream.receive_some()
+        await trio.sleep(self.handshake_delay)
+        if data.startswith(H2_PREFACE):
+            await self.serve_h2(stream, data)
+        else:
+            await self.serve_h11(stream, data)
+
+    async def serve_h11(self, stream: trio.SocketStream, data: bytes):
+        connection = h11.Connection(h11.SERVER)
+        connection.receive_data(data)
+        while True:
+            event = connection.next_event()
+            if event is h11.NEED_DATA:
+                data = await stream.receive_some()
+                connection.receive_data(data)
+                if not data:
+                    return
+            elif isinstance(event, h11.EndOfMessage):
+                await trio.sleep(self.latency)
+                headers = [('content-type', 'application/json'), ('content-length', str(len(BODY)))]
+                response = connection.send(h11.Response(status_code=200, headers=headers))
+                response += connection.send(h11.Data(data=BODY)) + connection.send(h11.EndOfMessage())
+                await stream.send_all(response)
+                connection.start_next_cycle()
+            elif isinstance(event, h11.ConnectionClosed):
+                return
+
+    async def serve_h2(self, stream: trio.SocketStream, data: bytes):
+        connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        connection.initiate_connection()
+        send_lock = trio.Lock()
+
+        async def flush():
+            async with send_lock:
+                await stream.send_all(connection.data_to_send())
+
+        async def respond(stream_id: int):
+            await trio.sleep(self.latency)
+            headers = [(':status', '200'), ('content-type', 'application/json'), ('content-length', str(len(BODY)))]
+            connection.send_headers(stream_id, headers)
+            connection.send_data(stream_id, BODY, end_stream=True)
+            await flush()
+
+        async with trio.open_nursery() as nursery:
+            while data:
+                for event in connection.receive_data(data):
+                    if isinstance(event, h2.events.StreamEnded):
+                        nursery.start_soon(respond, event.stream_id)
+                    elif isinstance(event, h2.events.DataReceived):
+                        connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        nursery.cancel_scope.cancel()
+                await flush()
+                data = await stream.receive_some()
+            nursery.cancel_scope.cancel()
+
+
+async def run_client(url: str, http2: bool, requests: int, concurrency: int) -> float:
+    limits = HttpConfig().limits
+    transport = httpx.AsyncHTTPTransport(http1=not http2, http2=http2, limits=limits)
+    limiter = trio.CapacityLimiter(concurrency)
+
+    async def request(client: httpx.AsyncClient):
+        async with limiter:
+            response = await client.get(url)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with trio.open_nursery() as nursery:
+            for _ in range(requests):
+                nursery.start_soon(request, client)
+    return requests / (time.perf_counter() - start)
+
+
+async def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY) / 1000
+    handshake_delay = (int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_HANDSHAKE_DELAY) / 1000
+
+    server = StandInServer(latency, handshake_delay)
+    async with trio.open_nursery() as nursery:
+        (listener,) = await nursery.start(partial(trio.serve_tcp, server.handle, 0, host='127.0.0.1'))
+        url = f'http://127.0.0.1:{listener.socket.getsockname()[1]}/'
+        print(f'{requests} requests, {latency * 1000:.0f}ms latency, {handshake_delay * 1000:.0f}ms handshake')
+        for concurrency in CONCURRENCY_LEVELS:
+            for name, http2 in (('HTTP/1.1', False), ('HTTP/2', True)):
+                server.connections = 0
+                rate = await run_client(url, http2, requests, concurrency)
+                print(f'concurrency {concurrency:>3}, {name:>8}: {rate:7.1f} req/s, {server.connections} connections')
+        nursery.cancel_scope.cancel()
+
+
+if __name__ == '__main__':
+    trio.run(main)
@@ -0,0 +1,129 @@
+"""
+Measure the memory retained per cached release: the raw API response versus the slim Release model.
+
+Usage: python benchmarks/mb_models_memory.py [release.json] [copies]
+
+Pass a release as returned by the MusicBrainz API, e.g. saved with
+curl -H 'Accept: application/json' 'https://musicbrainz.org/ws/2/release/<mbid>?inc=artist-credits+release-groups+recordings+media+url-rels'
+Without a file, a synthetic release with 12 tracks and the same structure is used.
+"""
+
+import json
+import sys
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import lyriks.cli  # noqa: E402, F401 - resolves the circular import of lyriks.mb_client
+from lyriks.mb_client import Release  # noqa: E402
+
+DEFAULT_COPIES = 1000
+
+
+def _artist_credit() -> list[dict]:
+    return [
+        {
+            'name': 'Artist',
+            'joinphrase': '',
+            'artist': {
+                'id': str(uuid.uuid4()),
+                'name': 'Artist',
+                'sort-name': 'Artist',
+                'type': 'Group',
+                'type-id': str(uuid.uuid4()),
+                'disambiguation': 'South Korean boy group',
+                'genres': [],
+            },
+        }
+    ]
+
+
+def synthetic_release(track_count: int = 12) -> dict:
+    tracks = [
+        {
+            'id': str(uuid.uuid4()),
+            'number': str(i + 1),
+            'position': i + 1,
+            'title': f'Track title {i + 1}',
+            'length': 201000 + i,
+            'artist-credit': _artist_credit(),
+            'recording': {
+                'id': str(uuid.uuid4()),
+                'title': f'Track title {i + 1}',
+                'length': 201000 + i,
+                'video': False,
+                'disambiguation': '',
+                'first-release-date': '2024-01-01',
+                'artist-credit': _artist_credit(),
+            },
+        }
+        for i in range(track_count)
+    ]
+    urls = ['https://www.genie.co.kr/detail/albumInfo?axnm=85000000', 'https://music.bugs.co.kr/album/4000000']
+    return {
+        'id': str(uuid.uuid4()),
+        'title': 'Album title',
+        'status': 'Official',
+        'status-id': str(uuid.uuid4()),
+        'date': '2024-01-01',
+        'country': 'KR',
+        'barcode': '8800000000000',
+        'disambiguation': '',
+        'packaging': 'Jewel Case',
+        'quality': 'normal',
+        'text-representation': {'language': 'kor', 'script': 'Kore'},
+        'artist-credit': _artist_credit(),
+        'release-group': {
+            'id': str(uuid.uuid4()),
+            'title': 'Album title',
+            'primary-type': 'Album',
+            'secondary-types': [],
+            'first-release-date': '2024-01-01',
+            'artist-credit': _artist_credit(),
+        },
+        'media': [{'position': 1, 'format': 'CD', 'title': '', 'track-count': track_count, 'tracks': tracks}],
+        'relations': [
+            {
+                'type': 'streaming',
+                'type-id': str(uuid.uuid4()),
+                'target-type': 'url',
+                'direction': 'forward',
+                'ended': False,
+                'begin': None,
+                'end': None,
+                'attributes': [],
+                'url': {'id': str(uuid.uuid4()), 'resource': url},
+            }
+            for url in urls
+        ],
+    }
+
+
+def measure(build) -> float:
+    """
+    :return: The memory retained per built object in bytes.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    retained = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(retained)
+
+
+def main():
+    raw = json.loads(Path(sys.argv[1]).read_text()) if len(sys.argv) > 1 else synthetic_release()
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COPIES
+    encoded = json.dumps(raw)
+
+    # Each copy is decoded separately, like responses of different releases
+    raw_size = measure(lambda: [json.loads(encoded) for _ in range(copies)])
+    slim_size = measure(lambda: [Release.from_json(json.loads(encoded)) for _ in range(copies)])
+    print(f'Raw response: {raw_size / 1024:.1f} KiB per release')
+    print(f'Release:      {slim_size / 1024:.1f} KiB per release')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Compare decoding QQ Music lyrics inline on the event loop, in a worker thread and in worker processes.
+
+Usage: python benchmarks/qqm_decode.py [lyrics] [processes]
+
+Decoding runs the same stages as qqm_api.decode_lyrics on synthetic lyrics: DES decryption of the hex-encoded
+content, zlib decompression, extraction of the lyrics from the XML and conversion from QRC to LRC.
+pyqqmusicdes has no encryption, so the DES stage decrypts random bytes of the size of the compressed lyrics,
+which costs the same as decrypting real content, while the later stages run on the compressed lyrics directly.
+
+Lyrics are decoded in batches like _decode_lyrics_batch. Besides the total time, the longest stall of the event loop
+is measured with a task that sleeps for a millisecond at a time, which shows how long other requests are blocked.
+"""
+
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+
+import pyqqmusicdes
+import trio
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import lyriks.cli  # noqa: E402, F401 - resolves the circular import of lyriks.mb_client
+from lyriks.providers.api import qqm_api  # noqa: E402
+
+DEFAULT_LYRICS = 500
+LINES = 60
+WORDS = 8
+
+Payload = tuple[str, bytes]
+
+
+def synthetic_payload(seed: int) -> Payload:
+    lines = ['[ti:Title]', '[ar:Artist]', '[al:Album]', '[by:]', '[offset:0]']
+    for line in range(LINES):
+        start = seed + line * 3000
+        words = ''.join(f'Word{word} ({start + word * 300},300)' for word in range(WORDS))
+        lines.append(f'[{start},{WORDS * 300}]{words}')
+    text = '\n'.join(lines)
+    content = f'<?xml version="1.0" encoding="utf-8"?>\n<QrcInfos>\n<Lyric_1 LyricType="1" LyricContent="{text}"/>\n'
+    compressed = zlib.compress(f'{content}</QrcInfos>'.encode('utf-8'))
+    ciphertext = os.urandom(len(compressed) + (-len(compressed) % 8))
+    return ciphertext.hex(), compressed
+
+
+def decode(payload: Payload) -> tuple[dict[str, str], list[str]] | None:
+    hex_content, compressed = payload
+    buf = bytes.fromhex(hex_content)
+    pyqqmusicdes.decrypt_des(buf, qqm_api.QQM_DES_KEY)
+    match = qqm_api.LYRIC_CONTENT_REGEX.search(zlib.decompress(compressed).decode('utf-8'))
+    if not match:
+        return None
+    return qqm_api._convert_qrc_to_lrc(match.group(1).splitlines())
+
+
+def decode_batch(payloads: list[Payload]) -> list[tuple[dict[str, str], list[str]] | None]:
+    return [decode(payload) for payload in payloads]
+
+
+async def decode_inline(batch: list[Payload]):
+    return decode_batch(batch)
+
+
+async def decode_threaded(batch: list[Payload]):
+    return await trio.to_thread.run_sync(decode_batch, batch)
+
+
+def decode_in(executor: Executor):
+    async def decode_in_executor(batch: list[Payload]):
+        future = executor.submit(decode_batch, batch)
+        return await trio.to_thread.run_sync(future.result)
+
+    return decode_in_executor
+
+
+async def measure(name: str, decode_function, payloads: list[Payload]):
+    batch_size = qqm_api.DECODE_BATCH_MAX_SIZE
+    batches = [payloads[i : i + batch_size] for i in range(0, len(payloads), batch_size)]
+    max_stall = 0.0
+
+    async def ticker():
+        nonlocal max_stall
+        while True:
+            before = time.perf_counter()
+            await trio.sleep(0.001)
+            max_stall = max(max_stall, time.perf_counter() - before - 0.001)
+
+    async def run_batch(batch: list[Payload]):
+        results = await decode_function(batch)
+        assert all(result is not None for result in results)
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(ticker)
+        await trio.sleep(0.01)
+        start = time.perf_counter()
+        async with trio.open_nursery() as batch_nursery:
+            for batch in batches:
+                batch_nursery.start_soon(run_batch, batch)
+        elapsed = time.perf_counter() - start
+        # Let the ticker record the last stall
+        await trio.sleep(0.01)
+        nursery.cancel_scope.cancel()
+
+    per_lyrics = elapsed / len(payloads) * 1e6
+    print(f'{name:>12}: {elapsed * 1000:7.1f}ms total, {per_lyrics:5.0f}µs per lyrics, {max_stall * 1000:6.1f}ms stall')
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LYRICS
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    payloads = [synthetic_payload(i) for i in range(count)]
+    print(f'{count} lyrics, {len(payloads[0][0]) // 2} encrypted bytes each, {processes} processes')
+
+    await measure('inline', decode_inline, payloads)
+    await measure('thread', decode_threaded, payloads)
+    with ProcessPoolExecutor(processes) as executor:
+        # Start the worker processes before measuring
+        executor.submit(decode_batch, payloads[:1]).result()
+        await measure('processes', decode_in(executor), payloads)
+
+
+if __name__ == '__main__':
+    trio.run(main)
@@ -0,0 +1,101 @@
+"""
+Count the filesystem calls of scanning a collection: the previous os.walk scan with a stat per sidecar file
+versus scan_collection, which derives the sidecar state from the directory listing.
+
+Usage: python benchmarks/scanner.py [path to music folder]
+
+Without a folder, a synthetic collection of 200 albums with 12 tracks each is created in a temporary directory.
+Counts are taken by wrapping os.scandir and os.stat, through which os.walk and os.path.exists are implemented.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from os import path
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lyriks.scanner import AUDIO_EXTENSIONS, scan_collection  # noqa: E402
+
+ALBUMS = 200
+TRACKS = 12
+
+
+def create_collection(root: str):
+    for album in range(ALBUMS):
+        album_dir = path.join(root, f'Artist {album % 20}', f'Album {album}')
+        os.makedirs(album_dir)
+        for track in range(TRACKS):
+            basename = f'{track + 1:02d} Track'
+            Path(album_dir, f'{basename}.flac').touch()
+            if track % 3 == 0:
+                Path(album_dir, f'{basename}.lrc').touch()
+        Path(album_dir, 'cover.jpg').touch()
+
+
+def walk_and_stat(root: str) -> int:
+    """
+    The scan before scan_collection: os.walk, and an existence check for each sidecar file of each track.
+    """
+    count = 0
+    for directory, sub_directories, files in os.walk(root, topdown=True):
+        if path.exists(path.join(directory, '.nolyrics')):
+            sub_directories.clear()
+            continue
+        for file in files:
+            if path.splitext(file)[1].lower() not in AUDIO_EXTENSIONS:
+                continue
+            basename = file.rsplit('.', 1)[0]
+            path.exists(path.join(directory, f'{basename}.nolyrics'))
+            path.exists(path.join(directory, f'{basename}.lrc'))
+            path.exists(path.join(directory, f'{basename}.txt'))
+            count += 1
+    return count
+
+
+def scan(root: str) -> int:
+    return sum(len(tracks) for tracks in scan_collection(root))
+
+
+def measure(name: str, function, root: str):
+    calls: Counter[str] = Counter()
+    scandir, stat = os.scandir, os.stat
+
+    def counting_scandir(*args, **kwargs):
+        calls['scandir'] += 1
+        return scandir(*args, **kwargs)
+
+    def counting_stat(*args, **kwargs):
+        calls['stat'] += 1
+        return stat(*args, **kwargs)
+
+    os.scandir, os.stat = counting_scandir, counting_stat
+    try:
+        start = time.perf_counter()
+        tracks = function(root)
+        elapsed = time.perf_counter() - start
+    finally:
+        os.scandir, os.stat = scandir, stat
+    print(
+        f'{name:>15}: {tracks} tracks, {calls["scandir"]} scandir, {calls["stat"]} stat calls, {elapsed * 1000:.1f}ms'
+    )
+
+
+def main():
+    if len(sys.argv) > 1:
+        root = sys.argv[1]
+        measure('walk and stat', walk_and_stat, root)
+        measure('scan_collection', scan, root)
+        return
+
+    with tempfile.TemporaryDirectory() as root:
+        create_collection(root)
+        measure('walk and stat', walk_and_stat, root)
+        measure('scan_collection', scan, root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare the fast tag reader with a full parse by mutagen.
+
+Usage: python benchmarks/tag_readers.py <path to music folder> [repetitions]
+
+Reads all FLAC, MP3 and MP4 files in the folder with both readers and prints the time per file.
+Run it twice to measure with a warm page cache, which isolates the parsing cost from disk reads.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lyriks.tags import read_tags_mutagen  # noqa: E402
+from lyriks.tags.fast_reader import UnsupportedTagFormat, read_tags_fast  # noqa: E402
+
+EXTENSIONS = ('.flac', '.mp3', '.m4a')
+
+
+def find_files(root: str) -> list[str]:
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        files.extend(os.path.join(dirpath, filename) for filename in filenames if filename.lower().endswith(EXTENSIONS))
+    return sorted(files)
+
+
+def bench(name: str, reader, files: list[str], repetitions: int):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for filepath in files:
+            try:
+                reader(filepath)
+            except UnsupportedTagFormat:
+                pass
+    elapsed = time.perf_counter() - start
+    per_file = elapsed / (len(files) * repetitions)
+    print(f'{name:>8}: {elapsed:.2f}s total, {per_file * 1e6:.0f}µs per file')
+    return per_file
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(2)
+    files = find_files(sys.argv[1])
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    if not files:
+        print('No audio files found.')
+        sys.exit(1)
+
+    unsupported = mismatches = 0
+    for filepath in files:
+        try:
+            if read_tags_fast(filepath) != read_tags_mutagen(filepath):
+                mismatches += 1
+                print(f'Mismatch: {filepath}')
+        except UnsupportedTagFormat:
+            unsupported += 1
+    print(f'{len(files)} files, {unsupported} handled by mutagen only, {mismatches} mismatches')
+
+    fast = bench('fast', read_tags_fast, files, repetitions)
+    full = bench('mutagen', read_tags_mutagen, files, repetitions)
+    print(f'Speedup: {full / fast:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,51 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import click
 import trio
 from click import Context, UsageError
+from rich.markup import escape
 
 from lyriks import mb_client
-from lyriks.const import PROGNAME, VERSION, MB_SERVER_URL_ENVVAR, MB_SERVER_REQUEST_DELAY_ENVVAR
+from lyriks.const import (
+    PROGNAME,
+    VERSION,
+    MB_BACKEND_ENVVAR,
+    MB_SERVER_URL_ENVVAR,
+    MB_SERVER_REQUEST_DELAY_ENVVAR,
+    MB_SERVER_REQUEST_BURST_ENVVAR,
+    MB_SERVER_MAX_IN_FLIGHT_ENVVAR,
+    PROVIDER_MIN_CONCURRENCY_ENVVAR,
+    PROVIDER_MAX_CONCURRENCY_ENVVAR,
+)
+from lyriks.http import DEFAULT_MAX_CONCURRENCY, DEFAULT_MIN_CONCURRENCY, HttpConfig, set_http_config
+from lyriks.http.config import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_KEEPALIVE_EXPIRY,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_READ_TIMEOUT,
+)
 from lyriks.lyrics.util import fix_synced_lyrics
-from lyriks.lyrics_fetcher import main, fetch_single_song
-from lyriks.mb_client import DEFAULT_MUSICBRAINZ_SERVER_URL
-from lyriks.providers import ProviderFactory
+from lyriks.lyrics_fetcher import (
+    DEFAULT_MB_CACHE_MAX_SIZE,
+    DEFAULT_PROVIDER_CACHE_MAX_SIZE,
+    DEFAULT_MB_WORKERS,
+    DEFAULT_PROVIDER_WORKERS,
+    main,
+    fetch_single_song,
+)
+from lyriks.mb_client import DEFAULT_CACHE_TTLS, DEFAULT_MUSICBRAINZ_SERVER_URL
+from lyriks.mb_dump import InvalidDumpError, MusicBrainzDump
+from lyriks.providers import MultiProviderFactory, ProviderFactory, SyncProviderFactory
+from lyriks.providers.api import qqm_api
+from lyriks.providers.cache import DEFAULT_CACHE_TTLS as DEFAULT_PROVIDER_CACHE_TTLS
+from lyriks.providers.multi_provider import POLICIES, POLICY_SYNCED
+from lyriks.tags import DEFAULT_TAG_READERS
+from .console import console
 from .default_group import DefaultGroup
+from .mb_backend_param_type import MB_BACKEND
 from .provider_choice import ProviderChoice
+from .ttl_param_type import TtlParamType
 from .url_param_type import URL
 
 
@@ -63,6 +97,120 @@ def cli():
     is_flag=True,
     help='skip instrumental tracks',
 )
+@click.option(
+    '--rebuild-index',
+    is_flag=True,
+    help='discard the collection index and read the tags of all files again',
+)
+@click.option(
+    '--tag-readers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_TAG_READERS,
+    show_default=True,
+    metavar='N',
+    help='maximum number of audio files to read tags from concurrently',
+)
+@click.option(
+    '--tag-reader-processes',
+    is_flag=True,
+    help='read tags in worker processes instead of threads, which can be faster for large FLAC collections',
+)
+@click.option(
+    '--qqm-decoder-processes',
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    metavar='N',
+    help=(
+        'number of worker processes for decrypting QQ Music lyrics. With 0, lyrics are decrypted in a worker thread, '
+        'which is fastest on a single core. Processes only pay off with several cores and many albums from QQ Music, '
+        'where decoding in a thread holds the GIL long enough to delay other requests'
+    ),
+)
+@click.option(
+    '--mb-workers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_MB_WORKERS,
+    show_default=True,
+    metavar='N',
+    help='number of albums to resolve on MusicBrainz concurrently',
+)
+@click.option(
+    '--provider-workers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_PROVIDER_WORKERS,
+    show_default=True,
+    metavar='N',
+    help='number of releases to fetch lyrics for from the provider concurrently',
+)
+@click.option(
+    '--provider-min-concurrency',
+    type=click.IntRange(min=1),
+    default=DEFAULT_MIN_CONCURRENCY,
+    show_default=True,
+    metavar='N',
+    envvar=PROVIDER_MIN_CONCURRENCY_ENVVAR,
+    help='lower bound for the adaptive number of concurrent requests to the provider',
+)
+@click.option(
+    '--provider-max-concurrency',
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_CONCURRENCY,
+    show_default=True,
+    metavar='N',
+    envvar=PROVIDER_MAX_CONCURRENCY_ENVVAR,
+    help=(
+        'upper bound for the adaptive number of concurrent requests to the provider. '
+        'The limit is raised while requests succeed quickly and lowered on rate limiting, server errors or timeouts.'
+    ),
+)
+@click.option(
+    '--http2/--no-http2',
+    default=True,
+    show_default=True,
+    help='use HTTP/2 for the provider APIs that support it, multiplexing concurrent requests over one connection',
+)
+@click.option(
+    '--max-connections',
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_CONNECTIONS,
+    show_default=True,
+    metavar='N',
+    help=(
+        'maximum number of connections per pool. HTTP/2 hosts have a pool of their own, '
+        'while all other hosts share one pool'
+    ),
+)
+@click.option(
+    '--keepalive-expiry',
+    type=click.FloatRange(min=0),
+    default=DEFAULT_KEEPALIVE_EXPIRY,
+    show_default=True,
+    metavar='SECONDS',
+    help='how long to keep idle connections open for reuse',
+)
+@click.option(
+    '--connect-timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_CONNECT_TIMEOUT,
+    show_default=True,
+    metavar='SECONDS',
+    help='timeout for establishing a connection',
+)
+@click.option(
+    '--read-timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_READ_TIMEOUT,
+    show_default=True,
+    metavar='SECONDS',
+    help='timeout for receiving data from or sending data to a server',
+)
+@click.option(
+    '--stats',
+    'show_stats',
+    is_flag=True,
+    help='print statistics of the processing stages after syncing, e.g. for tuning the number of workers',
+)
 @click.option(
     '-R',
     '--report',
@@ -78,11 +226,21 @@ def cli():
 @click.option(
     '-P',
     '--provider',
-    'provider_factory',
-    type=ProviderChoice(),
+    'provider_factories',
+    type=ProviderChoice(multiple=True),
     default='genie',
     show_default=True,
-    help='the lyrics provider to use',
+    help='the lyrics provider to use, or a comma-separated list of providers to query concurrently (e.g. genie,bugs)',
+)
+@click.option(
+    '--provider-policy',
+    type=click.Choice(POLICIES, case_sensitive=False),
+    default=POLICY_SYNCED,
+    show_default=True,
+    help=(
+        'how to pick lyrics when using multiple providers: synced prefers synced lyrics from any provider, '
+        'priority prefers providers earlier in the list. Ties are always decided by the order of the providers'
+    ),
 )
 @click.option(
     '--musicbrainz-server-url',
@@ -105,6 +263,78 @@ def cli():
         'Can only be set when also setting a custom MusicBrainz server URL.'
     ),
 )
+@click.option(
+    '--musicbrainz-server-request-burst',
+    'mb_server_request_burst',
+    type=click.IntRange(min=1),
+    metavar='N',
+    envvar=MB_SERVER_REQUEST_BURST_ENVVAR,
+    help=(
+        'number of requests that may be sent to the MusicBrainz API without delay after being idle [default: 1]. '
+        'Can only be set when also setting a custom MusicBrainz server URL.'
+    ),
+)
+@click.option(
+    '--musicbrainz-server-max-in-flight',
+    'mb_server_max_in_flight',
+    type=click.IntRange(min=1),
+    metavar='N',
+    envvar=MB_SERVER_MAX_IN_FLIGHT_ENVVAR,
+    help=(
+        'maximum number of concurrent requests to the MusicBrainz API [default: 1]. '
+        'Can only be set when also setting a custom MusicBrainz server URL.'
+    ),
+)
+@click.option(
+    '--musicbrainz-backend',
+    'mb_dump_path',
+    type=MB_BACKEND,
+    metavar='api|dump:PATH',
+    envvar=MB_BACKEND_ENVVAR,
+    help=(
+        'where to look up MusicBrainz data, either the MusicBrainz API or a local store at PATH '
+        'created with the import-mb-dump command. Lookups in a local store are not rate limited. [default: api]'
+    ),
+)
+@click.option(
+    '--mb-cache-ttl',
+    'mb_cache_ttls',
+    type=TtlParamType(list(DEFAULT_CACHE_TTLS)),
+    metavar='TTL',
+    help=(
+        'how long to keep MusicBrainz responses in the persistent cache, either for all entities (e.g. 12h) '
+        'or per entity (e.g. artist=1d,release=30d,release-group=1d). Supported units are s, m, h and d. '
+        'Use 0 to disable the cache. [default: artist=1d,release=7d,release-group=1d]'
+    ),
+)
+@click.option(
+    '--mb-cache-max-size',
+    type=click.IntRange(min=1),
+    default=DEFAULT_MB_CACHE_MAX_SIZE,
+    show_default=True,
+    metavar='MIB',
+    help='maximum size of the persistent MusicBrainz cache in MiB, least recently used entries are evicted first',
+)
+@click.option(
+    '--provider-cache-ttl',
+    'provider_cache_ttls',
+    type=TtlParamType(list(DEFAULT_PROVIDER_CACHE_TTLS)),
+    metavar='TTL',
+    help=(
+        'how long to keep album songs and lyrics from the provider in the persistent cache, either for all entries '
+        '(e.g. 7d) or per kind (e.g. songs=7d,lyrics=30d,no-lyrics=1d,responses=1d), where no-lyrics applies to songs '
+        'without lyrics, and responses to API responses that the provider offers no way to revalidate. '
+        'Use 0 to disable the cache. [default: songs=7d,lyrics=30d,no-lyrics=1d,responses=1d]'
+    ),
+)
+@click.option(
+    '--provider-cache-max-size',
+    type=click.IntRange(min=1),
+    default=DEFAULT_PROVIDER_CACHE_MAX_SIZE,
+    show_default=True,
+    metavar='MIB',
+    help='maximum size of the persistent provider cache in MiB, least recently used entries are evicted first',
+)
 @click.argument('collection_path', type=click.Path(exists=True, file_okay=False))
 @click.version_option(
     VERSION,
@@ -127,30 +357,93 @@ def sync(
     upgrade: bool,
     force: bool,
     skip_instrumentals: bool,
+    rebuild_index: bool,
+    tag_readers: int,
+    tag_reader_processes: bool,
+    qqm_decoder_processes: int,
+    mb_workers: int,
+    provider_workers: int,
+    provider_min_concurrency: int,
+    provider_max_concurrency: int,
+    http2: bool,
+    max_connections: int,
+    keepalive_expiry: float,
+    connect_timeout: float,
+    read_timeout: float,
+    show_stats: bool,
     report_path: str | None,
-    provider_factory: ProviderFactory,
+    provider_factories: list[ProviderFactory],
+    provider_policy: str,
     mb_server_url: str,
-    mb_server_request_delay: float,
+    mb_server_request_delay: float | None,
+    mb_server_request_burst: int | None,
+    mb_server_max_in_flight: int | None,
+    mb_dump_path: str | None,
+    mb_cache_ttls: dict[str, float] | None,
+    mb_cache_max_size: int,
+    provider_cache_ttls: dict[str, float] | None,
+    provider_cache_max_size: int,
     collection_path: str,
 ):
     """
     A command line tool that fetches lyrics from various streaming providers.
     """
     mb_client.set_server_url(mb_server_url)
-    if mb_server_request_delay is not None and not mb_client.set_rate_limit(mb_server_request_delay):
-        raise UsageError('--musicbrainz-server-request-delay is not allowed with the default MusicBrainz server.', ctx)
+    rate_limit_options = (mb_server_request_delay, mb_server_request_burst, mb_server_max_in_flight)
+    if any(option is not None for option in rate_limit_options) and not mb_client.set_rate_limit(
+        mb_server_request_delay,
+        burst=mb_server_request_burst or 1,
+        max_in_flight=mb_server_max_in_flight or 1,
+    ):
+        raise UsageError(
+            '--musicbrainz-server-request-delay, --musicbrainz-server-request-burst and '
+            '--musicbrainz-server-max-in-flight are not allowed with the default MusicBrainz server.',
+            ctx,
+        )
+    if provider_min_concurrency > provider_max_concurrency:
+        raise UsageError('--provider-min-concurrency must not be greater than --provider-max-concurrency.', ctx)
+    set_http_config(HttpConfig(http2, max_connections, keepalive_expiry, connect_timeout, read_timeout))
+    provider_factory: SyncProviderFactory
+    if len(provider_factories) == 1:
+        provider_factory = provider_factories[0]
+    else:
+        provider_factory = MultiProviderFactory(provider_factories, provider_policy)
+    if mb_dump_path is not None:
+        try:
+            mb_client.set_dump(MusicBrainzDump(mb_dump_path))
+        except InvalidDumpError as e:
+            raise UsageError(str(e), ctx)
 
-    trio.run(
-        main,
-        provider_factory,
-        check_artist,
-        dry_run,
-        upgrade,
-        force,
-        skip_instrumentals,
-        Path(report_path) if report_path else None,
-        Path(collection_path),
-    )
+    decode_executor = ProcessPoolExecutor(qqm_decoder_processes) if qqm_decoder_processes else None
+    qqm_api.set_decode_executor(decode_executor)
+
+    try:
+        trio.run(
+            main,
+            provider_factory,
+            check_artist,
+            dry_run,
+            upgrade,
+            force,
+            skip_instrumentals,
+            rebuild_index,
+            tag_readers,
+            tag_reader_processes,
+            mb_workers,
+            provider_workers,
+            provider_min_concurrency,
+            provider_max_concurrency,
+            show_stats,
+            mb_cache_ttls,
+            mb_cache_max_size * 1024 * 1024,
+            provider_cache_ttls,
+            provider_cache_max_size * 1024 * 1024,
+            Path(report_path) if report_path else None,
+            Path(collection_path),
+        )
+    finally:
+        if decode_executor is not None:
+            decode_executor.shutdown(cancel_futures=True)
 
 
 @cli.command()
@@ -184,6 +477,28 @@ def sync(
         'Can only be set when also setting a custom MusicBrainz server URL.'
     ),
 )
+@click.option(
+    '--http2/--no-http2',
+    default=True,
+    show_default=True,
+    help='use HTTP/2 for the provider APIs that support it, multiplexing concurrent requests over one connection',
+)
+@click.option(
+    '--connect-timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_CONNECT_TIMEOUT,
+    show_default=True,
+    metavar='SECONDS',
+    help='timeout for establishing a connection',
+)
+@click.option(
+    '--read-timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_READ_TIMEOUT,
+    show_default=True,
+    metavar='SECONDS',
+    help='timeout for receiving data from or sending data to a server',
+)
 @click.option(
     '-o',
     '--output',
@@ -203,6 +518,9 @@ def fetch(
     provider_factory: ProviderFactory,
     mb_server_url: str,
     mb_server_request_delay: float,
+    http2: bool,
+    connect_timeout: float,
+    read_timeout: float,
     output_path: str,
     song_id: int,
 ):
@@ -214,6 +532,7 @@ def fetch(
     mb_client.set_server_url(mb_server_url)
     if mb_server_request_delay is not None and not mb_client.set_rate_limit(mb_server_request_delay):
         raise UsageError('--musicbrainz-server-request-delay is not allowed with the default MusicBrainz server.', ctx)
+    set_http_config(HttpConfig(http2=http2, connect_timeout=connect_timeout, read_timeout=read_timeout))
 
     trio.run(fetch_single_song, provider_factory, song_id, output_path)
 
@@ -227,3 +546,24 @@ def fix(collection_path: str):
     Specifically, it replaces timestamps in the previously used format [mm:ss:xx] with [mm:ss.xx].
     """
     fix_synced_lyrics(Path(collection_path))
+
+
+@cli.command('import-mb-dump')
+@click.argument('store_path', type=click.Path(dir_okay=False))
+@click.argument('archive_paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def import_mb_dump(store_path: str, archive_paths: tuple[str, ...]):
+    """
+    Import MusicBrainz JSON data dumps into a local store.
+
+    The artist.tar.xz and release.tar.xz archives can be downloaded from
+    https://data.metabrainz.org/pub/musicbrainz/data/json-dumps/. The archives are read as a stream,
+    and can be imported again to update the store. Use the store with --musicbrainz-backend=dump:STORE_PATH.
+    """
+    with MusicBrainzDump(store_path, read_only=False) as dump:
+        for archive_path in archive_paths:
+            with console.status(f'Importing {escape(archive_path)}…') as status:
+                count = dump.import_archive(
+                    archive_path,
+                    lambda imported: status.update(f'Importing {escape(archive_path)}… ({imported} entities)'),
+                )
+            console.print(f'Imported {count} entities from {escape(archive_path)}')
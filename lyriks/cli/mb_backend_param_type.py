@@ -0,0 +1,32 @@
+from os import path
+
+from click.types import ParamType
+
+MB_BACKEND_API = 'api'
+MB_BACKEND_DUMP_PREFIX = 'dump:'
+
+
+class MusicBrainzBackendParamType(ParamType):
+    """
+    A click parameter type for the source of MusicBrainz data.
+
+    Accepts either 'api' to use the MusicBrainz API, or 'dump:PATH' to use a local store imported from the data dumps.
+    The converted value is None for the API, or the path of the store.
+    """
+
+    name = "backend"
+
+    def convert(self, value, param, ctx):
+        if value is None or value == MB_BACKEND_API:
+            return None
+
+        if not value.startswith(MB_BACKEND_DUMP_PREFIX):
+            self.fail(f'{value!r} is neither {MB_BACKEND_API!r} nor {MB_BACKEND_DUMP_PREFIX}PATH', param, ctx)
+
+        dump_path = value.removeprefix(MB_BACKEND_DUMP_PREFIX)
+        if not path.isfile(dump_path):
+            self.fail(f'MusicBrainz dump store {dump_path!r} does not exist', param, ctx)
+        return dump_path
+
+
+MB_BACKEND = MusicBrainzBackendParamType()
@@ -6,12 +6,30 @@ from lyriks.providers.registry import provider_registry
 class ProviderChoice(Choice):
     """
     A click Choice type to pick a provider from the registry.
+
+    If multiple is set, a comma-separated list of providers is accepted as well,
+    and the converted value is a list of provider classes.
     """
 
-    def __init__(self):
+    def __init__(self, multiple: bool = False):
         super().__init__(provider_registry.keys(), case_sensitive=False)
+        self.multiple = multiple
 
     def convert(self, value, param, ctx):
+        if not self.multiple:
+            return self.convert_one(value, param, ctx)
+
+        if isinstance(value, list):
+            return value
+
+        provider_classes = []
+        for name in value.split(','):
+            provider_class = self.convert_one(name.strip(), param, ctx)
+            if provider_class not in provider_classes:
+                provider_classes.append(provider_class)
+        return provider_classes
+
+    def convert_one(self, value, param, ctx):
         # Validate and normalize allowed choice strings
         value = super().convert(value, param, ctx)
 
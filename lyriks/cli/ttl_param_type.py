@@ -0,0 +1,45 @@
+import re
+
+from click.types import ParamType
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)([smhd]?)')
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+class TtlParamType(ParamType):
+    """
+    A click parameter type for time-to-live durations of several kinds of entries.
+
+    Accepts either a single duration that applies to all kinds, e.g. '12h',
+    or a comma-separated list of durations for specific kinds, e.g. 'artist=1d,release=30d'.
+    Durations are numbers with an optional unit (s, m, h or d), defaulting to seconds.
+    The converted value is a dict of kinds to durations in seconds.
+    """
+
+    name = "ttl"
+
+    def __init__(self, kinds: list[str]):
+        self.kinds = kinds
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, dict):
+            return value
+
+        if '=' not in value:
+            duration = self.parse_duration(value, param, ctx)
+            return {kind: duration for kind in self.kinds}
+
+        result = {}
+        for item in value.split(','):
+            kind, _, duration_str = item.partition('=')
+            kind = kind.strip()
+            if kind not in self.kinds:
+                self.fail(f'{kind!r} is not one of {", ".join(map(repr, self.kinds))}', param, ctx)
+            result[kind] = self.parse_duration(duration_str, param, ctx)
+        return result
+
+    def parse_duration(self, value: str, param, ctx) -> float:
+        match = DURATION_PATTERN.fullmatch(value.strip())
+        if not match:
+            self.fail(f'{value!r} is not a valid duration', param, ctx)
+        return float(match.group(1)) * DURATION_UNITS[match.group(2)]
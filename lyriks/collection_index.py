@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, fields
+from os import PathLike
+
+from .tags import TrackTags
+
+SCHEMA_VERSION = 3
+
+COMMIT_INTERVAL = 500  # pending writes
+
+LYRICS_STATUS_UNKNOWN = 'unknown'
+LYRICS_STATUS_NOT_FOUND = 'not_found'
+LYRICS_STATUS_SYNCED = 'synced'
+LYRICS_STATUS_STATIC = 'static'
+LYRICS_STATUS_ERROR = 'error'
+LYRICS_STATUS_UNMAPPED = 'unmapped'
+"""No provider has the release of the track, e.g. due to a missing URL relation, which may be added at any time"""
+
+_TAG_COLUMNS = [f.name for f in fields(TrackTags)]
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """
+    A cached entry of the collection index.
+    """
+
+    tags: TrackTags | None
+    """The tags read from the file, or None if the file has no (readable) tags"""
+    lyrics_status: str = LYRICS_STATUS_UNKNOWN
+    lyrics_providers: str | None = None
+    """The providers that were asked for lyrics in the last lookup"""
+    lyrics_checked: float | None = None
+    """The time of the last lyrics lookup, in seconds since the epoch"""
+
+    def has_settled_lyrics(self, providers: str, retry_interval: float) -> bool:
+        """
+        Check if the last lyrics lookup with the same providers found no lyrics,
+        and happened too recently to be worth retrying.
+        """
+        return (
+            self.lyrics_status == LYRICS_STATUS_NOT_FOUND
+            and self.lyrics_providers == providers
+            and self.lyrics_checked is not None
+            and time.time() - self.lyrics_checked < retry_interval
+        )
+
+
+class CollectionIndex:
+    """
+    On-disk index of the audio files in a collection, keyed by their absolute path.
+
+    Stores the size and modification time of each file together with its relevant tags,
+    so that unchanged files can be processed without parsing them again.
+    """
+
+    def __init__(self, db_path: str | PathLike[str], rebuild: bool = False):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.pending_writes = 0
+
+        (version,) = self.connection.execute('PRAGMA user_version').fetchone()
+        if rebuild or version != SCHEMA_VERSION:
+            self.connection.execute('DROP TABLE IF EXISTS tracks')
+        self.connection.execute(
+            f'''
+            CREATE TABLE IF NOT EXISTS tracks (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                has_tags INTEGER NOT NULL,
+                {', '.join(f'{column} TEXT' for column in _TAG_COLUMNS)},
+                lyrics_status TEXT NOT NULL,
+                lyrics_providers TEXT,
+                lyrics_checked REAL
+            )
+            '''
+        )
+        self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.connection.commit()
+
+    def __enter__(self) -> 'CollectionIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def lookup(self, filepath: str, stat: os.stat_result) -> IndexEntry | None:
+        """
+        Look up the entry for a file.
+
+        :return: The cached entry, or None if the file isn't indexed or has changed since it was indexed.
+        """
+        row = self.connection.execute(
+            f'SELECT size, mtime_ns, has_tags, {", ".join(_TAG_COLUMNS)}, lyrics_status, lyrics_providers, lyrics_checked '
+            'FROM tracks WHERE path = ?',
+            (filepath,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        size, mtime_ns, has_tags, *tag_values, lyrics_status, lyrics_providers, lyrics_checked = row
+        if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            return None
+
+        tags = TrackTags(*tag_values) if has_tags else None
+        return IndexEntry(
+            tags=tags,
+            lyrics_status=lyrics_status,
+            lyrics_providers=lyrics_providers,
+            lyrics_checked=lyrics_checked,
+        )
+
+    def update_tags(self, filepath: str, stat: os.stat_result, tags: TrackTags | None):
+        """
+        Store the tags of a file, resetting its lyrics status.
+        """
+        tag_values = [getattr(tags, column) for column in _TAG_COLUMNS] if tags else [None] * len(_TAG_COLUMNS)
+        self.connection.execute(
+            f'INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, {", ".join("?" * len(_TAG_COLUMNS))}, ?, NULL, NULL)',
+            (filepath, stat.st_size, stat.st_mtime_ns, tags is not None, *tag_values, LYRICS_STATUS_UNKNOWN),
+        )
+        self._on_write()
+
+    def set_lyrics_status(self, filepath: str, lyrics_status: str, providers: str):
+        """
+        Record the outcome of the last lyrics lookup for a file, and the providers that were asked.
+        """
+        self.connection.execute(
+            'UPDATE tracks SET lyrics_status = ?, lyrics_providers = ?, lyrics_checked = ? WHERE path = ?',
+            (lyrics_status, providers, time.time(), filepath),
+        )
+        self._on_write()
+
+    def _on_write(self):
+        self.pending_writes += 1
+        if self.pending_writes >= COMMIT_INTERVAL:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
@@ -2,4 +2,10 @@ PROGNAME = 'lyriks'
 VERSION = '0.6.1'
 
 MB_SERVER_URL_ENVVAR = 'LYRIKS_MB_SERVER_URL'
+MB_BACKEND_ENVVAR = 'LYRIKS_MB_BACKEND'
 MB_SERVER_REQUEST_DELAY_ENVVAR = 'LYRIKS_MB_REQUEST_DELAY'
+MB_SERVER_REQUEST_BURST_ENVVAR = 'LYRIKS_MB_REQUEST_BURST'
+MB_SERVER_MAX_IN_FLIGHT_ENVVAR = 'LYRIKS_MB_MAX_IN_FLIGHT'
+PROVIDER_MIN_CONCURRENCY_ENVVAR = 'LYRIKS_PROVIDER_MIN_CONCURRENCY'
+PROVIDER_MAX_CONCURRENCY_ENVVAR = 'LYRIKS_PROVIDER_MAX_CONCURRENCY'
+CACHE_DIR_ENVVAR = 'LYRIKS_CACHE_DIR'
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import time
+import zlib
+from os import PathLike
+from typing import Any
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # bytes
+
+EVICTION_TARGET = 0.9  # fraction of the maximum size to evict down to
+BUSY_TIMEOUT = 30.0  # seconds
+ACCESS_FLUSH_SIZE = 500  # pending access times
+
+
+class DiskCache:
+    """
+    Persistent key-value cache backed by SQLite.
+
+    Entries are grouped by namespace and stored with the time they were written, so that callers can
+    apply their own maximum age on lookup. When the total size of all values exceeds the maximum size,
+    the least recently used entries are evicted.
+
+    The database uses write-ahead logging and a busy timeout, so multiple processes can safely share it.
+    Lookups only read from the database, the access times they update are written in batches,
+    so that they don't block on the write lock of other processes.
+    """
+
+    def __init__(self, db_path: str | PathLike[str], max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            '''
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+        self.total_size = self._get_total_size()
+        self.pending_accesses: dict[tuple[str, str], float] = {}
+
+    def __enter__(self) -> 'DiskCache':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get(self, namespace: str, key: str, max_age: float | None = None) -> bytes | None:
+        """
+        Get a value from the cache.
+
+        :param max_age: The maximum age of the entry in seconds, or None to accept entries of any age.
+        :return: The value, or None if there is no entry or it is older than max_age.
+        """
+        row = self.connection.execute(
+            'SELECT value, stored_at FROM entries WHERE namespace = ? AND key = ?',
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, stored_at = row
+        now = time.time()
+        if max_age is not None and now - stored_at > max_age:
+            return None
+
+        self.pending_accesses[(namespace, key)] = now
+        if len(self.pending_accesses) >= ACCESS_FLUSH_SIZE:
+            self._flush_accesses()
+        return value
+
+    def set(self, namespace: str, key: str, value: bytes):
+        """
+        Store a value in the cache, replacing any existing entry.
+        """
+        row = self.connection.execute(
+            'SELECT size FROM entries WHERE namespace = ? AND key = ?',
+            (namespace, key),
+        ).fetchone()
+        now = time.time()
+        self.connection.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+            (namespace, key, value, len(value), now, now),
+        )
+        self.pending_accesses.pop((namespace, key), None)
+        self.total_size += len(value) - (row[0] if row else 0)
+        if self.total_size > self.max_size:
+            self._evict()
+
+    def get_json(self, namespace: str, key: str, max_age: float | None = None) -> Any | None:
+        """
+        Get a value stored with set_json.
+        """
+        value = self.get(namespace, key, max_age)
+        if value is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(value))
+        except (zlib.error, json.JSONDecodeError):
+            return None
+
+    def set_json(self, namespace: str, key: str, value: Any):
+        """
+        Store a JSON-serializable value in compressed form.
+        """
+        self.set(namespace, key, zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8')))
+
+    def _flush_accesses(self):
+        """
+        Write the access times of the entries looked up since the last flush in a single transaction.
+        """
+        if not self.pending_accesses:
+            return
+        self.connection.execute('BEGIN')
+        self.connection.executemany(
+            'UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?',
+            [(accessed_at, namespace, key) for (namespace, key), accessed_at in self.pending_accesses.items()],
+        )
+        self.connection.execute('COMMIT')
+        self.pending_accesses.clear()
+
+    def _evict(self):
+        # The least recently used entries are only known with the latest access times
+        self._flush_accesses()
+
+        # Other processes may have changed the cache in the meantime
+        self.total_size = self._get_total_size()
+        excess = self.total_size - int(self.max_size * EVICTION_TARGET)
+        if self.total_size <= self.max_size or excess <= 0:
+            return
+
+        # Delete the least recently used entries until the cache is below the eviction target
+        evicted = []
+        rows = self.connection.execute('SELECT namespace, key, size FROM entries ORDER BY accessed_at')
+        for namespace, key, size in rows:
+            evicted.append((namespace, key))
+            excess -= size
+            self.total_size -= size
+            if excess <= 0:
+                break
+
+        self.connection.execute('BEGIN')
+        self.connection.executemany('DELETE FROM entries WHERE namespace = ? AND key = ?', evicted)
+        self.connection.execute('COMMIT')
+
+    def _get_total_size(self) -> int:
+        (total_size,) = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return total_size
+
+    def close(self):
+        self._flush_accesses()
+        self.connection.close()
@@ -0,0 +1,67 @@
+from netrc import NetrcParseError
+
+import httpx
+from httpx import AsyncClient as HttpClient, NetRCAuth
+
+from .adaptive_concurrency import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MIN_CONCURRENCY,
+    AdaptiveConcurrencyLimiter,
+    AdaptiveConcurrencyTransport,
+)
+from lyriks.disk_cache import DiskCache
+from . import config
+from .cache_transport import RevalidatingCacheTransport
+from .config import HTTP2_HOSTS, HttpConfig, set_http_config
+
+
+def create_http_client(
+    concurrency_limiters: dict[str, AdaptiveConcurrencyLimiter] | None = None,
+    response_cache: DiskCache | None = None,
+    cache_domains: tuple[str, ...] = (),
+    heuristic_freshness: float = 0,
+) -> HttpClient:
+    """
+    Create the HTTP client shared by all API clients.
+
+    Requests to the hosts in HTTP2_HOSTS use HTTP/2 and a connection pool per host, see HttpConfig.
+
+    :param concurrency_limiters: Limiters for the concurrent requests to specific domains, keyed by domain.
+    :param response_cache: Cache for the responses from the cache domains, see RevalidatingCacheTransport.
+    :param cache_domains: The domains to cache responses from.
+    :param heuristic_freshness: How long to serve cached responses without validators in seconds.
+    """
+    http_config = config.http_config
+
+    def wrap(transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+        if concurrency_limiters:
+            transport = AdaptiveConcurrencyTransport(transport, concurrency_limiters)
+        # Responses served from the cache don't count towards the concurrent requests
+        if response_cache is not None and cache_domains:
+            transport = RevalidatingCacheTransport(transport, response_cache, cache_domains, heuristic_freshness)
+        return transport
+
+    return HttpClient(
+        auth=safe_netrc_auth(),
+        transport=wrap(http_config.create_transport()),
+        mounts={f'https://{host}': wrap(http_config.create_transport(http2=True)) for host in HTTP2_HOSTS},
+        timeout=http_config.timeout,
+    )
+
+
+def safe_netrc_auth() -> NetRCAuth | None:
+    try:
+        return NetRCAuth()
+    except (FileNotFoundError, NetrcParseError):
+        return None
+
+
+__all__ = [
+    'DEFAULT_MAX_CONCURRENCY',
+    'DEFAULT_MIN_CONCURRENCY',
+    'HTTP2_HOSTS',
+    'AdaptiveConcurrencyLimiter',
+    'HttpConfig',
+    'create_http_client',
+    'set_http_config',
+]
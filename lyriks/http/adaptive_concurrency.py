@@ -0,0 +1,101 @@
+import httpx
+import trio
+
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_INITIAL_CONCURRENCY = 4
+
+DEFAULT_LATENCY_THRESHOLD = 2.0  # seconds
+BACKOFF_FACTOR = 0.5
+BACKOFF_COOLDOWN = 1.0  # seconds
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of concurrent requests with an additive increase/multiplicative decrease (AIMD) strategy.
+
+    Every request that completes below the latency threshold raises the limit by 1/limit, i.e. by one
+    per window of successful requests. Failed requests (HTTP 429, 5xx or timeouts) halve the limit,
+    at most once per cooldown period, so that a burst of failures from the same overload only counts once.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = DEFAULT_MIN_CONCURRENCY,
+        max_limit: int = DEFAULT_MAX_CONCURRENCY,
+        initial_limit: int = DEFAULT_INITIAL_CONCURRENCY,
+        latency_threshold: float = DEFAULT_LATENCY_THRESHOLD,
+    ):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError(f'Invalid concurrency bounds: {min_limit}..{max_limit}')
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.limit: float = min(max(initial_limit, min_limit), max_limit)
+        self.capacity_limiter = trio.CapacityLimiter(int(self.limit))
+        self.last_backoff_time = -BACKOFF_COOLDOWN
+
+    async def __aenter__(self):
+        await self.capacity_limiter.acquire()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.capacity_limiter.release()
+
+    def on_success(self, latency: float):
+        if latency > self.latency_threshold:
+            return
+        self._set_limit(self.limit + 1 / self.limit)
+
+    def on_failure(self):
+        now = trio.current_time()
+        if now - self.last_backoff_time < BACKOFF_COOLDOWN:
+            return
+        self.last_backoff_time = now
+        self._set_limit(self.limit * BACKOFF_FACTOR)
+
+    def _set_limit(self, limit: float):
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        self.capacity_limiter.total_tokens = int(self.limit)
+
+
+class AdaptiveConcurrencyTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that limits the concurrent requests to each of a set of domains (including their subdomains)
+    with an AdaptiveConcurrencyLimiter. Requests to other hosts aren't limited.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiters: dict[str, AdaptiveConcurrencyLimiter]):
+        self.transport = transport
+        self.limiters = limiters
+
+    def get_limiter(self, host: str) -> AdaptiveConcurrencyLimiter | None:
+        for domain, limiter in self.limiters.items():
+            if host == domain or host.endswith(f'.{domain}'):
+                return limiter
+        return None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self.get_limiter(request.url.host)
+        if limiter is None:
+            return await self.transport.handle_async_request(request)
+
+        async with limiter:
+            start = trio.current_time()
+            try:
+                response = await self.transport.handle_async_request(request)
+                # Read the body while holding the slot, as the transfer is part of the load on the server
+                await response.aread()
+            except httpx.TimeoutException:
+                limiter.on_failure()
+                raise
+
+            if response.status_code == 429 or response.status_code >= 500:
+                limiter.on_failure()
+            else:
+                limiter.on_success(trio.current_time() - start)
+
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import time
+import zlib
+from typing import Callable
+
+import httpx
+
+from lyriks.disk_cache import DiskCache
+
+CACHE_NAMESPACE = 'http'
+
+# Query parameters that change with every request without affecting the response, e.g. timestamps and signatures
+IGNORED_QUERY_PARAMS = frozenset({'_', 'sign'})
+
+# Request headers that identify the user, so that responses for different credentials are cached separately
+KEY_HEADERS = ('Authorization', 'Cookie')
+
+# Headers that describe the transfer rather than the content, which is stored decoded
+_TRANSFER_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'})
+
+# Headers of a 304 Not Modified response that update the cached response
+_REVALIDATION_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Date')
+
+ResponseValidator = Callable[[httpx.Request, httpx.Response], bool]
+
+response_validators: dict[str, ResponseValidator] = {}
+
+
+def register_response_validator(domain: str, validator: ResponseValidator):
+    """
+    Register a function that checks if a response from a domain (including its subdomains) may be cached.
+    Used by APIs that report errors in the body of successful responses, which must not be served from the cache.
+    """
+    response_validators[domain] = validator
+
+
+def _match_domain(host: str, domain: str) -> bool:
+    return host == domain or host.endswith(f'.{domain}')
+
+
+def _get_cache_key(request: httpx.Request) -> str:
+    params = tuple(sorted(item for item in request.url.params.multi_items() if item[0] not in IGNORED_QUERY_PARAMS))
+    url = request.url.copy_with(query=None).copy_merge_params(params)
+    key = f'{request.method} {url}'
+    if request.content:
+        key += f' {hashlib.sha256(request.content).hexdigest()}'
+    credentials = '\n'.join(f'{name}: {request.headers[name]}' for name in KEY_HEADERS if name in request.headers)
+    if credentials:
+        key += f' {hashlib.sha256(credentials.encode("utf-8")).hexdigest()}'
+    return key
+
+
+def _parse_cache_control(headers: httpx.Headers) -> dict[str, str | None]:
+    directives: dict[str, str | None] = {}
+    for directive in headers.get('Cache-Control', '').split(','):
+        name, has_value, value = directive.partition('=')
+        if name := name.strip().lower():
+            directives[name] = value.strip().strip('"') if has_value else None
+    return directives
+
+
+def _get_vary(request: httpx.Request, response: httpx.Response) -> dict[str, str | None] | None:
+    """
+    :return: The values of the request headers the response varies by, or None if it varies by anything.
+    """
+    names = [name.strip().lower() for name in response.headers.get('Vary', '').split(',') if name.strip()]
+    if '*' in names:
+        return None
+    return {name: request.headers.get(name) for name in names}
+
+
+def _encode_entry(response: httpx.Response, vary: dict[str, str | None], stored_at: float) -> bytes:
+    headers = [(name, value) for name, value in response.headers.multi_items() if name not in _TRANSFER_HEADERS]
+    meta = json.dumps({'status': response.status_code, 'headers': headers, 'vary': vary, 'stored_at': stored_at})
+    return zlib.compress(meta.encode('utf-8') + b'\0' + response.content)
+
+
+def _decode_entry(value: bytes) -> tuple[dict, bytes] | None:
+    try:
+        encoded_meta, _, content = zlib.decompress(value).partition(b'\0')
+        meta = json.loads(encoded_meta)
+        # Entries stored before the Vary header was honoured
+        meta.setdefault('vary', {})
+        return meta, content
+    except (zlib.error, json.JSONDecodeError):
+        return None
+
+
+class RevalidatingCacheTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that caches successful responses from a set of domains (including their subdomains) on disk.
+
+    The Cache-Control header of responses is honoured: responses with no-store or private aren't stored,
+    and max-age sets how long a response is served without any request, no-cache requires revalidation.
+    Without max-age, cached responses with an ETag or Last-Modified header are revalidated with a conditional request
+    and served from the cache if the server responds with 304 Not Modified, while cached responses without validators
+    are served for a heuristic freshness period and fetched again afterward.
+    Responses are only served for requests with the same values of the headers listed in their Vary header.
+
+    Requests are keyed by method, URL, a hash of the body and of the headers in KEY_HEADERS,
+    ignoring the query parameters in IGNORED_QUERY_PARAMS.
+    Requests with a Cache-Control: no-store header are never cached, e.g. for access tokens.
+    Responses rejected by the validator registered for their domain aren't cached, see register_response_validator.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        cache: DiskCache,
+        domains: tuple[str, ...],
+        heuristic_freshness: float,
+    ):
+        self.transport = transport
+        self.cache = cache
+        self.domains = domains
+        self.heuristic_freshness = heuristic_freshness
+
+    def is_cacheable(self, request: httpx.Request) -> bool:
+        if request.method not in ('GET', 'POST') or 'no-store' in request.headers.get('Cache-Control', ''):
+            return False
+        return any(_match_domain(request.url.host, domain) for domain in self.domains)
+
+    def get_freshness(self, headers: httpx.Headers) -> float:
+        """
+        :return: How long a response with the given headers is served from the cache without any request.
+        """
+        directives = _parse_cache_control(headers)
+        if 'no-cache' in directives:
+            return 0
+        if max_age := directives.get('max-age'):
+            try:
+                return max(int(max_age), 0)
+            except ValueError:
+                return 0
+        if 'ETag' in headers or 'Last-Modified' in headers:
+            return 0
+        return self.heuristic_freshness
+
+    def is_storable(self, request: httpx.Request, response: httpx.Response) -> bool:
+        if response.status_code != 200:
+            return False
+        directives = _parse_cache_control(response.headers)
+        if 'no-store' in directives or 'private' in directives:
+            return False
+        has_validators = 'ETag' in response.headers or 'Last-Modified' in response.headers
+        if not has_validators and self.get_freshness(response.headers) <= 0:
+            return False
+        validator = next(
+            (validator for domain, validator in response_validators.items() if _match_domain(request.url.host, domain)),
+            None,
+        )
+        return validator is None or validator(request, response)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.is_cacheable(request):
+            return await self.transport.handle_async_request(request)
+
+        key = _get_cache_key(request)
+        entry = None
+        if (value := self.cache.get(CACHE_NAMESPACE, key)) is not None:
+            entry = _decode_entry(value)
+
+        # Responses that vary by request headers are only served for the same header values
+        if entry is not None and any(request.headers.get(name) != value for name, value in entry[0]['vary'].items()):
+            entry = None
+
+        if entry is not None:
+            meta, content = entry
+            headers = httpx.Headers(meta['headers'])
+            if time.time() - meta['stored_at'] < self.get_freshness(headers):
+                return httpx.Response(meta['status'], headers=headers, content=content, request=request)
+            etag = headers.get('ETag')
+            last_modified = headers.get('Last-Modified')
+            if not etag and not last_modified:
+                entry = None
+            else:
+                if etag:
+                    request.headers['If-None-Match'] = etag
+                if last_modified:
+                    request.headers['If-Modified-Since'] = last_modified
+
+        response = await self.transport.handle_async_request(request)
+
+        if entry is not None and response.status_code == 304:
+            await response.aclose()
+            meta, content = entry
+            # Validators and freshness may be updated by the 304 response
+            headers = httpx.Headers(meta['headers'])
+            for name in _REVALIDATION_HEADERS:
+                if name in response.headers:
+                    headers[name] = response.headers[name]
+            cached_response = httpx.Response(meta['status'], headers=headers, content=content, request=request)
+            if 'no-store' not in _parse_cache_control(headers):
+                self.cache.set(CACHE_NAMESPACE, key, _encode_entry(cached_response, meta['vary'], time.time()))
+            return cached_response
+
+        if response.status_code == 200:
+            await response.aread()
+            vary = _get_vary(request, response)
+            if vary is not None and self.is_storable(request, response):
+                self.cache.set(CACHE_NAMESPACE, key, _encode_entry(response, vary, time.time()))
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+
+import httpx
+
+# Provider API hosts known to support HTTP/2, where a single connection can multiplex concurrent requests
+HTTP2_HOSTS = ('apis.naver.com', 'u.y.qq.com', 'mapi.bugs.co.kr')
+
+DEFAULT_MAX_CONNECTIONS = 16  # per pool
+DEFAULT_KEEPALIVE_EXPIRY = 30.0  # seconds
+DEFAULT_CONNECT_TIMEOUT = 5.0  # seconds
+DEFAULT_READ_TIMEOUT = 20.0  # seconds
+
+
+@dataclass
+class HttpConfig:
+    """
+    Configuration of the connection pools and timeouts of the shared HTTP client.
+
+    Each HTTP/2 host has a pool of its own, while all other hosts share one pool.
+    """
+
+    http2: bool = True
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        # Waiting for a free connection isn't limited, as the number of requests is already limited per domain
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout, pool=None)
+
+    def create_transport(self, http2: bool = False) -> httpx.AsyncHTTPTransport:
+        return httpx.AsyncHTTPTransport(http2=http2 and self.http2, limits=self.limits)
+
+
+def set_http_config(config: HttpConfig):
+    """
+    Set the configuration used for all HTTP clients created afterward.
+    """
+    global http_config
+    http_config = config
+
+
+http_config = HttpConfig()
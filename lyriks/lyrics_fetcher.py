@@ -1,47 +1,74 @@
 import html
 import os
-from netrc import NetrcParseError
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
 from os import PathLike
 from os import path
 from pathlib import Path
 
-import mutagen
 import trio
-from httpx import AsyncClient as HttpClient, NetRCAuth
-from mutagen.easymp4 import EasyMP4Tags
 from rich.markup import escape
+from rich.table import Table
 from stamina import instrumentation
 
+from . import mb_client
 from .cli.console import console
+from .collection_index import (
+    CollectionIndex,
+    IndexEntry,
+    LYRICS_STATUS_ERROR,
+    LYRICS_STATUS_NOT_FOUND,
+    LYRICS_STATUS_STATIC,
+    LYRICS_STATUS_SYNCED,
+    LYRICS_STATUS_UNMAPPED,
+)
+from .disk_cache import DiskCache
+from .http import DEFAULT_MAX_CONCURRENCY, DEFAULT_MIN_CONCURRENCY, AdaptiveConcurrencyLimiter, create_http_client
 from .logging import LoggingOnRetryHook
-from .mb_client import Mbid, get_artist, get_release_by_track
-from .providers import ProviderFactory
+from .lyrics import Lyrics
+from .mb_client import Mbid, Release, get_artist, get_release, get_release_by_track
+from .pipeline import Emit, Pipeline
+from .providers import ProviderFactory, SyncProviderFactory
+from .providers import cache as provider_cache
+from .scanner import TrackFile, scan_collection
+from .tags import DEFAULT_TAG_READERS, TagReader, TrackTags
+from .util import get_cache_dir
 
-NUM_WORKERS = 4
+DEFAULT_MB_WORKERS = 1
+DEFAULT_PROVIDER_WORKERS = 4
 
-TITLE_TAG = 'title'
-ALBUM_TAG = 'album'
-TRACKNUMBER_TAG = 'tracknumber'
-ALBUMARTIST_TAG = 'albumartist'
-MB_RGID_TAG = 'musicbrainz_releasegroupid'
-MB_RTID_TAG = 'musicbrainz_releasetrackid'
-MB_AAID_TAG = 'musicbrainz_albumartistid'
+DEFAULT_MB_CACHE_MAX_SIZE = 1024  # MiB
+DEFAULT_PROVIDER_CACHE_MAX_SIZE = 1024  # MiB
+
+INDEX_FILENAME = 'index.sqlite3'
+MB_CACHE_FILENAME = 'musicbrainz.sqlite3'
+PROVIDER_CACHE_FILENAME = 'providers.sqlite3'
 
 VARIOUS_ARTISTS_MBID = '89ad4ac3-39f7-470e-963a-56509c546377'
 
 instrumentation.set_on_retry_hooks([LoggingOnRetryHook])
 
-EasyMP4Tags.RegisterFreeformKey(MB_RGID_TAG, 'MusicBrainz Release Group Id')
-EasyMP4Tags.RegisterFreeformKey(MB_RTID_TAG, 'MusicBrainz Release Track Id')
-
 
 async def main(
-    provider_factory: ProviderFactory,
+    provider_factory: SyncProviderFactory,
     check_artist: bool,
     dry_run: bool,
     upgrade: bool,
     force: bool,
     skip_instrumentals: bool,
+    rebuild_index: bool,
+    tag_readers: int,
+    tag_reader_processes: bool,
+    mb_workers: int,
+    provider_workers: int,
+    provider_min_concurrency: int,
+    provider_max_concurrency: int,
+    show_stats: bool,
+    mb_cache_ttls: dict[str, float] | None,
+    mb_cache_max_size: int,
+    provider_cache_ttls: dict[str, float] | None,
+    provider_cache_max_size: int,
     report_path: Path | None,
     collection_path: Path,
 ):
@@ -54,28 +81,30 @@ async def main(
             console.print(f'Error: directory \'{escape(str(report_path.parent))}\' does not exist', style='error')
             exit(2)
 
-    async with LyricsFetcher(provider_factory, check_artist, dry_run, upgrade, force, skip_instrumentals) as fetcher:
-        worker_semaphore = trio.Semaphore(NUM_WORKERS, max_value=NUM_WORKERS)
-
-        async def worker(parent: str, audio_file: str):
-            try:
-                await fetcher.fetch_lyrics(parent, audio_file)
-            except Exception as e:
-                console.print(f'Error: could not fetch lyrics for \'{escape(audio_file)}\': {e!r}', style='error')
-            finally:
-                worker_semaphore.release()
-
-        async with trio.open_nursery() as nursery:
-            for directory, sub_directories, files in os.walk(collection_path, topdown=True):
-                if path.exists(path.join(directory, '.nolyrics')):
-                    sub_directories.clear()
-                    continue
-
-                for file in files:
-                    extension = path.splitext(file)[1].lower()
-                    if extension in ('.flac', '.m4a', '.mp3'):
-                        await worker_semaphore.acquire()
-                        nursery.start_soon(worker, directory, file)
+    async with LyricsFetcher(
+        provider_factory,
+        check_artist,
+        dry_run,
+        upgrade,
+        force,
+        skip_instrumentals,
+        rebuild_index,
+        tag_readers,
+        tag_reader_processes,
+        mb_workers,
+        provider_workers,
+        provider_min_concurrency,
+        provider_max_concurrency,
+        mb_cache_ttls,
+        mb_cache_max_size,
+        provider_cache_ttls,
+        provider_cache_max_size,
+        report=report_path is not None,
+    ) as fetcher:
+        await fetcher.run(collection_path)
+
+        if show_stats:
+            fetcher.print_stats()
 
         if report_path:
             try:
@@ -86,38 +115,82 @@ async def main(
 
 
 async def fetch_single_song(provider_factory: ProviderFactory, song_id: int, output_path: str):
-    with console.status('Fetching lyrics…'):
-        async with HttpClient(auth=safe_netrc_auth()) as http_client:
-            provider = provider_factory(http_client)
-            song = await provider.fetch_song_by_id(song_id)
-            if song is None:
-                console.print('Song not found.', style='warning')
-                return
-            lyrics = await provider.fetch_song_lyrics(song)
-            if lyrics is None:
-                console.print('Failed to fetch lyrics.', style='error')
-                return
+    # Repeated fetches of songs from the same album are answered from cached API responses
+    response_cache = open_disk_cache(PROVIDER_CACHE_FILENAME, DEFAULT_PROVIDER_CACHE_MAX_SIZE * 1024 * 1024)
+    try:
+        with console.status('Fetching lyrics…'):
+            async with create_http_client(
+                response_cache=response_cache,
+                cache_domains=provider_factory.api_domains,
+                heuristic_freshness=provider_cache.DEFAULT_CACHE_TTLS[provider_cache.CACHE_ENTITY_RESPONSES],
+            ) as http_client:
+                provider = provider_factory(http_client)
+                song = await provider.fetch_song_by_id(song_id)
+                if song is None:
+                    console.print('Song not found.', style='warning')
+                    return
+                lyrics = await provider.fetch_song_lyrics(song)
+                if lyrics is None:
+                    console.print('Failed to fetch lyrics.', style='error')
+                    return
+    finally:
+        if response_cache:
+            response_cache.close()
 
     output_path = lyrics.write_to_file(output_path)
     console.print(f'Lyrics saved to \'{escape(output_path)}\'')
 
 
-def safe_netrc_auth() -> NetRCAuth | None:
+def open_disk_cache(filename: str, max_size: int) -> DiskCache | None:
+    try:
+        return DiskCache(get_cache_dir() / filename, max_size)
+    except (OSError, sqlite3.Error) as e:
+        console.print(f'Could not open cache \'{filename}\', continuing without it: {e!r}', style='warning')
+        return None
+
+
+def open_collection_index(rebuild: bool) -> CollectionIndex | None:
     try:
-        return NetRCAuth()
-    except (FileNotFoundError, NetrcParseError):
+        return CollectionIndex(get_cache_dir() / INDEX_FILENAME, rebuild=rebuild)
+    except (OSError, sqlite3.Error) as e:
+        console.print(f'Could not open collection index, continuing without it: {e!r}', style='warning')
         return None
 
 
+@dataclass
+class TrackJob:
+    """
+    A track for which lyrics are being fetched.
+    """
+
+    track: TrackFile
+    tags: TrackTags
+    title: str
+    album: str
+    track_mbid: Mbid
+
+
 class LyricsFetcher:
     def __init__(
         self,
-        provider_factory: ProviderFactory,
+        provider_factory: SyncProviderFactory,
         check_artist: bool = False,
         dry_run: bool = False,
         upgrade: bool = False,
         force: bool = False,
         skip_inst: bool = False,
+        rebuild_index: bool = False,
+        tag_readers: int = DEFAULT_TAG_READERS,
+        tag_reader_processes: bool = False,
+        mb_workers: int = DEFAULT_MB_WORKERS,
+        provider_workers: int = DEFAULT_PROVIDER_WORKERS,
+        provider_min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+        provider_max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        mb_cache_ttls: dict[str, float] | None = None,
+        mb_cache_max_size: int = DEFAULT_MB_CACHE_MAX_SIZE * 1024 * 1024,
+        provider_cache_ttls: dict[str, float] | None = None,
+        provider_cache_max_size: int = DEFAULT_PROVIDER_CACHE_MAX_SIZE * 1024 * 1024,
+        report: bool = False,
     ):
         self.provider_factory = provider_factory
         self.check_artist = check_artist
@@ -125,10 +198,48 @@ class LyricsFetcher:
         self.upgrade = upgrade
         self.force = force
         self.skip_inst = skip_inst
+        self.rebuild_index = rebuild_index
+        self.index: CollectionIndex | None = None
+        self.mb_cache_ttls = mb_cache_ttls
+        self.mb_cache_max_size = mb_cache_max_size
+        self.mb_cache: DiskCache | None = None
+        self.provider_cache_ttls = provider_cache_ttls
+        self.provider_cache_max_size = provider_cache_max_size
+        self.provider_cache: DiskCache | None = None
+        self.report = report
+        self.tag_reader = TagReader(tag_readers, tag_reader_processes)
+        self.provider_concurrency = {
+            domain: AdaptiveConcurrencyLimiter(provider_min_concurrency, provider_max_concurrency)
+            for domain in provider_factory.api_domains
+        }
         self.status = console.status('idle')
 
+        # Albums flow through the stages as lists of tracks, are split up by release,
+        # and finally end up as individual tracks with their lyrics
+        self.pipeline = Pipeline()
+        self.pipeline.add_stage('tags', tag_readers, self.read_album)
+        self.pipeline.add_stage('musicbrainz', mb_workers, self.resolve_album)
+        self.pipeline.add_stage('provider', provider_workers, self.fetch_release_lyrics)
+        self.pipeline.add_stage('writer', 1, self.write_track_lyrics)
+
     async def __aenter__(self) -> 'LyricsFetcher':
-        self.http_client = HttpClient(auth=safe_netrc_auth())
+        self.index = open_collection_index(self.rebuild_index)
+        # Lookups in a local dump are fast enough without the cache
+        use_mb_cache = not self.mb_cache_ttls or any(ttl > 0 for ttl in self.mb_cache_ttls.values())
+        if use_mb_cache and mb_client.dump is None:
+            self.mb_cache = open_disk_cache(MB_CACHE_FILENAME, self.mb_cache_max_size)
+        # Reports and forced runs have to see URL relations added since the last run
+        mb_client.set_cache(self.mb_cache, self.mb_cache_ttls, refresh=self.force or self.report)
+        if not self.provider_cache_ttls or any(ttl > 0 for ttl in self.provider_cache_ttls.values()):
+            self.provider_cache = open_disk_cache(PROVIDER_CACHE_FILENAME, self.provider_cache_max_size)
+        provider_cache.set_cache(self.provider_cache, self.provider_cache_ttls)
+        response_cache_ttl = provider_cache.persistent_cache_ttls[provider_cache.CACHE_ENTITY_RESPONSES]
+        self.http_client = create_http_client(
+            self.provider_concurrency,
+            response_cache=self.provider_cache if response_cache_ttl > 0 else None,
+            cache_domains=self.provider_factory.api_domains,
+            heuristic_freshness=response_cache_ttl,
+        )
         self.provider = self.provider_factory(self.http_client)
         self.status.start()
         return self
@@ -136,77 +247,234 @@ class LyricsFetcher:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         self.status.stop()
         await self.http_client.aclose()
+        self.tag_reader.close()
+        if self.index:
+            self.index.close()
+        mb_client.set_cache(None)
+        if self.mb_cache:
+            self.mb_cache.close()
+        provider_cache.set_cache(None)
+        if self.provider_cache:
+            self.provider_cache.close()
+
+    async def run(self, collection_path: Path) -> None:
+        """
+        Fetch lyrics for all tracks in the collection.
+        """
 
-    async def fetch_lyrics(self, dirname: str, filename: str) -> None:
-        filepath = path.join(dirname, filename)
-        basename = filename.rsplit('.', 1)[0]
+        async def scan(emit: Emit):
+            albums = scan_collection(collection_path)
+            # Directory listings can be slow on network filesystems, so they happen in a worker thread
+            while tracks := await trio.to_thread.run_sync(next, albums, None):
+                await emit(tracks)
 
-        # Skip instrumental tracks if enabled and applicable
-        if self.skip_inst and ('instrumental' in basename.lower() or 'inst.' in basename.lower()):
+        await self.pipeline.run(scan)
+
+    async def read_album(self, tracks: list[TrackFile], emit: Emit) -> None:
+        """
+        Read the tags of all tracks of an album directory concurrently.
+        """
+        jobs: list[TrackJob | None] = [None] * len(tracks)
+
+        async def read(i: int, track: TrackFile):
+            with self.track_errors(track):
+                jobs[i] = await self.read_track(track)
+
+        async with trio.open_nursery() as nursery:
+            for i, track in enumerate(tracks):
+                nursery.start_soon(read, i, track)
+
+        album_jobs = [job for job in jobs if job is not None]
+        if album_jobs:
+            await emit(album_jobs)
+
+    async def resolve_album(self, jobs: list[TrackJob], emit: Emit) -> None:
+        """
+        Resolve the releases of an album's tracks and pass them on grouped by release.
+        """
+        # Resolve releases sequentially, as the first lookup caches the release for all tracks on it
+        release_jobs: dict[Mbid, tuple[Release, list[tuple[TrackJob, Mbid]]]] = {}
+        for job in jobs:
+            with self.track_errors(job.track):
+                resolved = await self.resolve_track(job)
+                if resolved:
+                    release, recording_mbid = resolved
+                    release_jobs.setdefault(release.id, (release, []))[1].append((job, recording_mbid))
+
+        for release_job_list in release_jobs.values():
+            await emit(release_job_list)
+
+    async def fetch_release_lyrics(self, item: tuple[Release, list[tuple[TrackJob, Mbid]]], emit: Emit) -> None:
+        """
+        Map the provider songs of a release once, then fetch lyrics for all its tracks concurrently.
+        """
+        release, jobs = item
+        self.update_status(f'Fetching songs for {escape(release.title)}')
+        try:
+            mapped_songs = await self.provider.get_mapped_provider_songs(release)
+        except Exception as e:
+            for job, _ in jobs:
+                self.report_error(job.track, e)
             return
 
-        # Skip if .nolyrics file exists
-        nolyrics_file = path.join(dirname, f'{basename}.nolyrics')
-        if path.exists(nolyrics_file):
+        if not mapped_songs:
+            # Not settled like missing lyrics, so that the release shows up in later reports until it's fixed
+            for job, _ in jobs:
+                console.print(f'No lyrics found for {escape(job.title)}')
+                self.set_lyrics_status(job.track.path, LYRICS_STATUS_UNMAPPED)
             return
 
-        synced_lyrics_file = path.join(dirname, f'{basename}.lrc')
-        static_lyrics_file = path.join(dirname, f'{basename}.txt')
-        has_synced_lyrics = path.exists(synced_lyrics_file)
-        has_static_lyrics = path.exists(static_lyrics_file)
+        async def fetch(job: TrackJob, recording_mbid: Mbid):
+            with self.track_errors(job.track):
+                self.update_status(f'Fetching lyrics for {escape(job.title)}')
+                lyrics = await self.provider.fetch_recording_lyrics(release, recording_mbid)
+                await emit((job, lyrics))
+
+        async with trio.open_nursery() as nursery:
+            for job, recording_mbid in jobs:
+                nursery.start_soon(fetch, job, recording_mbid)
+
+    async def write_track_lyrics(self, item: tuple[TrackJob, Lyrics | None], emit: Emit) -> None:
+        job, lyrics = item
+        with self.track_errors(job.track):
+            self.write_lyrics(job, lyrics)
+
+    def update_status(self, message: str):
+        """
+        Update the status line with a message and the current queue depths of the pipeline stages.
+        """
+        queues = ', '.join(f'{stage.name} {stage.queue_depth}' for stage in self.pipeline.stages)
+        self.status.update(f'{message} [dim](queued: {queues})[/dim]')
+
+    def print_stats(self):
+        """
+        Print statistics of the pipeline stages, which can be used to tune the number of workers.
+        """
+        table = Table(title='Pipeline statistics')
+        table.add_column('Stage')
+        table.add_column('Workers', justify='right')
+        table.add_column('Processed', justify='right')
+        table.add_column('Busy time', justify='right')
+        table.add_column('Utilization', justify='right')
+        table.add_column('Max. queue depth', justify='right')
+        for stage in self.pipeline.stages:
+            table.add_row(
+                stage.name,
+                str(stage.workers),
+                str(stage.processed),
+                f'{stage.busy_time:.1f}s',
+                f'{stage.utilization(self.pipeline.elapsed):.0%}',
+                str(stage.max_queue_depth),
+            )
+        console.print(table)
+        for domain, limiter in self.provider_concurrency.items():
+            console.print(f'Final provider concurrency limit for {domain}: {int(limiter.limit)}')
+
+    @contextmanager
+    def track_errors(self, track: TrackFile):
+        """
+        Report errors while processing a track without affecting other tracks.
+        """
+        try:
+            yield
+        except Exception as e:
+            self.report_error(track, e)
+
+    def report_error(self, track: TrackFile, error: Exception):
+        """
+        Report an error for a track, and mark it in the index to be retried on the next run.
+        """
+        console.print(f'Error: could not fetch lyrics for \'{escape(track.filename)}\': {error!r}', style='error')
+        self.set_lyrics_status(track.path, LYRICS_STATUS_ERROR)
+
+    async def read_track(self, track: TrackFile) -> TrackJob | None:
+        """
+        Check if lyrics should be fetched for a track and read its tags.
+        """
+        basename = track.basename
+
+        # Skip instrumental tracks if enabled and applicable
+        if self.skip_inst and ('instrumental' in basename.lower() or 'inst.' in basename.lower()):
+            return None
+
+        # Skip if .nolyrics file exists
+        if track.excluded:
+            return None
 
         # Skip if lyrics already exist
-        if (has_synced_lyrics or (has_static_lyrics and not self.upgrade)) and not self.force:
-            return
+        if (track.has_synced_lyrics or (track.has_static_lyrics and not self.upgrade)) and not self.force:
+            return None
 
-        file = mutagen.File(filepath, easy=True)
-        if not file:
-            return
+        entry = await self.get_index_entry(track.path)
+        # Skip if the last lookup found no lyrics and it's too early to ask the providers again,
+        # unless a report is requested, which needs all releases and artists to be resolved
+        retry_interval = provider_cache.persistent_cache_ttls[provider_cache.CACHE_ENTITY_NO_LYRICS]
+        if not (self.force or self.report) and entry.has_settled_lyrics(self.providers_key, retry_interval):
+            return None
+
+        tags = entry.tags
+        if not tags:
+            return None
 
-        tags = file.tags
         if (
-            TITLE_TAG not in tags
-            or ALBUM_TAG not in tags
-            or TRACKNUMBER_TAG not in tags
-            or MB_RGID_TAG not in tags
-            or MB_RTID_TAG not in tags
+            tags.title is None
+            or tags.album is None
+            or tags.tracknumber is None
+            or tags.rg_mbid is None
+            or tags.track_mbid is None
         ):
-            return
-
-        title = tags[TITLE_TAG][0] or 'Unknown title'
-        album = tags[ALBUM_TAG][0] or 'Unknown album'
-        rg_mbid: Mbid = tags[MB_RGID_TAG][0]
-        track_mbid: Mbid = tags[MB_RTID_TAG][0]
+            return None
 
         # Handle empty MBIDs
-        if not rg_mbid or not track_mbid:
-            return
-
+        if not tags.rg_mbid or not tags.track_mbid:
+            return None
+
+        return TrackJob(
+            track=track,
+            tags=tags,
+            title=tags.title or 'Unknown title',
+            album=tags.album or 'Unknown album',
+            track_mbid=Mbid(tags.track_mbid),
+        )
+
+    async def resolve_track(self, job: TrackJob) -> tuple[Release, Mbid] | None:
+        """
+        Resolve the release and recording of a track from MusicBrainz.
+        :return: The release and the recording MBID of the track, or None if the track couldn't be resolved.
+        """
         # Check artist URL
-        if self.check_artist and not await self.has_artist_url(tags):
-            return
-
-        # Resolve release for the track
-        self.status.update(f'Fetching release info for {escape(album)}')
-        track_release = await get_release_by_track(self.http_client, track_mbid)
+        if self.check_artist and not await self.has_artist_url(job.tags):
+            return None
+
+        # Resolve release for the track, directly by the album MBID if possible
+        self.update_status(f'Fetching release info for {escape(job.album)}')
+        if job.tags.album_mbid:
+            track_release = await get_release(self.http_client, Mbid(job.tags.album_mbid))
+            track = track_release.get_track(job.track_mbid) if track_release else None
+            if track_release and track:
+                return track_release, track.recording_id
+
+        track_release = await get_release_by_track(self.http_client, job.track_mbid)
         if not track_release:
-            console.print(f'No release found for {escape(album)} with', style='warning')
-            return
+            console.print(f'No release found for {escape(job.album)} with', style='warning')
+            return None
 
         # Resolve track
-        for medium in track_release.get_track_map():
-            track = medium.get(track_mbid)
-            if track:
-                break
-        else:
-            return
+        track = track_release.get_track(job.track_mbid)
+        if track is None:
+            return None
+
+        return track_release, track.recording_id
+
+    def write_lyrics(self, job: TrackJob, lyrics: Lyrics | None) -> None:
+        track = job.track
+        title = job.title
+        synced_lyrics_file = track.synced_lyrics_path
+        static_lyrics_file = track.static_lyrics_path
 
-        # Fetch lyrics
-        self.status.update(f'Fetching lyrics for {escape(title)}')
-        recording_mbid: Mbid = track['recording']['id']
-        lyrics = await self.provider.fetch_recording_lyrics(track_release, recording_mbid)
         if not lyrics:
             console.print(f'No lyrics found for {escape(title)}')
+            self.set_lyrics_status(track.path, LYRICS_STATUS_NOT_FOUND)
             return
 
         if self.dry_run:
@@ -216,30 +484,61 @@ class LyricsFetcher:
             if lyrics.is_synced:
                 lyrics.write_to_file(synced_lyrics_file)
                 console.print(f'Wrote synced lyrics for {escape(title)} to \'{escape(synced_lyrics_file)}\'')
+                self.set_lyrics_status(track.path, LYRICS_STATUS_SYNCED)
 
                 # Remove static lyrics file if necessary
-                if has_static_lyrics:
+                if track.has_static_lyrics:
                     os.unlink(static_lyrics_file)
-            elif has_synced_lyrics:
+            elif track.has_synced_lyrics:
                 console.print(
                     f'Not writing static lyrics for {escape(title)} as synced lyrics already exist',
                     style='info',
                 )
-            elif self.upgrade and has_static_lyrics:
+            elif self.upgrade and track.has_static_lyrics:
                 console.print(f'No upgraded lyrics available for {escape(title)}', style='info')
             else:
                 lyrics.write_to_file(static_lyrics_file)
                 console.print(f'Wrote static lyrics for {escape(title)} to \'{escape(static_lyrics_file)}\'')
+                self.set_lyrics_status(track.path, LYRICS_STATUS_STATIC)
+
+    @property
+    def providers_key(self) -> str:
+        """
+        Identifies the used providers in the collection index, as lyrics missing from one provider may exist on another.
+        """
+        return ','.join(self.provider_factory.api_domains)
+
+    async def get_index_entry(self, filepath: str) -> IndexEntry:
+        """
+        Get the tags and lyrics status of an audio file from the collection index if the file is unchanged
+        since it was indexed, otherwise read its tags and index them.
+        """
+        if self.index is None:
+            return IndexEntry(tags=await self.tag_reader.read_tags(filepath))
+
+        index_path = path.abspath(filepath)
+        stat = await self.tag_reader.stat(filepath)
+        entry = self.index.lookup(index_path, stat)
+        if entry is not None:
+            return entry
+
+        tags = await self.tag_reader.read_tags(filepath)
+        self.index.update_tags(index_path, stat, tags)
+        return IndexEntry(tags=tags)
+
+    def set_lyrics_status(self, filepath: str, lyrics_status: str):
+        if self.index is not None:
+            self.index.set_lyrics_status(path.abspath(filepath), lyrics_status, self.providers_key)
 
-    async def has_artist_url(self, tags) -> bool:
+    async def has_artist_url(self, tags: TrackTags) -> bool:
         """
         Check if the artist has a URL for the current provider.
         :return: True if we're unable to check or if this artist has a URL, False otherwise.
         """
-        if MB_AAID_TAG not in tags or ALBUMARTIST_TAG not in tags:
+        if tags.albumartist_mbid is None or tags.albumartist is None:
             return True
 
-        albumartist_mbid: Mbid = tags[MB_AAID_TAG][0]
+        albumartist_mbid = Mbid(tags.albumartist_mbid)
         if not albumartist_mbid:  # handle empty MBID
             return True
 
@@ -247,9 +546,9 @@ class LyricsFetcher:
         if albumartist_mbid == VARIOUS_ARTISTS_MBID:
             return True
 
-        albumartist = tags[ALBUMARTIST_TAG][0] or 'unknown artist'
+        albumartist = tags.albumartist or 'unknown artist'
 
-        self.status.update(f'Fetching artist info for {escape(albumartist)}')
+        self.update_status(f'Fetching artist info for {escape(albumartist)}')
 
         artist = await get_artist(self.http_client, albumartist_mbid)
         if not artist:
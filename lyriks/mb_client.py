@@ -1,17 +1,21 @@
-import time
+from dataclasses import dataclass, field
 from json.decoder import JSONDecodeError
+import re
 from re import Pattern
-from typing import NewType
+from typing import Any, Callable, Iterator, NewType
 
 import trio
 from httpx import AsyncClient as HttpClient
 from httpx import RequestError
 from rich.markup import escape
 from stamina import retry
-from trio import Lock
+from trio import CapacityLimiter, Lock
 
 from .cli.console import console
 from .const import VERSION
+from .disk_cache import DiskCache
+from .mb_dump import MusicBrainzDump
+from .util import SingleFlight
 
 Mbid = NewType('Mbid', str)
 
@@ -22,17 +26,83 @@ _ARTIST_INC = 'url-rels'
 _RELEASE_INC = 'artist-credits+release-groups+recordings+media+url-rels'
 
 _DEFAULT_RATE_LIMIT_DELAY = 1.0  # seconds
+_BROWSE_LIMIT = 100  # maximum page size of browse requests
 
+CACHE_ENTITY_ARTIST = 'artist'
+CACHE_ENTITY_RELEASE = 'release'
+CACHE_ENTITY_RELEASE_GROUP = 'release-group'
+_CACHE_NAMESPACE_TRACK = 'track'
 
+# Artists and releases carry the URL relations, which are the most likely to be fixed after a report,
+# so they are only kept for a day. Release groups load their releases with the release TTL.
+DEFAULT_CACHE_TTLS = {
+    CACHE_ENTITY_ARTIST: 24 * 60 * 60,
+    CACHE_ENTITY_RELEASE: 24 * 60 * 60,
+    CACHE_ENTITY_RELEASE_GROUP: 24 * 60 * 60,
+}
+
+
+class MusicBrainzError(Exception):
+    """
+    Raised if the MusicBrainz API returns an error or an invalid response.
+    """
+
+
+# Album URL patterns of all providers by key, see register_album_url_pattern
+album_url_patterns: dict[str, Pattern] = {}
+_album_url_matcher: Pattern | None = None
+
+
+def register_album_url_pattern(key: str, pattern: Pattern):
+    """
+    Register the pattern of a provider's album URLs, to extract album IDs from releases with Release.album_ids.
+    The pattern must contain exactly one capturing group for the album ID.
+    """
+    global _album_url_matcher
+    if pattern.groups != 1:
+        raise ValueError("Pattern must contain exactly one capturing group: %r" % pattern)
+    album_url_patterns[key] = pattern
+    _album_url_matcher = None
+
+
+def _get_album_url_matcher() -> tuple[Pattern, list[str]]:
+    """
+    Combine all album URL patterns into one, so that every URL has to be matched only once.
+    As each pattern has exactly one group, the index of the matched group identifies the pattern.
+    """
+    global _album_url_matcher
+    keys = list(album_url_patterns)
+    if _album_url_matcher is None:
+        _album_url_matcher = re.compile('|'.join(f'(?:{album_url_patterns[key].pattern})' for key in keys))
+    return _album_url_matcher, keys
+
+
+def _url_relations(data: dict) -> Iterator[dict]:
+    return (relation for relation in data.get('relations', []) if relation.get('target-type') == 'url')
+
+
+@dataclass(frozen=True, slots=True)
 class Artist:
-    def __init__(self, data: dict):
-        self.data = data
-        self.id: Mbid = data['id']
-        self.name: str = data['name']
-        self.urls: set = {
-            relation['url']['resource']
-            for relation in data.get('relations', [])
-            if relation.get('target-type') == 'url'
+    id: Mbid
+    name: str
+    urls: frozenset[str]
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Artist':
+        return cls(
+            id=data['id'],
+            name=data['name'],
+            urls=frozenset(relation['url']['resource'] for relation in _url_relations(data)),
+        )
+
+    def to_json(self) -> dict:
+        """
+        Convert the artist to a minimal API response, which can be read again with from_json.
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'relations': [{'target-type': 'url', 'url': {'resource': url}} for url in sorted(self.urls)],
         }
 
     @property
@@ -44,20 +114,106 @@ class Artist:
         return f'[underline][link={self.url}]{escape(self.name)}[/link][/underline]'
 
 
+@dataclass(frozen=True, slots=True)
+class Track:
+    id: Mbid
+    number: str
+    position: int
+    recording_id: Mbid
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Track':
+        return cls(
+            id=data['id'], number=data['number'], position=data['position'], recording_id=data['recording']['id']
+        )
+
+    def to_json(self) -> dict:
+        return {'id': self.id, 'number': self.number, 'position': self.position, 'recording': {'id': self.recording_id}}
+
+
+@dataclass(frozen=True, slots=True)
+class Medium:
+    position: int
+    track_count: int
+    tracks: tuple[Track, ...]
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Medium':
+        return cls(
+            position=data.get('position', 0),
+            track_count=data['track-count'],
+            tracks=tuple(Track.from_json(track) for track in data.get('tracks', [])),
+        )
+
+    def to_json(self) -> dict:
+        return {
+            'position': self.position,
+            'track-count': self.track_count,
+            'tracks': [track.to_json() for track in self.tracks],
+        }
+
+
+@dataclass(frozen=True, slots=True)
 class Release:
-    def __init__(self, data: dict):
-        self.data = data
-        self.id: Mbid = data['id']
-        self.title: str = data['title']
-        self.artist_credit: dict = data['artist-credit']
-        self.rg_mbid: Mbid = data['release-group']['id']
-        self.media: list = self.data['media']
+    id: Mbid
+    title: str
+    rg_mbid: Mbid
+    media: tuple[Medium, ...]
+    urls: tuple[str, ...]
+    """The URLs of all URL relations that haven't ended"""
+    _track_index: dict[Mbid, tuple[int, Track]] | None = field(default=None, init=False, repr=False, compare=False)
+    _recording_index: dict[Mbid, Track] | None = field(default=None, init=False, repr=False, compare=False)
+    _album_ids: dict[str, str] | None = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Release':
+        return cls(
+            id=data['id'],
+            title=data['title'],
+            rg_mbid=data['release-group']['id'],
+            media=tuple(Medium.from_json(medium) for medium in data['media']),
+            urls=tuple(relation['url']['resource'] for relation in _url_relations(data) if not relation.get('ended')),
+        )
+
+    def to_json(self) -> dict:
+        """
+        Convert the release to a minimal API response, which can be read again with from_json.
+        """
+        return {
+            'id': self.id,
+            'title': self.title,
+            'release-group': {'id': self.rg_mbid},
+            'media': [medium.to_json() for medium in self.media],
+            'relations': [{'target-type': 'url', 'url': {'resource': url}} for url in self.urls],
+        }
 
     def get_track_count(self) -> int:
-        return sum(medium['track-count'] for medium in self.media)
+        return sum(medium.track_count for medium in self.media)
+
+    @property
+    def track_index(self) -> dict[Mbid, tuple[int, Track]]:
+        """Maps the MBIDs of all tracks to the position of their medium and the track, built on first use"""
+        track_index = self._track_index
+        if track_index is None:
+            track_index = {track.id: (medium.position, track) for medium in self.media for track in medium.tracks}
+            object.__setattr__(self, '_track_index', track_index)
+        return track_index
+
+    @property
+    def recording_index(self) -> dict[Mbid, Track]:
+        """
+        Maps the MBIDs of all recordings to their last track on the release, built on first use.
+        Recordings that appear several times, e.g. on a bonus disc, are matched by their last occurrence.
+        """
+        recording_index = self._recording_index
+        if recording_index is None:
+            recording_index = {track.recording_id: track for _, track in self.track_index.values()}
+            object.__setattr__(self, '_recording_index', recording_index)
+        return recording_index
 
-    def get_track_map(self) -> list[dict[Mbid, dict]]:
-        return [{track['id']: track for track in medium['tracks']} for medium in self.media]
+    def get_track(self, track_mbid: Mbid) -> Track | None:
+        entry = self.track_index.get(track_mbid)
+        return entry[1] if entry else None
 
     @property
     def url(self):
@@ -67,30 +223,34 @@ class Release:
     def rich_string(self) -> str:
         return f'[underline][link={self.url}]{escape(self.title)}[/link][/underline]'
 
-    def extract_url_str(self, pattern: Pattern) -> str | None:
+    @property
+    def album_ids(self) -> dict[str, str]:
         """
-        Extracts an ID from the release's URL relations using the provided RegEx pattern.
-        The pattern must contain exactly one capturing group for the ID.
+        The album IDs of all providers with an album URL on this release, by the key of their album URL pattern.
+        Extracted from the URLs on first use, matching each URL only once against all registered patterns.
         """
-        if pattern.groups != 1:
-            raise ValueError("Pattern must contain exactly one capturing group: %r" % pattern)
-
-        relations = self.data['relations']
-        for relation in relations:
-            if relation.get('target-type') != 'url' or relation.get('ended'):
-                continue
-            url = relation['url']['resource']
-            match = pattern.fullmatch(url)
-            if match:
-                return match.group(1)
-        return None
+        album_ids = self._album_ids
+        if album_ids is None:
+            matcher, keys = _get_album_url_matcher()
+            album_ids = {}
+            for url in self.urls:
+                match = matcher.fullmatch(url)
+                if match and match.lastindex is not None:
+                    album_ids.setdefault(keys[match.lastindex - 1], match.group(match.lastindex))
+            object.__setattr__(self, '_album_ids', album_ids)
+        return album_ids
+
+    def get_album_id(self, key: str) -> str | None:
+        """
+        Get the album ID for the album URL pattern registered with the given key.
+        """
+        return self.album_ids.get(key)
 
-    def extract_url_id(self, pattern: Pattern) -> int | None:
+    def get_album_int_id(self, key: str) -> int | None:
         """
-        Extracts an integer ID from the release's URL relations using the provided RegEx pattern.
-        The pattern must contain exactly one capturing group for the ID.
+        Get the album ID for the album URL pattern registered with the given key as an integer.
         """
-        id_str = self.extract_url_str(pattern)
+        id_str = self.get_album_id(key)
         if id_str is None:
             return None
 
@@ -101,32 +261,58 @@ class Release:
 
 
 class RequestRateLimiter:
-    def __init__(self, delay: float):
+    """
+    Token bucket rate limiter for requests to the MusicBrainz API.
+
+    Tokens are replenished at a rate of one per delay, up to burst tokens, and each request takes one token when it starts.
+    Independently, at most max_in_flight requests are made at the same time.
+    Time is measured with the monotonic trio clock, so changes of the wall clock don't affect the rate.
+    """
+
+    def __init__(self, delay: float, burst: int = 1, max_in_flight: int = 1):
         self.delay: float = delay
+        self.burst: int = burst
+        self.tokens: float = burst
+        self.last_refill_time: float | None = None
         self.lock: Lock = Lock()
-        self.last_request_time: float = 0
+        self.in_flight: CapacityLimiter = CapacityLimiter(max_in_flight)
 
     async def __aenter__(self):
-        await self.lock.acquire()
-        time_since = time.time() - self.last_request_time
-        if time_since <= self.delay:
-            await trio.sleep(self.delay - time_since)
-
-    def notify_request(self):
-        """
-        Notify the rate limiter that a request has been made.
-        Must be called in the context of this rate limiter.
-        """
-        self.last_request_time = time.time()
+        await self.in_flight.acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self.in_flight.release()
+            raise
+
+    async def _take_token(self):
+        # Only held while waiting for a token, so that waiting requests are served in order
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                await trio.sleep((1 - self.tokens) * self.delay)
+                self._refill()
+            self.tokens -= 1
+
+    def _refill(self):
+        now = trio.current_time()
+        if self.last_refill_time is not None and self.delay > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill_time) / self.delay)
+        else:
+            self.tokens = self.burst
+        self.last_refill_time = now
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        self.lock.release()
+        self.in_flight.release()
 
 
 mb_api_url = f'{DEFAULT_MUSICBRAINZ_SERVER_URL}/{API_PATH}'
 rate_limiter = RequestRateLimiter(delay=_DEFAULT_RATE_LIMIT_DELAY)
 has_custom_server = False
 
+# Concurrent lookups of the same entity share a single request
+in_flight = SingleFlight()
+
 
 def set_server_url(server_url: str):
     global mb_api_url, rate_limiter, has_custom_server
@@ -137,35 +323,165 @@ def set_server_url(server_url: str):
         console.print(f'Using custom MusicBrainz server URL: {server_url}', style='warning')
 
 
-def set_rate_limit(delay: float) -> bool:
+def set_rate_limit(delay: float | None, burst: int = 1, max_in_flight: int = 1) -> bool:
     """
-    Set the minimum delay between requests to the MusicBrainz API.
+    Set the rate limit for requests to the MusicBrainz API.
     Can only be set when using a custom MusicBrainz server URL.
 
+    :param delay: The average delay between requests in seconds, or None to keep the default delay.
+    :param burst: The number of requests that may be made without delay after an idle period.
+    :param max_in_flight: The maximum number of concurrent requests.
+
     :return: True if the rate limit was set, False otherwise.
     """
     if not has_custom_server:
         return False
 
     global rate_limiter
-    rate_limiter = RequestRateLimiter(delay=delay)
+    if delay is None:
+        delay = _DEFAULT_RATE_LIMIT_DELAY
+    rate_limiter = RequestRateLimiter(delay=delay, burst=burst, max_in_flight=max_in_flight)
 
     return True
 
 
+def set_cache(cache: DiskCache | None, ttls: dict[str, float] | None = None, refresh: bool = False):
+    """
+    Set the persistent cache for API responses, or None to disable it.
+
+    :param ttls: The maximum age of cached entries in seconds per entity type,
+                 overriding the defaults from DEFAULT_CACHE_TTLS. A TTL of 0 disables caching for an entity type.
+    :param refresh: Don't load persisted artists and releases, as their URL relations may have been fixed since,
+                    but still persist the fetched ones.
+    """
+    global persistent_cache, persistent_cache_ttls, refresh_persisted
+    persistent_cache = cache
+    persistent_cache_ttls = DEFAULT_CACHE_TTLS | (ttls or {})
+    refresh_persisted = refresh
+
+
 artist_cache: dict[Mbid, Artist | None] = {}
+release_cache: dict[Mbid, Release | None] = {}
 release_group_cache: dict[Mbid, list[Release]] = {}
+# Release groups of which only some pages have been fetched so far
+partial_release_groups: dict[Mbid, list[Release]] = {}
 track_release_cache: dict[Mbid, Release | None] = {}
 
 
-@retry(on=RequestError, attempts=3)
+def set_dump(musicbrainz_dump: MusicBrainzDump | None):
+    """
+    Answer all lookups from a local MusicBrainz dump instead of the API, or None to use the API again.
+    Lookups in the dump are not rate limited, and their results are not persisted in the cache.
+    """
+    global dump
+    dump = musicbrainz_dump
+
+
+dump: MusicBrainzDump | None = None
+persistent_cache: DiskCache | None = None
+persistent_cache_ttls: dict[str, float] = dict(DEFAULT_CACHE_TTLS)
+refresh_persisted = False
+
+
+def _get_persisted(entity: str, namespace: str, mbid: Mbid) -> Any | None:
+    ttl = persistent_cache_ttls[entity]
+    if persistent_cache is None or ttl <= 0:
+        return None
+    if refresh_persisted and entity in (CACHE_ENTITY_ARTIST, CACHE_ENTITY_RELEASE):
+        return None
+    return persistent_cache.get_json(namespace, mbid, max_age=ttl)
+
+
+def _persist(entity: str, namespace: str, mbid: Mbid, value: Any):
+    if persistent_cache is None or persistent_cache_ttls[entity] <= 0:
+        return
+    persistent_cache.set_json(namespace, mbid, value)
+
+
+def _get_persisted_release(release_mbid: Mbid) -> Release | None:
+    data = _get_persisted(CACHE_ENTITY_RELEASE, CACHE_ENTITY_RELEASE, release_mbid)
+    return Release.from_json(data) if data is not None else None
+
+
+def _persist_release(release: Release):
+    _persist(CACHE_ENTITY_RELEASE, CACHE_ENTITY_RELEASE, release.id, release.to_json())
+
+
+def _cache_release_tracks(release: Release):
+    """
+    Cache a release for each contained track.
+    """
+    for medium in release.media:
+        for track in medium.tracks:
+            track_release_cache[track.id] = release
+
+
+def _load_persisted_release_by_track(track_mbid: Mbid) -> Release | None:
+    cached = _get_persisted(CACHE_ENTITY_RELEASE, _CACHE_NAMESPACE_TRACK, track_mbid)
+    if cached is None:
+        return None
+
+    release = _get_persisted_release(cached)
+    if release is not None:
+        _cache_release_tracks(release)
+    return release
+
+
+def _persist_release_tracks(release: Release):
+    _persist_release(release)
+    for medium in release.media:
+        for track in medium.tracks:
+            _persist(CACHE_ENTITY_RELEASE, _CACHE_NAMESPACE_TRACK, track.id, release.id)
+
+
+def _load_persisted_release_group(rg_mbid: Mbid) -> list[Release] | None:
+    release_mbids = _get_persisted(CACHE_ENTITY_RELEASE_GROUP, CACHE_ENTITY_RELEASE_GROUP, rg_mbid)
+    if release_mbids is None:
+        return None
+
+    releases = []
+    for release_mbid in release_mbids:
+        release = _get_persisted_release(release_mbid)
+        if release is None:
+            # Incomplete, e.g. due to eviction
+            return None
+        releases.append(release)
+
+    release_group_cache[rg_mbid] = releases
+    return releases
+
+
+def _persist_release_group(rg_mbid: Mbid, releases: list[Release]):
+    for release in releases:
+        _persist_release(release)
+    _persist(CACHE_ENTITY_RELEASE_GROUP, CACHE_ENTITY_RELEASE_GROUP, rg_mbid, [release.id for release in releases])
+
+
 async def get_artist(http_client: HttpClient, artist_mbid: Mbid) -> Artist | None:
     # Initial cache check
     if artist_mbid in artist_cache:
         return artist_cache[artist_mbid]
 
+    if dump is not None:
+        data = dump.get_artist(artist_mbid)
+        artist = Artist.from_json(data) if data is not None else None
+        artist_cache[artist_mbid] = artist
+        return artist
+
+    # Check persistent cache
+    data = _get_persisted(CACHE_ENTITY_ARTIST, CACHE_ENTITY_ARTIST, artist_mbid)
+    if data is not None:
+        artist = Artist.from_json(data)
+        artist_cache[artist_mbid] = artist
+        return artist
+
+    return await in_flight.run((CACHE_ENTITY_ARTIST, artist_mbid), _fetch_artist, http_client, artist_mbid)
+
+
+@retry(on=RequestError, attempts=3)
+async def _fetch_artist(http_client: HttpClient, artist_mbid: Mbid) -> Artist | None:
     async with rate_limiter:
-        # Check cache again inside rate limiter lock
+        # Check cache again after waiting for the rate limiter
         if artist_mbid in artist_cache:
             return artist_cache[artist_mbid]
 
@@ -179,34 +495,101 @@ async def get_artist(http_client: HttpClient, artist_mbid: Mbid) -> Artist | Non
             ).json()
         except JSONDecodeError:
             return None
-        finally:
-            rate_limiter.notify_request()
 
-        if 'error' in response:
-            console.print(f'[bold red]Error: {escape(repr(response["error"]))}')
-            return None
+    if 'error' in response:
+        console.print(f'[bold red]Error: {escape(repr(response["error"]))}')
+        return None
 
-        artist = Artist(response)
+    artist = Artist.from_json(response)
 
-        # Cache result
-        artist_cache[artist_mbid] = artist
+    # Cache result
+    artist_cache[artist_mbid] = artist
+    _persist(CACHE_ENTITY_ARTIST, CACHE_ENTITY_ARTIST, artist_mbid, artist.to_json())
 
     return artist
 
 
-@retry(on=RequestError, attempts=3)
-async def _get_releases(http_client: HttpClient, browse_url: str) -> list[Release]:
+async def _browse_releases(http_client: HttpClient, browse_url: str, offset: int = 0) -> tuple[list[Release], int]:
+    """
+    Fetch a page of releases with the maximum page size. Must be called while holding the rate limiter.
+
+    :return: The releases on the page, and the total number of releases.
+    :raises MusicBrainzError: if the API returned an error, so that it can't be mistaken for the end of the results.
+    """
+    response = await http_client.get(
+        f'{browse_url}&limit={_BROWSE_LIMIT}&offset={offset}',
+        headers={'User-Agent': USER_AGENT, 'Accept': 'application/json'},
+    )
     try:
-        response = (
-            await http_client.get(
-                browse_url,
-                headers={'User-Agent': USER_AGENT, 'Accept': 'application/json'},
-            )
-        ).json()
+        data = response.json()
     except JSONDecodeError:
-        return []
+        raise MusicBrainzError(f'Invalid response with status {response.status_code}') from None
+    if response.is_error or 'error' in data:
+        raise MusicBrainzError(f'Error {response.status_code}: {data.get("error")}')
 
-    return [Release(release) for release in response.get("releases", [])]
+    releases = [Release.from_json(release) for release in data.get('releases', [])]
+    return releases, data.get('release-count', 0)
+
+
+async def get_release(http_client: HttpClient, release_mbid: Mbid) -> Release | None:
+    """
+    Look up a release by its MBID, and cache it for each contained track.
+    """
+    # Initial cache check
+    if release_mbid in release_cache:
+        return release_cache[release_mbid]
+
+    if dump is not None:
+        data = dump.get_release(release_mbid)
+        release = Release.from_json(data) if data is not None else None
+        release_cache[release_mbid] = release
+        if release is not None:
+            _cache_release_tracks(release)
+        return release
+
+    # Check persistent cache
+    release = _get_persisted_release(release_mbid)
+    if release is not None:
+        release_cache[release_mbid] = release
+        _cache_release_tracks(release)
+        return release
+
+    return await in_flight.run((CACHE_ENTITY_RELEASE, release_mbid), _fetch_release, http_client, release_mbid)
+
+
+@retry(on=RequestError, attempts=3)
+async def _fetch_release(http_client: HttpClient, release_mbid: Mbid) -> Release | None:
+    async with rate_limiter:
+        # Check cache again after waiting for the rate limiter
+        if release_mbid in release_cache:
+            return release_cache[release_mbid]
+
+        release_url = f'{mb_api_url}/release/{release_mbid}?inc={_RELEASE_INC}'
+        response = await http_client.get(
+            release_url,
+            headers={'User-Agent': USER_AGENT, 'Accept': 'application/json'},
+        )
+
+    # Unknown or malformed MBIDs, e.g. of merged releases, are left to the caller,
+    # while other errors like rate limiting must not be cached as a missing release
+    if response.status_code in (400, 404):
+        release = None
+    else:
+        try:
+            data = response.json()
+        except JSONDecodeError:
+            raise MusicBrainzError(f'Invalid response with status {response.status_code}') from None
+        if response.is_error or 'error' in data:
+            raise MusicBrainzError(f'Error {response.status_code}: {data.get("error")}')
+        release = Release.from_json(data)
+
+    # Cache result
+    release_cache[release_mbid] = release
+    if release is not None:
+        _cache_release_tracks(release)
+        _persist_release_tracks(release)
+
+    return release
 
 
 async def get_release_by_track(http_client: HttpClient, track_mbid: Mbid) -> Release | None:
@@ -214,48 +597,106 @@ async def get_release_by_track(http_client: HttpClient, track_mbid: Mbid) -> Rel
     if track_mbid in track_release_cache:
         return track_release_cache[track_mbid]
 
+    if dump is not None:
+        data = dump.get_release_by_track(track_mbid)
+        release = Release.from_json(data) if data is not None else None
+        if release is not None:
+            _cache_release_tracks(release)
+        return release
+
+    # Check persistent cache
+    release = _load_persisted_release_by_track(track_mbid)
+    if release is not None:
+        return release
+
+    return await in_flight.run((_CACHE_NAMESPACE_TRACK, track_mbid), _fetch_release_by_track, http_client, track_mbid)
+
+
+@retry(on=RequestError, attempts=3)
+async def _fetch_release_by_track(http_client: HttpClient, track_mbid: Mbid) -> Release | None:
     async with rate_limiter:
-        # Check cache again inside rate limiter lock
+        # Check cache again after waiting for the rate limiter,
+        # as another track of the same release may have been resolved in the meantime
         if track_mbid in track_release_cache:
             return track_release_cache[track_mbid]
 
-        try:
-            releases = await _get_releases(
-                http_client, f'{mb_api_url}/release?track={track_mbid}&status=official&inc={_RELEASE_INC}'
-            )
-        finally:
-            rate_limiter.notify_request()
+        releases, _ = await _browse_releases(
+            http_client, f'{mb_api_url}/release?track={track_mbid}&status=official&inc={_RELEASE_INC}'
+        )
 
-        release = next(iter(releases), None)
+    release = next(iter(releases), None)
 
-        # Cache release for each contained track
-        if release is not None:
-            for media in release.media:
-                for track in media['tracks']:
-                    track_mbid: Mbid = track['id']
-                    track_release_cache[track_mbid] = release
+    # Cache release for each contained track
+    if release is not None:
+        _cache_release_tracks(release)
+        _persist_release_tracks(release)
 
     return release
 
 
-async def get_releases_by_release_group(http_client: HttpClient, rg_mbid: Mbid) -> list[Release]:
+async def get_releases_by_release_group(
+    http_client: HttpClient,
+    rg_mbid: Mbid,
+    until: Callable[[list[Release]], bool] | None = None,
+) -> list[Release]:
+    """
+    Get the official releases of a release group, fetching them page by page.
+
+    :param until: Called with the releases fetched so far after each page.
+                  If it returns True, no further pages are fetched and the releases fetched so far are returned.
+                  Later calls continue fetching where the previous call stopped.
+    :return: All releases of the release group, or only the first ones if stopped early by until.
+    """
     # Initial cache check
     if rg_mbid in release_group_cache:
         return release_group_cache[rg_mbid]
 
-    async with rate_limiter:
-        # Check cache again inside rate limiter lock
-        if rg_mbid in release_group_cache:
-            return release_group_cache[rg_mbid]
+    if dump is not None:
+        releases = [Release.from_json(data) for data in dump.get_releases_by_release_group(rg_mbid)]
+        release_group_cache[rg_mbid] = releases
+        return releases
 
-        try:
-            releases = await _get_releases(
-                http_client, f'{mb_api_url}/release?release-group={rg_mbid}&status=official&inc={_RELEASE_INC}'
-            )
-        finally:
-            rate_limiter.notify_request()
+    # Check persistent cache
+    persisted = _load_persisted_release_group(rg_mbid)
+    if persisted is not None:
+        return persisted
 
-        # Cache result
-        release_group_cache[rg_mbid] = releases
+    while rg_mbid not in release_group_cache:
+        partial = partial_release_groups.get(rg_mbid)
+        if partial is not None and until is not None and until(partial):
+            return partial
 
-    return releases
+        await in_flight.run((CACHE_ENTITY_RELEASE_GROUP, rg_mbid), _fetch_release_group_page, http_client, rg_mbid)
+
+    return release_group_cache[rg_mbid]
+
+
+@retry(on=RequestError, attempts=3)
+async def _fetch_release_group_page(http_client: HttpClient, rg_mbid: Mbid):
+    """
+    Fetch the next page of releases of a release group, and cache the release group once it is complete.
+    Errors leave the pages fetched so far in place, so that a later call can continue with the missing pages.
+    """
+    releases = partial_release_groups.get(rg_mbid, [])
+    async with rate_limiter:
+        page, release_count = await _browse_releases(
+            http_client,
+            f'{mb_api_url}/release?release-group={rg_mbid}&status=official&inc={_RELEASE_INC}',
+            offset=len(releases),
+        )
+    releases = releases + page
+
+    if len(releases) < release_count:
+        if not page:
+            # Releases were removed between pages, so start over on the next call
+            partial_release_groups.pop(rg_mbid, None)
+            raise MusicBrainzError(f'Release group {rg_mbid} changed while fetching its releases')
+        partial_release_groups[rg_mbid] = releases
+        return
+
+    # Cache result
+    partial_release_groups.pop(rg_mbid, None)
+    release_group_cache[rg_mbid] = releases
+    # Releases added between pages may have shifted others to pages that were already fetched
+    if len(releases) == release_count:
+        _persist_release_group(rg_mbid, releases)
@@ -0,0 +1,232 @@
+import json
+import sqlite3
+import tarfile
+import zlib
+from os import PathLike
+from typing import Any, Callable, Iterable, Iterator
+
+SCHEMA_VERSION = 1
+
+IMPORT_BATCH_SIZE = 1000  # entities
+
+_ARTIST_MEMBER = 'mbdump/artist'
+_RELEASE_MEMBER = 'mbdump/release'
+
+
+class InvalidDumpError(Exception):
+    """
+    Raised when a file is not a MusicBrainz dump store created by lyriks.
+    """
+
+
+def _url_relations(data: dict) -> list[dict]:
+    return [
+        {
+            'target-type': 'url',
+            'ended': relation.get('ended', False),
+            'url': {'resource': relation['url']['resource']},
+        }
+        for relation in data.get('relations', [])
+        if relation.get('target-type') == 'url'
+    ]
+
+
+def _slim_artist(data: dict) -> dict:
+    """
+    Reduce an artist from the dump to the fields used by Artist.
+    """
+    return {
+        'id': data['id'],
+        'name': data['name'],
+        'relations': _url_relations(data),
+    }
+
+
+def _slim_release(data: dict) -> dict:
+    """
+    Reduce a release from the dump to the fields used by Release.
+    """
+    return {
+        'id': data['id'],
+        'title': data['title'],
+        'status': data.get('status'),
+        'release-group': {'id': data['release-group']['id']},
+        'media': [
+            {
+                'position': medium.get('position'),
+                'track-count': medium['track-count'],
+                'tracks': [
+                    {
+                        'id': track['id'],
+                        'number': track['number'],
+                        'position': track['position'],
+                        'recording': {'id': track['recording']['id']},
+                    }
+                    for track in medium.get('tracks', [])
+                ],
+            }
+            for medium in data.get('media', [])
+        ],
+        'relations': _url_relations(data),
+    }
+
+
+def _encode(data: dict) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def _decode(value: bytes) -> dict:
+    return json.loads(zlib.decompress(value))
+
+
+def _read_lines(archive_path: str | PathLike[str]) -> Iterator[tuple[str, bytes]]:
+    """
+    Stream the lines of the entity files in a dump archive, without extracting it.
+
+    :return: An iterator of (member name, line) tuples.
+    """
+    # Stream mode reads the archive sequentially, with transparent decompression
+    with tarfile.open(archive_path, 'r|*') as archive:
+        for member in archive:
+            if member.name not in (_ARTIST_MEMBER, _RELEASE_MEMBER) or not member.isfile():
+                continue
+            file = archive.extractfile(member)
+            if file is None:
+                continue
+            for line in file:
+                yield member.name, line
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class MusicBrainzDump:
+    """
+    Local store of MusicBrainz artists and releases, imported from the JSON data dumps.
+
+    See https://musicbrainz.org/doc/MusicBrainz_Database/Download for where to get the dumps.
+    Only the fields used by lyriks are kept, and releases are indexed by their tracks and release groups,
+    so that the lookups of the MusicBrainz client can be answered without any requests.
+    """
+
+    def __init__(self, db_path: str | PathLike[str], read_only: bool = True):
+        if read_only:
+            try:
+                self.connection = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+                (version,) = self.connection.execute('PRAGMA user_version').fetchone()
+            except sqlite3.Error as e:
+                raise InvalidDumpError(f'Failed to open {db_path}: {e}') from e
+            if version != SCHEMA_VERSION:
+                self.connection.close()
+                raise InvalidDumpError(f'{db_path} is not a MusicBrainz dump store, or was created by another version')
+            return
+
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS artists (
+                id TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS releases (
+                id TEXT PRIMARY KEY,
+                release_group_id TEXT NOT NULL,
+                status TEXT,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS releases_release_group_id ON releases (release_group_id);
+            CREATE TABLE IF NOT EXISTS tracks (
+                id TEXT PRIMARY KEY,
+                release_id TEXT NOT NULL
+            );
+            '''
+        )
+        self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.connection.commit()
+
+    def __enter__(self) -> 'MusicBrainzDump':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def import_archive(self, archive_path: str | PathLike[str], progress: Callable[[int], None] | None = None) -> int:
+        """
+        Import the artists or releases from a dump archive, e.g. artist.tar.xz or release.tar.xz.
+        Existing entities are replaced.
+
+        The archive is read as a stream, so only a small batch of entities is held in memory at any time.
+
+        :param progress: Called with the number of entities imported so far after each batch.
+        :return: The number of imported entities.
+        """
+        count = 0
+        for batch in _batched(_read_lines(archive_path), IMPORT_BATCH_SIZE):
+            artists = []
+            releases = []
+            tracks: list[tuple[str, str]] = []
+            for member_name, line in batch:
+                data = json.loads(line)
+                if member_name == _ARTIST_MEMBER:
+                    artists.append((data['id'], _encode(_slim_artist(data))))
+                else:
+                    release = _slim_release(data)
+                    releases.append(
+                        (release['id'], release['release-group']['id'], release['status'], _encode(release))
+                    )
+                    tracks.extend(
+                        (track['id'], release['id']) for medium in release['media'] for track in medium['tracks']
+                    )
+
+            with self.connection:
+                self.connection.executemany('INSERT OR REPLACE INTO artists VALUES (?, ?)', artists)
+                self.connection.executemany('INSERT OR REPLACE INTO releases VALUES (?, ?, ?, ?)', releases)
+                self.connection.executemany('INSERT OR REPLACE INTO tracks VALUES (?, ?)', tracks)
+
+            count += len(batch)
+            if progress:
+                progress(count)
+        return count
+
+    def get_artist(self, artist_mbid: str) -> dict[str, Any] | None:
+        row = self.connection.execute('SELECT data FROM artists WHERE id = ?', (artist_mbid,)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def get_release(self, release_mbid: str) -> dict[str, Any] | None:
+        row = self.connection.execute('SELECT data FROM releases WHERE id = ?', (release_mbid,)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def get_release_by_track(self, track_mbid: str) -> dict[str, Any] | None:
+        """
+        Look up the official release containing a track.
+        """
+        row = self.connection.execute(
+            '''
+            SELECT releases.data FROM tracks JOIN releases ON releases.id = tracks.release_id
+            WHERE tracks.id = ? AND releases.status = 'Official'
+            ''',
+            (track_mbid,),
+        ).fetchone()
+        return _decode(row[0]) if row else None
+
+    def get_releases_by_release_group(self, rg_mbid: str) -> list[dict[str, Any]]:
+        """
+        Look up the official releases of a release group.
+        """
+        rows = self.connection.execute(
+            "SELECT data FROM releases WHERE release_group_id = ? AND status = 'Official' ORDER BY id",
+            (rg_mbid,),
+        )
+        return [_decode(data) for (data,) in rows]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,118 @@
+from typing import Any, Awaitable, Callable
+
+import trio
+from trio import MemorySendChannel, MemoryReceiveChannel
+
+DEFAULT_BUFFER_SIZE = 16
+
+Emit = Callable[[Any], Awaitable[None]]
+Handler = Callable[[Any, Emit], Awaitable[None]]
+
+
+class Stage:
+    """
+    A pipeline stage that processes items from its input channel with a fixed number of workers.
+
+    Keeps track of statistics that can be used to tune the number of workers of each stage.
+    """
+
+    def __init__(self, name: str, workers: int, handler: Handler):
+        self.name = name
+        self.workers = workers
+        self.handler = handler
+        self.processed = 0
+        self.busy_time = 0.0
+        """Time spent processing items, excluding time spent waiting for the next stage to accept results"""
+        self.max_queue_depth = 0
+        self.receive_channel: MemoryReceiveChannel | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of items waiting in the input channel of this stage"""
+        if self.receive_channel is None:
+            return 0
+        return self.receive_channel.statistics().current_buffer_used
+
+    def utilization(self, elapsed: float) -> float:
+        """Fraction of the elapsed time that the workers of this stage spent processing items"""
+        if elapsed <= 0:
+            return 0.0
+        return self.busy_time / (elapsed * self.workers)
+
+    def start(
+        self,
+        nursery: trio.Nursery,
+        receive_channel: MemoryReceiveChannel,
+        send_channel: MemorySendChannel | None,
+    ):
+        self.receive_channel = receive_channel
+        for _ in range(self.workers):
+            nursery.start_soon(
+                self._worker,
+                receive_channel.clone(),
+                send_channel.clone() if send_channel is not None else None,
+            )
+        receive_channel.close()
+        if send_channel is not None:
+            send_channel.close()
+
+    async def _worker(self, receive_channel: MemoryReceiveChannel, send_channel: MemorySendChannel | None):
+        blocked_time = 0.0
+
+        async def emit(result: Any):
+            nonlocal blocked_time
+            if send_channel is None:
+                raise RuntimeError(f'Stage {self.name} has no output channel')
+            start = trio.current_time()
+            await send_channel.send(result)
+            blocked_time += trio.current_time() - start
+
+        async with receive_channel:
+            try:
+                async for item in receive_channel:
+                    self.max_queue_depth = max(self.max_queue_depth, self.queue_depth + 1)
+                    blocked_time = 0.0
+                    start = trio.current_time()
+                    await self.handler(item, emit)
+                    self.busy_time += trio.current_time() - start - blocked_time
+                    self.processed += 1
+            finally:
+                if send_channel is not None:
+                    await send_channel.aclose()
+
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded memory channels.
+
+    Items emitted by the source are passed through all stages in order.
+    Each stage has its own workers and passes its results on to the next stage by emitting them,
+    which blocks while the input buffer of the next stage is full.
+    """
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.stages: list[Stage] = []
+        self.elapsed = 0.0
+
+    def add_stage(self, name: str, workers: int, handler: Handler) -> Stage:
+        stage = Stage(name, workers, handler)
+        self.stages.append(stage)
+        return stage
+
+    async def run(self, source: Callable[[Emit], Awaitable[None]]):
+        """
+        Run the pipeline until the source is exhausted and all stages have processed their items.
+        """
+        start = trio.current_time()
+        async with trio.open_nursery() as nursery:
+            source_send_channel, receive_channel = trio.open_memory_channel(self.buffer_size)
+            for stage in self.stages[:-1]:
+                send_channel, next_receive_channel = trio.open_memory_channel(self.buffer_size)
+                stage.start(nursery, receive_channel, send_channel)
+                receive_channel = next_receive_channel
+            self.stages[-1].start(nursery, receive_channel, None)
+
+            async with source_send_channel:
+                await source(source_send_channel.send)
+        self.elapsed = trio.current_time() - start
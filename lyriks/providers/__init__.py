@@ -1,6 +1,7 @@
 from .bugs import Bugs
 from .genie import Genie
-from .provider import Provider, ProviderFactory
+from .multi_provider import MultiProvider, MultiProviderFactory
+from .provider import Provider, ProviderFactory, SyncProvider, SyncProviderFactory
 from .qqm import QQMusic
 from .vibe import Vibe
 
@@ -8,6 +9,10 @@ from .vibe import Vibe
 __all__ = [
     'Provider',
     'ProviderFactory',
+    'SyncProvider',
+    'SyncProviderFactory',
+    'MultiProvider',
+    'MultiProviderFactory',
     'Bugs',
     'Genie',
     'QQMusic',
@@ -1,18 +1,33 @@
+import json
+import os
 import time
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
+from functools import partial
 from json import JSONDecodeError
+from weakref import WeakKeyDictionary
 
+import trio
 from httpx import AsyncClient as HttpClient
-from httpx import RequestError
+from httpx import URL, Request, RequestError, Response
 from stamina import retry
 
+from lyriks.http.cache_transport import register_response_validator
 from lyriks.lyrics import Lyrics
+from lyriks.providers.api.error import ProviderError, check_response
 from lyriks.providers.api.song import Song
+from lyriks.util import Batcher, SingleFlight, get_cache_dir
 
 BUGS_API_URL = "https://mapi.bugs.co.kr/music/5/multi/invoke/map"
 BUGS_ACCESS_TOKEN_URL = "https://secure.bugs.co.kr/api/5/appToken"
 BUGS_APP_CLIENT_SECRET = "d33b!z7xeu"
 
+BATCH_WINDOW = 0.05  # seconds
+BATCH_MAX_SIZE = 20  # calls per request
+
+TOKEN_FILENAME = 'bugs-token.json'
+TOKEN_EXPIRY_MARGIN = 60  # seconds before expiry after which a token isn't used anymore
+TOKEN_REFRESH_AHEAD = 10 * 60  # seconds before expiry after which a new token is fetched in the background
+
 SOURCE = 'bugs'
 
 
@@ -44,8 +59,17 @@ class BugsSong(Song):
 
         return cls(id=track_id, album_index=album_index, title=title, artists=artists, lyrics=lyrics)
 
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BugsSong':
+        lyrics = data.get('lyrics')
+        return cls(**(data | {'lyrics': Lyrics(**lyrics) if lyrics else None}))
+
 
 _cached_token: BugsApiAccessToken | None = None
+_token_refresh_at = 0  # Unix timestamp after which the token is refreshed in the background
+_token_loaded = False
+_token_refresh = SingleFlight()
+_background_refresh_running = False
 
 
 async def get_api_token(http_client: HttpClient) -> BugsApiAccessToken:
@@ -53,6 +77,7 @@ async def get_api_token(http_client: HttpClient) -> BugsApiAccessToken:
         response = (
             await http_client.post(
                 BUGS_ACCESS_TOKEN_URL,
+                headers={'Cache-Control': 'no-store'},
                 params={
                     'client_id': 'bugsapp_credentials_android',
                     'client_secret': BUGS_APP_CLIENT_SECRET,
@@ -76,46 +101,182 @@ async def get_api_token(http_client: HttpClient) -> BugsApiAccessToken:
     )
 
 
+def _load_token() -> BugsApiAccessToken | None:
+    """
+    Load the token persisted by a previous run, if there is one.
+    """
+    try:
+        with open(get_cache_dir() / TOKEN_FILENAME, encoding='utf-8') as file:
+            data = json.load(file)
+        return BugsApiAccessToken(access_token=str(data['access_token']), expires_at=int(data['expires_at']))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_token(token: BugsApiAccessToken):
+    """
+    Persist the token for later runs. The file is only readable by the current user, and replaced atomically.
+    """
+    try:
+        path = get_cache_dir() / TOKEN_FILENAME
+        temp_path = path.with_suffix('.tmp')
+        temp_path.unlink(missing_ok=True)
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(asdict(token), file)
+        os.replace(temp_path, path)
+    except OSError:
+        # Without the file, the next run just fetches a new token
+        pass
+
+
+def _set_token(token: BugsApiAccessToken | None):
+    global _cached_token, _token_refresh_at
+    _cached_token = token
+    if token is not None:
+        # Refresh no earlier than halfway through the remaining lifetime, to avoid refreshing over and over
+        now = int(time.time())
+        _token_refresh_at = max(token.expires_at - TOKEN_REFRESH_AHEAD, (now + token.expires_at) // 2)
+
+
+async def _refresh_token(http_client: HttpClient) -> BugsApiAccessToken:
+    token = await get_api_token(http_client)
+    _set_token(token)
+    _save_token(token)
+    return token
+
+
+async def _refresh_token_in_background(http_client: HttpClient):
+    global _background_refresh_running
+    try:
+        # The system task outlives the caller, the client may have been closed by its owner in the meantime
+        if http_client.is_closed:
+            return
+        await _token_refresh.run(BUGS_ACCESS_TOKEN_URL, _refresh_token, http_client)
+    except Exception:
+        # The current token is still valid, so the refresh is attempted again with the next request
+        pass
+    finally:
+        _background_refresh_running = False
+
+
 async def _get_cached_token(http_client: HttpClient) -> str:
-    global _cached_token
-    if _cached_token is None or _cached_token.expires_at <= int(time.time()):
-        _cached_token = await get_api_token(http_client)
+    """
+    Get a valid access token, from memory, the token file, or the token endpoint.
+
+    Concurrent callers share a single token request. Shortly before the token expires, a new one is fetched
+    in the background, so that requests don't have to wait for it.
+    """
+    global _token_loaded, _background_refresh_running
+    if not _token_loaded:
+        _token_loaded = True
+        _set_token(_load_token())
+
+    now = int(time.time())
+    if _cached_token is None or _cached_token.expires_at - TOKEN_EXPIRY_MARGIN <= now:
+        token = await _token_refresh.run(BUGS_ACCESS_TOKEN_URL, _refresh_token, http_client)
+        return token.access_token
+
+    if _token_refresh_at <= now and not _background_refresh_running and not http_client.is_closed:
+        _background_refresh_running = True
+        trio.lowlevel.spawn_system_task(_refresh_token_in_background, http_client)
     return _cached_token.access_token
 
 
+def _discard_token(access_token: str):
+    """
+    Discard a token rejected by the API, e.g. if it was revoked before its expiry.
+    """
+    if _cached_token is not None and _cached_token.access_token == access_token:
+        _set_token(None)
+
+
 @retry(on=RequestError, attempts=3)
 async def _bugs_request(http_client: HttpClient, requests: list[dict]) -> list[dict]:
     token = await _get_cached_token(http_client)
 
+    response = await _post_requests(http_client, requests, token)
+    if response.status_code == 401:
+        _discard_token(token)
+        token = await _get_cached_token(http_client)
+        response = await _post_requests(http_client, requests, token)
+
     try:
-        response = (
-            await http_client.post(
-                BUGS_API_URL,
-                headers={
-                    'Content-Type': 'application/json; charset=UTF-8',
-                    'Authorization': f'Bearer {token}',
-                },
-                json=requests,
-            )
-        ).json()
+        data = check_response(response).json()
     except JSONDecodeError:
-        return []
+        raise ProviderError('Invalid response') from None
+
+    try:
+        return data['list']
+    except KeyError:
+        raise ProviderError(f'Request failed: {data!r:.200}') from None
+
+
+async def _post_requests(http_client: HttpClient, requests: list[dict], token: str) -> Response:
+    return await http_client.post(
+        BUGS_API_URL,
+        headers={
+            'Content-Type': 'application/json; charset=UTF-8',
+            'Authorization': f'Bearer {token}',
+        },
+        json=requests,
+    )
+
+
+def _is_successful_response(request: Request, response: Response) -> bool:
+    """
+    Check if all calls of a multi-invoke request succeeded, as errors are reported with status 200 as well.
+    """
+    try:
+        calls = json.loads(request.content)
+        results = response.json()['list']
+    except (JSONDecodeError, KeyError, TypeError):
+        return False
+    if not isinstance(results, list) or len(results) != len(calls):
+        return False
+    return all(isinstance(result, dict) and call['id'] in result for call, result in zip(calls, results))
+
+
+register_response_validator(URL(BUGS_API_URL).host, _is_successful_response)
 
-    return response.get('list', [])
+
+async def _bugs_batch_request(http_client: HttpClient, requests: list[dict]) -> list[dict]:
+    response = await _bugs_request(http_client, requests)
+    if len(response) != len(requests):
+        raise ProviderError(f'Expected {len(requests)} results, got {len(response)}')
+    return response
+
+
+_batchers: WeakKeyDictionary[HttpClient, Batcher[dict, dict]] = WeakKeyDictionary()
+
+
+async def _bugs_call(http_client: HttpClient, request: dict) -> dict:
+    """
+    Make a single API call, which is sent together with concurrent calls as one multi-invoke request.
+
+    :return: The result of the call.
+    :raises ProviderError: if the request or the call failed.
+    """
+    batcher = _batchers.get(http_client)
+    if batcher is None:
+        batcher = Batcher(partial(_bugs_batch_request, http_client), BATCH_WINDOW, BATCH_MAX_SIZE)
+        _batchers[http_client] = batcher
+    result = await batcher.submit(request)
+    # Successful calls return their result under the ID of the call
+    if not isinstance(result, dict) or request['id'] not in result:
+        raise ProviderError(f'Call {request["id"]} failed: {result!r:.200}')
+    return result
 
 
 async def get_album_songs(http_client: HttpClient, album_id: int) -> list[BugsSong]:
-    response = await _bugs_request(
+    response = await _bugs_call(
         http_client,
-        [{'id': 'album_track', 'args': {'album_id': album_id, 'result_type': 'LIST'}}],
+        {'id': 'album_track', 'args': {'album_id': album_id, 'result_type': 'LIST'}},
     )
 
-    if not response:
-        return []
-
     try:
-        tracks = response[0]['album_track']['list']
-    except (IndexError, KeyError):
+        tracks = response['album_track']['list']
+    except (KeyError, TypeError):
         return []
 
     try:
@@ -125,17 +286,14 @@ async def get_album_songs(http_client: HttpClient, album_id: int) -> list[BugsSo
 
 
 async def get_song_info(http_client: HttpClient, song_id: int) -> BugsSong | None:
-    response = await _bugs_request(
+    response = await _bugs_call(
         http_client,
-        [{'id': 'track', 'args': {'track_id': song_id, 'result_type': 'DETAIL'}}],
+        {'id': 'track', 'args': {'track_id': song_id, 'result_type': 'DETAIL'}},
     )
 
-    if not response:
-        return None
-
     try:
-        track_info = response[0]['track']['result']
-    except (IndexError, KeyError):
+        track_info = response['track']['result']
+    except (KeyError, TypeError):
         return None
 
     return BugsSong.from_track_info(track_info)
@@ -147,17 +305,14 @@ async def get_song_lyrics(http_client: HttpClient, song: BugsSong) -> Lyrics | N
         return song.lyrics
 
     # Fetch lyrics independently
-    response = await _bugs_request(
+    response = await _bugs_call(
         http_client,
-        [{'id': 'track_lyrics', 'args': {'track_id': song.id}}],
+        {'id': 'track_lyrics', 'args': {'track_id': song.id}},
     )
 
-    if not response:
-        return None
-
     try:
-        lyrics_data = response[0]['track_lyrics']['result']
-    except (IndexError, KeyError):
+        lyrics_data = response['track_lyrics']['result']
+    except (KeyError, TypeError):
         return None
 
     if not lyrics_data:
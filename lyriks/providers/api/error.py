@@ -0,0 +1,16 @@
+from httpx import Response
+
+
+class ProviderError(Exception):
+    """
+    Raised if a request to a provider API failed, as opposed to the provider not having the requested data.
+    """
+
+
+def check_response(response: Response) -> Response:
+    """
+    Raise a ProviderError if the response indicates a temporary failure of the API, such as an overloaded server.
+    """
+    if response.is_server_error or response.status_code == 429:
+        raise ProviderError(f'{response.url.host} responded with status {response.status_code}')
+    return response
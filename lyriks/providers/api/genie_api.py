@@ -8,6 +8,8 @@ from httpx import RequestError
 from stamina import retry
 
 from lyriks.lyrics import Lyrics
+from lyriks.util import SingleFlight
+from .error import ProviderError, check_response
 from .song import Song
 
 GENIE_ALBUM_API_URL = 'https://app.genie.co.kr/song/j_AlbumSongList.json?axnm={album_id:d}'
@@ -16,6 +18,9 @@ GENIE_STREAM_INFO_API_URL = 'https://stm.genie.co.kr/player/j_StmInfo.json?xgnm=
 
 CURL_USER_AGENT = 'curl/8.7.1'  # for whatever reason, this works, but the python-requests UA doesn't
 
+STREAM_INFO_CACHE_SIZE = 1000  # songs
+SONG_INDEX_SIZE = 1000  # songs
+
 SOURCE = 'genie'
 
 
@@ -24,17 +29,25 @@ class GenieSong(Song):
     pass
 
 
+# Stream info by song ID, limited to the most recently fetched songs, as it includes the static lyrics
+stream_info_cache: dict[int, dict] = {}
+# Song by song ID, for the songs of the albums fetched to look up songs by ID, limited like the stream info cache
+song_index: dict[int, GenieSong] = {}
+
+in_flight = SingleFlight()
+
+
 @retry(on=RequestError, attempts=3)
 async def get_album_songs(http_client: HttpClient, album_id: int) -> list[GenieSong] | None:
     try:
-        response = (
+        response = check_response(
             await http_client.get(
                 GENIE_ALBUM_API_URL.format(album_id=album_id),
                 headers={'User-Agent': CURL_USER_AGENT},
             )
         ).json()
     except JSONDecodeError:
-        return None
+        raise ProviderError('Invalid album response') from None
 
     try:
         songs = list(response['DATA1']['DATA'])
@@ -69,17 +82,37 @@ async def get_album_songs(http_client: HttpClient, album_id: int) -> list[GenieS
     return result
 
 
-@retry(on=RequestError, attempts=3)
 async def get_stream_info(http_client: HttpClient, song_id: int) -> dict | None:
+    """
+    Get the stream info of a song, which includes its album ID and static lyrics.
+    """
+    if song_id in stream_info_cache:
+        return stream_info_cache[song_id]
+
+    return await in_flight.run(song_id, _fetch_stream_info, http_client, song_id)
+
+
+async def _fetch_stream_info(http_client: HttpClient, song_id: int) -> dict | None:
+    stream_info = await _request_stream_info(http_client, song_id)
+    if stream_info is not None:
+        stream_info_cache[song_id] = stream_info
+        if len(stream_info_cache) > STREAM_INFO_CACHE_SIZE:
+            # Evict the least recently fetched song
+            del stream_info_cache[next(iter(stream_info_cache))]
+    return stream_info
+
+
+@retry(on=RequestError, attempts=3)
+async def _request_stream_info(http_client: HttpClient, song_id: int) -> dict | None:
     try:
-        response = (
+        response = check_response(
             await http_client.get(
                 GENIE_STREAM_INFO_API_URL.format(song_id=song_id),
                 headers={'User-Agent': CURL_USER_AGENT},
             )
         ).json()
     except JSONDecodeError:
-        return None
+        raise ProviderError('Invalid stream info response') from None
 
     try:
         stream_info = response['DataSet']['DATA'][0]
@@ -90,6 +123,10 @@ async def get_stream_info(http_client: HttpClient, song_id: int) -> dict | None:
 
 
 async def get_song_info(http_client: HttpClient, song_id: int) -> GenieSong | None:
+    # Songs of albums already fetched by a lookup don't need any request
+    if song_id in song_index:
+        return song_index[song_id]
+
     stream_info = await get_stream_info(http_client, song_id)
     if stream_info is None:
         return None
@@ -99,33 +136,36 @@ async def get_song_info(http_client: HttpClient, song_id: int) -> GenieSong | No
     except (KeyError, ValueError):
         return None
 
-    genie_songs = await get_album_songs(http_client, album_id)
-    if not genie_songs:
+    songs = await get_album_songs(http_client, album_id)
+    if not songs:
         return None
 
-    return next((s for s in genie_songs if s.id == song_id), None)
+    for genie_song in songs:
+        song_index[genie_song.id] = genie_song
+    while len(song_index) > SONG_INDEX_SIZE:
+        # Evict the least recently indexed song
+        del song_index[next(iter(song_index))]
+
+    return next((genie_song for genie_song in songs if genie_song.id == song_id), None)
 
 
 @retry(on=RequestError, attempts=3)
 async def get_song_lyrics(http_client: HttpClient, song: GenieSong) -> Lyrics | None:
     # Try to fetch synced lyrics
-    try:
-        response = (
-            await http_client.get(
-                GENIE_LYRICS_API_URL.format(song_id=song.id),
-                headers={'User-Agent': CURL_USER_AGENT},
-            )
-        ).text
-    except RequestError:
-        return None
-
-    if response is not None and response.startswith('GenieCallback('):
+    response = check_response(
+        await http_client.get(
+            GENIE_LYRICS_API_URL.format(song_id=song.id),
+            headers={'User-Agent': CURL_USER_AGENT},
+        )
+    ).text
+
+    if response.startswith('GenieCallback('):
         # We (probably) got synced lyrics
         response = response.removeprefix('GenieCallback(').removesuffix(');')
         try:
             raw_lyrics = json.loads(response)
         except JSONDecodeError:
-            return None
+            raise ProviderError('Invalid synced lyrics response') from None
 
         # Convert timestamps and cleanup lines
         lyrics_dict: dict[int, str] = {int(timestamp): line.strip() for timestamp, line in raw_lyrics.items()}
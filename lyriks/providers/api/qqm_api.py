@@ -2,20 +2,27 @@ import json
 import random
 import re
 import zlib
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import partial
 from json import JSONDecodeError
+from weakref import WeakKeyDictionary
 
 import lxml.etree as xml
 import pyqqmusicdes
+import trio
 from httpx import AsyncClient as HttpClient
-from httpx import RequestError
+from httpx import URL, Request, RequestError, Response
 from lxml.etree import XMLParser
 from stamina import retry
 
+from lyriks.http.cache_transport import register_response_validator
 from lyriks.lib.zzc_sign import zzc_sign
 from lyriks.lyrics import Lyrics
 from lyriks.lyrics.util import format_lrc_timestamp
+from lyriks.util import Batcher, get_cache_dir
+from .error import ProviderError, check_response
 from .song import Song
 
 xml.set_default_parser(XMLParser(no_network=True, recover=True, remove_blank_text=True))
@@ -30,13 +37,20 @@ QQM_COMM = {
     'notice': 0,
     'platform': 'yqq.json',
     'needNewCode': 1,
-    'uin': ''.join(random.sample('1234567890', 10)),
     'g_tk_new_20200303': 1077614320,
     'g_tk': 1077614320,
 }
 QQM_LYRICS_API_URL = "https://c.y.qq.com/qqmusic/fcgi-bin/lyric_download.fcg"
 QQM_DES_KEY = b'!@#)(*$%123ZXC!@!@#)(NHL'
 
+UIN_FILENAME = 'qqm-uin'
+
+ALBUM_PAGE_SIZE = 100  # songs
+BATCH_WINDOW = 0.05  # seconds
+BATCH_MAX_SIZE = 20  # modules per request
+DECODE_BATCH_WINDOW = 0.01  # seconds
+DECODE_BATCH_MAX_SIZE = 50  # lyrics per batch
+
 CHROME_USER_AGENT = (
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
 )
@@ -81,14 +95,50 @@ class QQMId(str):
         self.id = int(value) if is_digit else 0
 
 
+_uin: str | None = None
+
+
+def _get_uin() -> str:
+    """
+    Get the random user ID sent with every request.
+
+    The ID is part of the request body, so it is persisted in the cache directory to keep the cache keys
+    of the responses the same across runs.
+    """
+    global _uin
+    if _uin is not None:
+        return _uin
+
+    try:
+        path = get_cache_dir() / UIN_FILENAME
+    except OSError:
+        path = None
+    try:
+        uin = path.read_text(encoding='utf-8').strip() if path is not None else ''
+    except OSError:
+        uin = ''
+    if len(uin) != 10 or not uin.isdigit():
+        uin = ''.join(random.sample('1234567890', 10))
+        try:
+            if path is not None:
+                path.write_text(uin, encoding='utf-8')
+        except OSError:
+            # Without the file, the next run just uses a new ID
+            pass
+    _uin = uin
+    return uin
+
+
 @retry(on=RequestError, attempts=3)
 async def _qqm_request(http_client: HttpClient, modules: list[dict]) -> list[dict]:
-    request = dict([('comm', QQM_COMM)] + [(f'req_{i + 1}', module) for i, module in enumerate(modules)])
+    request = dict(
+        [('comm', QQM_COMM | {'uin': _get_uin()})] + [(f'req_{i + 1}', module) for i, module in enumerate(modules)]
+    )
     body = json.dumps(request)
     signature = zzc_sign(body)
 
     try:
-        response = (
+        response = check_response(
             await http_client.post(
                 QQM_API_URL,
                 params={
@@ -107,59 +157,128 @@ async def _qqm_request(http_client: HttpClient, modules: list[dict]) -> list[dic
             )
         ).json()
     except JSONDecodeError:
-        return []
+        raise ProviderError('Invalid response') from None
 
     try:
         response_modules = [response[f'req_{i + 1}'] for i in range(len(modules))]
     except KeyError:
-        return []
+        raise ProviderError(f'Request failed with code {response.get("code")}') from None
 
     return response_modules
 
 
-async def get_album_songs(http_client: HttpClient, album_qid: QQMId) -> list[QQMSong]:
-    response = await _qqm_request(
+def _is_successful_response(request: Request, response: Response) -> bool:
+    """
+    Check if the request and all module calls succeeded, as errors are reported with status 200 as well.
+    """
+    try:
+        data = response.json()
+    except JSONDecodeError:
+        return False
+    if not isinstance(data, dict):
+        return False
+    modules = [module for key, module in data.items() if key.startswith('req_')]
+    return data.get('code') == 0 and all(isinstance(module, dict) and module.get('code') == 0 for module in modules)
+
+
+register_response_validator(URL(QQM_API_URL).host, _is_successful_response)
+
+
+_batchers: WeakKeyDictionary[HttpClient, Batcher[dict, dict]] = WeakKeyDictionary()
+
+
+async def _qqm_call(http_client: HttpClient, module: dict) -> dict:
+    """
+    Call a single module, which is sent together with concurrent calls as one signed request.
+
+    :return: The response of the module.
+    :raises ProviderError: if the request or the module call failed.
+    """
+    batcher = _batchers.get(http_client)
+    if batcher is None:
+        batcher = Batcher(partial(_qqm_request, http_client), BATCH_WINDOW, BATCH_MAX_SIZE)
+        _batchers[http_client] = batcher
+    response = await batcher.submit(module)
+    if response.get('code') != 0:
+        raise ProviderError(f'Call of {module["module"]} failed with code {response.get("code")}')
+    return response
+
+
+async def _get_album_song_page(http_client: HttpClient, album_qid: QQMId, begin: int) -> tuple[list[dict], int] | None:
+    """
+    Fetch a page of songs of an album.
+
+    :return: The song infos on the page and the total number of songs of the album, or None if the album is invalid.
+    """
+    response = await _qqm_call(
         http_client,
-        [
-            {
-                'module': 'music.musichallAlbum.AlbumSongList',
-                'method': 'GetAlbumSongList',
-                'param': {'albumMid': album_qid.mid, 'albumID': album_qid.id, 'begin': 0, 'num': 100, 'order': 2},
-            }
-        ],
+        {
+            'module': 'music.musichallAlbum.AlbumSongList',
+            'method': 'GetAlbumSongList',
+            'param': {
+                'albumMid': album_qid.mid,
+                'albumID': album_qid.id,
+                'begin': begin,
+                'num': ALBUM_PAGE_SIZE,
+                'order': 2,
+            },
+        },
     )
 
-    if not response:
-        return []
-
     try:
-        song_infos = [song['songInfo'] for song in response[0]['data']['songList']]
-    except (IndexError, KeyError):
+        data = response['data']
+        song_infos = [song['songInfo'] for song in data['songList']]
+    except (KeyError, TypeError):
+        return None
+
+    return song_infos, data.get('totalNum', len(song_infos))
+
+
+async def get_album_songs(http_client: HttpClient, album_qid: QQMId) -> list[QQMSong]:
+    first_page = await _get_album_song_page(http_client, album_qid, 0)
+    if first_page is None:
+        return []
+    song_infos, total = first_page
+
+    # Fetch the remaining pages concurrently, which are then sent as a single request
+    page_size = len(song_infos)
+    pages: list[list[dict] | None] = [song_infos]
+    if page_size and total > page_size:
+        offsets = range(page_size, total, page_size)
+        pages += [None] * len(offsets)
+
+        async def fetch_page(index: int, begin: int):
+            page = await _get_album_song_page(http_client, album_qid, begin)
+            if page is not None:
+                pages[index] = page[0]
+
+        async with trio.open_nursery() as nursery:
+            for i, begin in enumerate(offsets, start=1):
+                nursery.start_soon(fetch_page, i, begin)
+
+    # Incomplete albums would fail to match anyway
+    complete_pages = [page for page in pages if page is not None]
+    if len(complete_pages) != len(pages):
         return []
 
     try:
-        return [QQMSong.from_song_info(song_info) for song_info in song_infos]
+        return [QQMSong.from_song_info(song_info) for page in complete_pages for song_info in page]
     except ValueError:
         return []
 
 
 async def get_song_info(http_client: HttpClient, song_id: int) -> QQMSong | None:
-    response = await _qqm_request(
+    response = await _qqm_call(
         http_client,
-        [
-            {
-                "module": "music.trackInfo.UniformRuleCtrl",
-                "method": "CgiGetTrackInfo",
-                "param": {"ids": [song_id], "types": [0]},
-            }
-        ],
+        {
+            "module": "music.trackInfo.UniformRuleCtrl",
+            "method": "CgiGetTrackInfo",
+            "param": {"ids": [song_id], "types": [0]},
+        },
     )
 
-    if not response:
-        return None
-
     try:
-        song_info = response[0]['data']['tracks'][0]
+        song_info = response['data']['tracks'][0]
     except (IndexError, KeyError):
         return None
 
@@ -175,7 +294,7 @@ async def get_song_lyrics(http_client: HttpClient, song: QQMSong) -> Lyrics | No
         "musicid": song.id,
     }
 
-    response = (
+    response = check_response(
         await http_client.post(
             QQM_LYRICS_API_URL,
             headers={
@@ -188,35 +307,22 @@ async def get_song_lyrics(http_client: HttpClient, song: QQMSong) -> Lyrics | No
         )
     ).text
 
-    if response is None:
-        return None
-
     # Remove surrounding comment tags
     response_text = response.replace("<!--", "").replace("-->", "")
 
     # Parse main XML response
     root = xml.fromstring(response_text)
+    if root is None:
+        raise ProviderError('Invalid lyrics response')
     lyric_node = root.find(".//lyric")
     if lyric_node is None:
         return None
 
     content_node = lyric_node.find('content')
-    if content_node is None:
+    if content_node is None or content_node.text is None:
         return None
 
-    content_text = _decrypt_content_node(content_node)
-    if content_text is None:
-        return None
-
-    # The XML is malformed (unescaped quotes inside attribute) and contains newlines.
-    # Thus, as standard XML parsers would fail, we use a regex to extract the content.
-    match = LYRIC_CONTENT_REGEX.search(content_text)
-    if not match:
-        return None
-
-    lyric_content = match.group(1)
-    lines = lyric_content.splitlines()
-    lyric_data = _convert_qrc_to_lrc(lines)
+    lyric_data = await _decode_lyrics(content_node.text)
     if lyric_data is None:
         return None
 
@@ -231,16 +337,77 @@ async def get_song_lyrics(http_client: HttpClient, song: QQMSong) -> Lyrics | No
     )
 
 
-def _decrypt_content_node(content_node) -> str | None:
-    content = content_node.text
-    if content is None:
+def set_decode_executor(executor: Executor | None):
+    """
+    Set the executor to decode lyrics in, e.g. a ProcessPoolExecutor, or None to decode them in a worker thread.
+    """
+    global decode_executor
+    decode_executor = executor
+
+
+decode_executor: Executor | None = None
+
+
+async def _decode_lyrics_batch(contents: list[str]) -> list[tuple[dict[str, str], list[str]] | None]:
+    if decode_executor is None:
+        return await trio.to_thread.run_sync(decode_lyrics_batch, contents)
+
+    future = decode_executor.submit(decode_lyrics_batch, contents)
+    return await trio.to_thread.run_sync(future.result)
+
+
+_decode_batcher: Batcher[str, tuple[dict[str, str], list[str]] | None] = Batcher(
+    _decode_lyrics_batch, DECODE_BATCH_WINDOW, DECODE_BATCH_MAX_SIZE
+)
+
+
+async def _decode_lyrics(content: str) -> tuple[dict[str, str], list[str]] | None:
+    """
+    Decode encrypted lyrics without blocking the event loop, together with concurrently received lyrics.
+    """
+    return await _decode_batcher.submit(content)
+
+
+def decode_lyrics_batch(contents: list[str]) -> list[tuple[dict[str, str], list[str]] | None]:
+    """
+    Decode several encrypted lyrics at once, see decode_lyrics.
+    """
+    return [decode_lyrics(content) for content in contents]
+
+
+def decode_lyrics(content: str) -> tuple[dict[str, str], list[str]] | None:
+    """
+    Decode the encrypted content of a lyrics response and convert it to LRC.
+
+    This is CPU-bound and has no side effects, so that it can run in worker processes.
+
+    :param content: The hex-encoded content of the lyric node.
+    :return: The metadata and the LRC lines, or None if the content is invalid.
+    """
+    content_text = _decrypt_content(content)
+    if content_text is None:
+        return None
+
+    # The XML is malformed (unescaped quotes inside attribute) and contains newlines.
+    # Thus, as standard XML parsers would fail, we use a regex to extract the content.
+    match = LYRIC_CONTENT_REGEX.search(content_text)
+    if not match:
         return None
 
+    lyric_content = match.group(1)
+    lines = lyric_content.splitlines()
+    return _convert_qrc_to_lrc(lines)
+
+
+def _decrypt_content(content: str) -> str | None:
     content = content.strip()
     if len(content) == 0:
         return None
 
-    buf = bytes.fromhex(content)
+    try:
+        buf = bytes.fromhex(content)
+    except ValueError:
+        return None
 
     res = pyqqmusicdes.decrypt_des(buf, QQM_DES_KEY)
     if res != 0:
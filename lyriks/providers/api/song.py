@@ -1,5 +1,8 @@
 from abc import ABC
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from typing import TypeVar
+
+SongT = TypeVar('SongT', bound='Song')
 
 
 @dataclass
@@ -11,3 +14,13 @@ class Song(ABC):
     id: int
     album_index: int
     title: str
+
+    def to_dict(self) -> dict:
+        """
+        Convert the song to a JSON-serializable dict, which can be read again with from_dict.
+        """
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls: type[SongT], data: dict) -> SongT:
+        return cls(**data)
@@ -6,6 +6,7 @@ from httpx import RequestError
 from stamina import retry
 
 from lyriks.lyrics import Lyrics
+from .error import ProviderError, check_response
 from .song import Song
 
 VIBE_LYRICS_API_URL = 'https://apis.naver.com/vibeWeb/musicapiweb/vibe/v4/lyric/{song_id:d}'
@@ -35,14 +36,14 @@ class VibeSong(Song):
 @retry(on=RequestError, attempts=3)
 async def get_album_songs(http_client: HttpClient, album_id: int) -> list[VibeSong]:
     try:
-        response = (
+        response = check_response(
             await http_client.get(
                 VIBE_ALBUM_TRACKS_API_URL.format(album_id=album_id),
                 headers={'Accept': 'application/json'},
             )
         ).json()
     except JSONDecodeError:
-        return []
+        raise ProviderError('Invalid album response') from None
 
     try:
         tracks = response['response']['result']['tracks']
@@ -58,14 +59,14 @@ async def get_album_songs(http_client: HttpClient, album_id: int) -> list[VibeSo
 @retry(on=RequestError, attempts=3)
 async def get_song_info(http_client: HttpClient, song_id: int) -> VibeSong | None:
     try:
-        response = (
+        response = check_response(
             await http_client.get(
                 VIBE_TRACK_API_URL.format(song_id=song_id),
                 headers={'Accept': 'application/json'},
             )
         ).json()
     except JSONDecodeError:
-        return None
+        raise ProviderError('Invalid track response') from None
 
     try:
         track_info = response['response']['result']['track']
@@ -81,14 +82,14 @@ async def get_song_info(http_client: HttpClient, song_id: int) -> VibeSong | Non
 @retry(on=RequestError, attempts=3)
 async def get_song_lyrics(http_client: HttpClient, song: VibeSong) -> Lyrics | None:
     try:
-        lyrics_response = (
+        lyrics_response = check_response(
             await http_client.get(
                 VIBE_LYRICS_API_URL.format(song_id=song.id),
                 headers={'Accept': 'application/json'},
             )
         ).json()
     except JSONDecodeError:
-        return None
+        raise ProviderError('Invalid lyrics response') from None
 
     try:
         lyrics_data = lyrics_response['response']['result']['lyric']
@@ -15,10 +15,12 @@ class Bugs(Provider[int, BugsSong]):
     """
 
     provider_domain = 'music.bugs.co.kr'
+    api_domain = 'bugs.co.kr'
     album_pattern = re.compile(r'https://music.bugs.co.kr/album/(\d+).*')
+    song_type = BugsSong
 
     def extract_album_id(self, release: Release) -> int | None:
-        return release.extract_url_id(self.album_pattern)
+        return release.get_album_int_id(self.provider_domain)
 
     async def fetch_album_songs(self, album_id: int) -> list[BugsSong] | None:
         return await bugs_api.get_album_songs(self.http_client, album_id)
@@ -0,0 +1,46 @@
+from typing import Any
+
+from lyriks.disk_cache import DiskCache
+
+CACHE_ENTITY_SONGS = 'songs'
+CACHE_ENTITY_LYRICS = 'lyrics'
+CACHE_ENTITY_NO_LYRICS = 'no-lyrics'
+CACHE_ENTITY_RESPONSES = 'responses'
+
+# Missing lyrics are kept for a shorter time, as they are the most likely to be added by a provider.
+# The TTL of responses applies to API responses that can't be revalidated, see RevalidatingCacheTransport.
+DEFAULT_CACHE_TTLS: dict[str, float] = {
+    CACHE_ENTITY_SONGS: 7 * 24 * 60 * 60,
+    CACHE_ENTITY_LYRICS: 30 * 24 * 60 * 60,
+    CACHE_ENTITY_NO_LYRICS: 24 * 60 * 60,
+    CACHE_ENTITY_RESPONSES: 24 * 60 * 60,
+}
+
+
+def set_cache(cache: DiskCache | None, ttls: dict[str, float] | None = None):
+    """
+    Set the persistent cache for album songs and lyrics of all providers, or None to disable it.
+
+    :param ttls: The maximum age of cached entries in seconds per entity type,
+                 overriding the defaults from DEFAULT_CACHE_TTLS. A TTL of 0 disables caching for an entity type.
+    """
+    global persistent_cache, persistent_cache_ttls
+    persistent_cache = cache
+    persistent_cache_ttls = DEFAULT_CACHE_TTLS | (ttls or {})
+
+
+persistent_cache: DiskCache | None = None
+persistent_cache_ttls: dict[str, float] = DEFAULT_CACHE_TTLS
+
+
+def get_cached(entity: str, provider_key: str, key: str) -> Any | None:
+    ttl = persistent_cache_ttls[entity]
+    if persistent_cache is None or ttl <= 0:
+        return None
+    return persistent_cache.get_json(f'{entity}:{provider_key}', key, max_age=ttl)
+
+
+def set_cached(entity: str, provider_key: str, key: str, value: Any):
+    if persistent_cache is None or persistent_cache_ttls[entity] <= 0:
+        return
+    persistent_cache.set_json(f'{entity}:{provider_key}', key, value)
@@ -16,9 +16,10 @@ class Genie(Provider[int, GenieSong]):
 
     provider_domain = 'genie.co.kr'
     album_pattern = re.compile(r'https://(?:www.)?genie.co.kr/detail/albumInfo\?axnm=(\d+).*')
+    song_type = GenieSong
 
     def extract_album_id(self, release: Release) -> int | None:
-        return release.extract_url_id(self.album_pattern)
+        return release.get_album_int_id(self.provider_domain)
 
     async def fetch_album_songs(self, album_id: int) -> list[GenieSong] | None:
         return await genie_api.get_album_songs(self.http_client, album_id)
@@ -0,0 +1,156 @@
+from typing import Sequence
+
+import trio
+from httpx import AsyncClient as HttpClient
+from rich.markup import escape
+
+from lyriks.cli.console import console
+from lyriks.lyrics import Lyrics
+from lyriks.mb_client import Artist, Mbid, Release
+from .provider import Provider, ProviderFactory
+
+POLICY_SYNCED = 'synced'
+"""Prefer synced lyrics from any provider over static lyrics, then the order of the providers"""
+POLICY_PRIORITY = 'priority'
+"""Prefer lyrics from providers earlier in the order, regardless of whether they are synced"""
+
+POLICIES = (POLICY_SYNCED, POLICY_PRIORITY)
+
+
+class MultiProvider:
+    """
+    Queries several providers concurrently and picks the best lyrics according to a policy.
+
+    Lyrics are requested from all providers with a URL for the release at once.
+    As soon as no pending provider can return better lyrics than the best ones so far, the remaining requests are
+    cancelled. Implements SyncProvider, the interface of Provider used by the sync process.
+    """
+
+    def __init__(self, providers: Sequence[Provider], policy: str = POLICY_SYNCED):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown policy: {policy!r}')
+        self.providers = providers
+        self.policy = policy
+
+    @property
+    def missing_artists(self) -> dict[str, Artist]:
+        return {key: artist for provider in self.providers for key, artist in provider.missing_artists.items()}
+
+    @property
+    def missing_releases(self) -> dict[str, Release]:
+        return {key: release for provider in self.providers for key, release in provider.missing_releases.items()}
+
+    def has_artist_url(self, artist: Artist) -> bool:
+        """
+        Check if the artist has a URL relationship for any of the providers.
+        """
+        # Check all providers, so that missing URLs are recorded for each of them
+        return any([provider.has_artist_url(artist) for provider in self.providers])
+
+    async def get_mapped_provider_songs(self, track_release: Release) -> dict[Provider, dict] | None:
+        """
+        Get the songs for a track release from all providers concurrently.
+
+        :return: The mapped songs by provider, for the providers that have songs for the release, or None if none do.
+        :raises Exception: the first error of a failing provider, if no other provider has songs for the release.
+        """
+        results: dict[Provider, dict] = {}
+        errors: list[Exception] = []
+
+        async def get_songs(provider: Provider):
+            try:
+                songs = await provider.get_mapped_provider_songs(track_release)
+            except Exception as e:
+                # Don't let one failing provider affect the others
+                self._report_error(provider, 'songs', e)
+                errors.append(e)
+                return
+            if songs:
+                results[provider] = songs
+
+        async with trio.open_nursery() as nursery:
+            for provider in self.providers:
+                nursery.start_soon(get_songs, provider)
+
+        # Without any songs, the release has to be tried again later if a provider failed
+        if not results and errors:
+            raise errors[0]
+        return results or None
+
+    async def fetch_recording_lyrics(self, track_release: Release, recording_mbid: Mbid) -> Lyrics | None:
+        """
+        Fetch lyrics for a track from all providers concurrently, and return the best ones according to the policy.
+
+        :raises Exception: the first error of a failing provider, if no other provider has lyrics for the track.
+        """
+        results: dict[int, Lyrics | None] = {}
+        errors: list[Exception] = []
+
+        async def fetch(index: int, provider: Provider, cancel_scope: trio.CancelScope):
+            try:
+                results[index] = await provider.fetch_recording_lyrics(track_release, recording_mbid)
+            except Exception as e:
+                # Don't let one failing provider affect the others
+                self._report_error(provider, 'lyrics', e)
+                errors.append(e)
+                results[index] = None
+
+            if self._is_decided(results):
+                cancel_scope.cancel()
+
+        async with trio.open_nursery() as nursery:
+            for i, provider in enumerate(self.providers):
+                nursery.start_soon(fetch, i, provider, nursery.cancel_scope)
+
+        lyrics = self._best(results)[1]
+        # Missing lyrics are only certain if all providers answered
+        if lyrics is None and errors:
+            raise errors[0]
+        return lyrics
+
+    @staticmethod
+    def _report_error(provider: Provider, what: str, error: Exception):
+        console.print(f'Error: {escape(type(provider).__name__)} failed to fetch {what}: {error!r}', style='error')
+
+    def _rank(self, index: int, lyrics: Lyrics) -> tuple:
+        """
+        The rank of lyrics from the provider at the given index, lower is better.
+        """
+        if self.policy == POLICY_SYNCED:
+            return not lyrics.is_synced, index
+        return (index,)
+
+    def _best_possible_rank(self, index: int) -> tuple:
+        """
+        The best rank lyrics from the provider at the given index could have.
+        """
+        if self.policy == POLICY_SYNCED:
+            return False, index
+        return (index,)
+
+    def _best(self, results: dict[int, Lyrics | None]) -> tuple[tuple | None, Lyrics | None]:
+        ranked = [(self._rank(index, lyrics), lyrics) for index, lyrics in results.items() if lyrics is not None]
+        return min(ranked, key=lambda item: item[0], default=(None, None))
+
+    def _is_decided(self, results: dict[int, Lyrics | None]) -> bool:
+        best_rank, _ = self._best(results)
+        if best_rank is None:
+            return False
+        pending = (index for index in range(len(self.providers)) if index not in results)
+        return all(best_rank < self._best_possible_rank(index) for index in pending)
+
+
+class MultiProviderFactory:
+    """
+    Creates a MultiProvider for a list of provider factories, implements SyncProviderFactory.
+    """
+
+    def __init__(self, provider_factories: Sequence[ProviderFactory], policy: str = POLICY_SYNCED):
+        self.provider_factories = provider_factories
+        self.policy = policy
+        self.api_domains = tuple(
+            dict.fromkeys(domain for factory in provider_factories for domain in factory.api_domains)
+        )
+
+    def __call__(self, http_client: HttpClient) -> MultiProvider:
+        return MultiProvider([factory(http_client) for factory in self.provider_factories], self.policy)
@@ -1,13 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Generic, Protocol
+from dataclasses import asdict
+from re import Pattern
+from typing import Any, Generic, Mapping, Protocol
 from typing import TypeVar
 
 from httpx import AsyncClient as HttpClient
 
 from lyriks.cli.console import console
 from lyriks.lyrics import Lyrics
-from lyriks.mb_client import Mbid, Artist, Release
+from lyriks.mb_client import Mbid, Artist, Release, register_album_url_pattern
+from lyriks.util import SingleFlight
 from .api.song import Song
+from .cache import CACHE_ENTITY_LYRICS, CACHE_ENTITY_NO_LYRICS, CACHE_ENTITY_SONGS, get_cached, set_cached
 from .util import pick_release_from_release_group
 
 T = TypeVar('T', str, int)
@@ -27,14 +31,32 @@ class Provider(Generic[T, S], ABC):
     provider_domain: str
     """The primary domain of the provider"""
 
+    api_domain: str
+    """The domain of the provider's API servers, including all subdomains, defaults to provider_domain"""
+
+    api_domains: tuple[str, ...]
+    """All API domains used by the provider, see ProviderFactory"""
+
+    album_pattern: Pattern
+    """The pattern of the provider's album URLs on MusicBrainz, with one capturing group for the album ID"""
+
+    song_type: type[S]
+    """The provider-specific song class, used to restore songs from the persistent cache"""
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if not getattr(cls, 'provider_domain', None):
             raise NotImplementedError(f'{cls.__name__}: provider_domain must be set')
+        if not getattr(cls, 'api_domain', None):
+            cls.api_domain = cls.provider_domain
+        cls.api_domains = (cls.api_domain,)
+        if getattr(cls, 'album_pattern', None):
+            register_album_url_pattern(cls.provider_domain, cls.album_pattern)
 
     def __init__(self, http_client: HttpClient):
         self.http_client = http_client
         self.cache: dict[str, dict[Mbid, S] | None] = {}
+        self.in_flight = SingleFlight()
         self.missing_artists: dict[str, Artist] = {}
         self.missing_releases: dict[str, Release] = {}
 
@@ -50,6 +72,8 @@ class Provider(Generic[T, S], ABC):
     async def fetch_album_songs(self, album_id: T) -> list[S] | None:
         """
         Fetch a list of provider-specific song entities for a given album ID.
+
+        :raises ProviderError: if the request failed, as opposed to the album not being available.
         """
         pass
 
@@ -64,9 +88,45 @@ class Provider(Generic[T, S], ABC):
     async def fetch_song_lyrics(self, song: S) -> Lyrics | None:
         """
         Fetch lyrics for a given song entity.
+
+        :return: The lyrics, or None if the song has no lyrics.
+        :raises ProviderError: if the request failed, so that the song isn't cached as having no lyrics.
         """
         pass
 
+    async def get_album_songs(self, album_id: T) -> list[S] | None:
+        """
+        Get the songs of an album from the persistent cache, or fetch and cache them.
+        """
+        cached = get_cached(CACHE_ENTITY_SONGS, self.provider_domain, str(album_id))
+        if cached is not None:
+            return [self.song_type.from_dict(song) for song in cached]
+
+        songs = await self.fetch_album_songs(album_id)
+        if songs:
+            set_cached(CACHE_ENTITY_SONGS, self.provider_domain, str(album_id), [song.to_dict() for song in songs])
+        return songs
+
+    async def get_song_lyrics(self, song: S) -> Lyrics | None:
+        """
+        Get the lyrics of a song from the persistent cache, or fetch and cache them.
+        Songs without lyrics are cached as well, usually for a shorter time.
+        Failed requests raise an exception instead, and are therefore not cached.
+        """
+        key = str(song.id)
+        cached = get_cached(CACHE_ENTITY_LYRICS, self.provider_domain, key)
+        if cached is not None:
+            return Lyrics(**cached)
+        if get_cached(CACHE_ENTITY_NO_LYRICS, self.provider_domain, key) is not None:
+            return None
+
+        lyrics = await self.fetch_song_lyrics(song)
+        if lyrics is not None:
+            set_cached(CACHE_ENTITY_LYRICS, self.provider_domain, key, asdict(lyrics))
+        else:
+            set_cached(CACHE_ENTITY_NO_LYRICS, self.provider_domain, key, True)
+        return lyrics
+
     def has_artist_url(self, artist: Artist) -> bool:
         """
         Check if the artist has a URL relationship for the service used by this provider.
@@ -98,18 +158,24 @@ class Provider(Generic[T, S], ABC):
             return None
 
         # Fetch lyrics
-        return await self.fetch_song_lyrics(song)
+        return await self.get_song_lyrics(song)
 
     async def get_mapped_provider_songs(self, track_release: Release) -> dict[Mbid, S] | None:
         """
         Get songs for a track release, matched to its recordings.
 
         :param track_release: The release to fetch and map songs for.
-        :return: A dictionary mapping recording MBIDs to provider-specific songs, or None if there was an error.
+        :return: A dictionary mapping recording MBIDs to provider-specific songs,
+                 or None if the provider has no matching songs for the release.
+        :raises ProviderError: if a request to the provider failed.
         """
         if track_release.id in self.cache:
             return self.cache[track_release.id]
 
+        # Albums split into several directories resolve the same release concurrently
+        return await self.in_flight.run(track_release.id, self._map_provider_songs, track_release)
+
+    async def _map_provider_songs(self, track_release: Release) -> dict[Mbid, S] | None:
         result = await pick_release_from_release_group(self.http_client, track_release, self.extract_album_id)
         if not result:
             console.print(f'No URL found for release {track_release.rich_string}', style='warning')
@@ -118,7 +184,7 @@ class Provider(Generic[T, S], ABC):
             return None
         matched_release, album_id = result
 
-        provider_songs = await self.fetch_album_songs(album_id)
+        provider_songs = await self.get_album_songs(album_id)
         if not provider_songs:
             self.cache[track_release.id] = None
             return None
@@ -130,27 +196,27 @@ class Provider(Generic[T, S], ABC):
             return None
 
         # Match recordings to songs
-        mapped_songs = {}
-
-        # Iterate over all tracks in the release
-        for medium in matched_release.media:
-            for track in medium['tracks']:
-                recording_mbid: Mbid = track['recording']['id']
-                try:
-                    # Match song by track number if possible
-                    track_number = int(track['number'])
-                    song = next((song for song in provider_songs if song.album_index == track_number), None)
-                except ValueError:
-                    song = None
-
-                if song is None:
-                    # Fall back to track position
-                    track_index = track['position'] - 1
-                    if track_index >= len(provider_songs):
-                        continue
-                    song = provider_songs[track_index]
-
-                mapped_songs[recording_mbid] = song
+        mapped_songs: dict[Mbid, S] = {}
+        songs_by_album_index: dict[int, S] = {}
+        for provider_song in provider_songs:
+            songs_by_album_index.setdefault(provider_song.album_index, provider_song)
+
+        # Iterate over all recordings in the release
+        for recording_mbid, track in matched_release.recording_index.items():
+            try:
+                # Match song by track number if possible
+                song: S | None = songs_by_album_index.get(int(track.number))
+            except ValueError:
+                song = None
+
+            if song is None:
+                # Fall back to track position
+                track_index = track.position - 1
+                if track_index >= len(provider_songs):
+                    continue
+                song = provider_songs[track_index]
+
+            mapped_songs[recording_mbid] = song
 
         self.cache[track_release.id] = mapped_songs
 
@@ -163,4 +229,36 @@ class ProviderFactory(Protocol):
     Has to match the Provider constructor signature.
     """
 
+    api_domains: tuple[str, ...]
+    """The domains of the API servers used by the created providers, to limit the concurrency per domain"""
+
     def __call__(self, http_client: HttpClient) -> Provider: ...
+
+
+class SyncProvider(Protocol):
+    """
+    The interface of a provider used by the sync process, implemented by Provider and MultiProvider.
+    """
+
+    @property
+    def missing_artists(self) -> dict[str, Artist]: ...
+
+    @property
+    def missing_releases(self) -> dict[str, Release]: ...
+
+    def has_artist_url(self, artist: Artist) -> bool: ...
+
+    async def get_mapped_provider_songs(self, track_release: Release) -> Mapping[Any, Any] | None: ...
+
+    async def fetch_recording_lyrics(self, track_release: Release, recording_mbid: Mbid) -> Lyrics | None: ...
+
+
+class SyncProviderFactory(Protocol):
+    """
+    A factory protocol for creating SyncProvider instances, satisfied by every ProviderFactory.
+    """
+
+    api_domains: tuple[str, ...]
+    """The domains of the API servers used by the created providers, to limit the concurrency per domain"""
+
+    def __call__(self, http_client: HttpClient) -> SyncProvider: ...
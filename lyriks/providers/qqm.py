@@ -16,9 +16,10 @@ class QQMusic(Provider[QQMId, QQMSong]):
 
     provider_domain = 'y.qq.com'
     album_pattern = re.compile(r'https://y.qq.com/n/ryqq(?:_v2)?/albumDetail/(\w+)')
+    song_type = QQMSong
 
     def extract_album_id(self, release: Release) -> QQMId | None:
-        url_str = release.extract_url_str(self.album_pattern)
+        url_str = release.get_album_id(self.provider_domain)
         if not url_str:
             return None
         return QQMId(url_str)
@@ -15,9 +15,10 @@ async def pick_release_from_release_group(
     """
     Pick a release from the release's release group that matches the given selector.
 
-    Attempts to match the release itself first, then checks all releases in the release group,
+    Attempts to match the release itself first, then checks the releases in the release group,
     sorted by an increasing track count delta from the original release.
     This ensures the most similar release is chosen.
+    Large release groups are fetched page by page, and only until a page contains a matching release.
     """
 
     # Try to match the release itself first
@@ -25,8 +26,12 @@ async def pick_release_from_release_group(
     if selection is not None:
         return release, selection
 
-    # If that fails, check all releases from the release group
-    rg_releases = await get_releases_by_release_group(http_client, release.rg_mbid)
+    # If that fails, check the releases from the release group, stopping at the first page with a match
+    rg_releases = await get_releases_by_release_group(
+        http_client,
+        release.rg_mbid,
+        until=lambda releases: any(selector(rg_release) is not None for rg_release in releases),
+    )
     if not rg_releases:
         return None
 
@@ -15,10 +15,12 @@ class Vibe(Provider[int, VibeSong]):
     """
 
     provider_domain = 'vibe.naver.com'
+    api_domain = 'apis.naver.com'
     album_pattern = re.compile(r'https://vibe.naver.com/album/(\d+)')
+    song_type = VibeSong
 
     def extract_album_id(self, release: Release) -> int | None:
-        return release.extract_url_id(self.album_pattern)
+        return release.get_album_int_id(self.provider_domain)
 
     async def fetch_album_songs(self, album_id: int) -> list[VibeSong] | None:
         return await vibe_api.get_album_songs(self.http_client, album_id)
@@ -0,0 +1,91 @@
+import os
+from dataclasses import dataclass
+from os import PathLike, path
+from typing import Iterator
+
+AUDIO_EXTENSIONS = ('.flac', '.m4a', '.mp3')
+
+NOLYRICS_EXTENSION = '.nolyrics'
+SYNCED_LYRICS_EXTENSION = '.lrc'
+STATIC_LYRICS_EXTENSION = '.txt'
+
+
+@dataclass(frozen=True)
+class TrackFile:
+    """
+    An audio file found in the collection, together with the state of its sidecar files.
+    """
+
+    dirname: str
+    filename: str
+    has_synced_lyrics: bool
+    has_static_lyrics: bool
+    excluded: bool
+    """Whether the track was excluded through a .nolyrics file"""
+
+    @property
+    def path(self) -> str:
+        return path.join(self.dirname, self.filename)
+
+    @property
+    def basename(self) -> str:
+        return self.filename.rsplit('.', 1)[0]
+
+    @property
+    def synced_lyrics_path(self) -> str:
+        return path.join(self.dirname, f'{self.basename}{SYNCED_LYRICS_EXTENSION}')
+
+    @property
+    def static_lyrics_path(self) -> str:
+        return path.join(self.dirname, f'{self.basename}{STATIC_LYRICS_EXTENSION}')
+
+
+def scan_collection(collection_path: str | PathLike[str]) -> Iterator[list[TrackFile]]:
+    """
+    Recursively scan a collection for audio files, grouped by the directory they are in.
+
+    Every directory is listed exactly once, and the presence of sidecar files is determined from that listing,
+    so no additional filesystem calls are necessary per track.
+    Directories containing a .nolyrics file are skipped entirely, including their subdirectories.
+    """
+    pending = [os.fspath(collection_path)]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        names = {entry.name for entry in entries}
+        if NOLYRICS_EXTENSION in names:
+            continue
+
+        sub_directories = []
+        tracks = []
+        for entry in entries:
+            if entry.is_dir():
+                # Like os.walk, don't follow symlinks to directories
+                if not entry.is_symlink():
+                    sub_directories.append(entry.path)
+                continue
+
+            basename, extension = path.splitext(entry.name)
+            if extension.lower() not in AUDIO_EXTENSIONS:
+                continue
+
+            tracks.append(
+                TrackFile(
+                    dirname=directory,
+                    filename=entry.name,
+                    has_synced_lyrics=f'{basename}{SYNCED_LYRICS_EXTENSION}' in names,
+                    has_static_lyrics=f'{basename}{STATIC_LYRICS_EXTENSION}' in names,
+                    excluded=f'{basename}{NOLYRICS_EXTENSION}' in names,
+                )
+            )
+
+        if tracks:
+            yield tracks
+
+        # Visit subdirectories in listing order
+        pending.extend(reversed(sub_directories))
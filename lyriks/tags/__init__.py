@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import mutagen
+import trio
+from mutagen.easymp4 import EasyMP4Tags
+
+from .fast_reader import UnsupportedTagFormat, read_tags_fast
+from .track_tags import (
+    ALBUMARTIST_TAG,
+    ALBUM_TAG,
+    MB_AAID_TAG,
+    MB_ALBUMID_TAG,
+    MB_RGID_TAG,
+    MB_RTID_TAG,
+    TITLE_TAG,
+    TRACKNUMBER_TAG,
+    TAG_KEYS,
+    TrackTags,
+)
+
+DEFAULT_TAG_READERS = 8
+
+EasyMP4Tags.RegisterFreeformKey(MB_RGID_TAG, 'MusicBrainz Release Group Id')
+EasyMP4Tags.RegisterFreeformKey(MB_RTID_TAG, 'MusicBrainz Release Track Id')
+
+
+def read_tags(filepath: str) -> TrackTags | None:
+    """
+    Read the relevant tags from an audio file.
+
+    Uses the fast tag reader where possible and falls back to mutagen for unsupported files.
+
+    :return: The tags of the file, or None if the file isn't a supported audio file or has no tags at all.
+    """
+    try:
+        return read_tags_fast(filepath)
+    except UnsupportedTagFormat:
+        return read_tags_mutagen(filepath)
+
+
+def read_tags_mutagen(filepath: str) -> TrackTags | None:
+    """
+    Read the relevant tags from an audio file with a full parse by mutagen.
+    """
+    file = mutagen.File(filepath, easy=True)
+    if not file or file.tags is None:
+        return None
+
+    tags = file.tags
+    values = {}
+    for key in TAG_KEYS:
+        if key in tags:
+            tag_values = tags[key]
+            values[key] = tag_values[0] if tag_values else ''
+
+    return TrackTags.from_dict(values)
+
+
+class TagReader:
+    """
+    Reads tags from audio files without blocking the event loop.
+
+    Files are read in worker threads, or optionally in worker processes, which can help with
+    CPU-bound parsing of large collections. The number of concurrent reads is limited to max_workers.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_TAG_READERS, use_processes: bool = False):
+        self.limiter = trio.CapacityLimiter(max_workers)
+        self.executor = ProcessPoolExecutor(max_workers) if use_processes else None
+
+    def __enter__(self) -> 'TagReader':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def read_tags(self, filepath: str) -> TrackTags | None:
+        if self.executor is None:
+            return await trio.to_thread.run_sync(read_tags, filepath, limiter=self.limiter)
+
+        future = self.executor.submit(read_tags, filepath)
+        return await trio.to_thread.run_sync(future.result, limiter=self.limiter)
+
+    async def stat(self, filepath: str) -> os.stat_result:
+        return await trio.to_thread.run_sync(os.stat, filepath, limiter=self.limiter)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+
+__all__ = [
+    'ALBUMARTIST_TAG',
+    'ALBUM_TAG',
+    'DEFAULT_TAG_READERS',
+    'MB_AAID_TAG',
+    'MB_ALBUMID_TAG',
+    'MB_RGID_TAG',
+    'MB_RTID_TAG',
+    'TITLE_TAG',
+    'TRACKNUMBER_TAG',
+    'TagReader',
+    'TrackTags',
+    'read_tags',
+    'read_tags_mutagen',
+]
@@ -0,0 +1,309 @@
+"""
+Minimal tag readers for FLAC, MP3 and MP4 files.
+
+They only parse the fields required to fetch lyrics and skip over everything else,
+which is considerably faster than a full parse with mutagen.
+Anything out of the ordinary raises UnsupportedTagFormat, so that the caller can fall back to mutagen.
+"""
+
+import struct
+from os import path
+from typing import BinaryIO
+
+from .track_tags import (
+    ALBUMARTIST_TAG,
+    ALBUM_TAG,
+    MB_AAID_TAG,
+    MB_ALBUMID_TAG,
+    MB_RGID_TAG,
+    MB_RTID_TAG,
+    TITLE_TAG,
+    TRACKNUMBER_TAG,
+    TAG_KEYS,
+    TrackTags,
+)
+
+_FLAC_VORBIS_COMMENT_BLOCK = 4
+
+_ID3_TEXT_FRAMES = {
+    b'TIT2': TITLE_TAG,
+    b'TALB': ALBUM_TAG,
+    b'TRCK': TRACKNUMBER_TAG,
+    b'TPE2': ALBUMARTIST_TAG,
+}
+_ID3_TXXX_DESCRIPTIONS = {
+    'MusicBrainz Release Group Id': MB_RGID_TAG,
+    'MusicBrainz Album Id': MB_ALBUMID_TAG,
+    'MusicBrainz Release Track Id': MB_RTID_TAG,
+    'MusicBrainz Album Artist Id': MB_AAID_TAG,
+}
+_ID3_ENCODINGS = {
+    0: ('latin-1', b'\x00'),
+    1: ('utf-16', b'\x00\x00'),
+    2: ('utf-16-be', b'\x00\x00'),
+    3: ('utf-8', b'\x00'),
+}
+
+_MP4_CONTAINER_PATH = (b'moov', b'udta', b'meta', b'ilst')
+_MP4_TEXT_ATOMS = {
+    b'\xa9nam': TITLE_TAG,
+    b'\xa9alb': ALBUM_TAG,
+    b'aART': ALBUMARTIST_TAG,
+}
+_MP4_FREEFORM_MEAN = 'com.apple.iTunes'
+_MP4_FREEFORM_NAMES = _ID3_TXXX_DESCRIPTIONS
+
+
+class UnsupportedTagFormat(Exception):
+    """
+    Raised if a file can't be handled by the fast tag readers.
+    """
+
+
+def read_tags_fast(filepath: str) -> TrackTags | None:
+    """
+    Read the relevant tags from a FLAC, MP3 or MP4 file.
+
+    :return: The tags of the file, or None if the file has no tags.
+    :raises UnsupportedTagFormat: if the file type or its tag layout isn't supported.
+    """
+    extension = path.splitext(filepath)[1].lower()
+    reader = _READERS.get(extension)
+    if reader is None:
+        raise UnsupportedTagFormat(extension)
+
+    try:
+        with open(filepath, 'rb') as f:
+            values = reader(f)
+    except (struct.error, ValueError, UnicodeDecodeError, IndexError) as e:
+        raise UnsupportedTagFormat(repr(e)) from e
+
+    if values is None:
+        return None
+
+    return TrackTags.from_dict(values)
+
+
+def _read_exactly(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise UnsupportedTagFormat('unexpected end of file')
+    return data
+
+
+def _read_flac(f: BinaryIO) -> dict[str, str] | None:
+    if f.read(4) != b'fLaC':
+        # Possibly prefixed by an ID3 tag, leave that to mutagen
+        raise UnsupportedTagFormat('missing FLAC signature')
+
+    while True:
+        header = _read_exactly(f, 4)
+        is_last = header[0] & 0x80
+        block_type = header[0] & 0x7F
+        block_size = int.from_bytes(header[1:], 'big')
+
+        if block_type == _FLAC_VORBIS_COMMENT_BLOCK:
+            return _parse_vorbis_comment(_read_exactly(f, block_size))
+
+        if is_last:
+            return None
+        f.seek(block_size, 1)
+
+
+def _parse_vorbis_comment(data: bytes) -> dict[str, str]:
+    (vendor_length,) = struct.unpack_from('<I', data, 0)
+    offset = 4 + vendor_length
+    (count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+
+    values: dict[str, str] = {}
+    for _ in range(count):
+        (length,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        comment = data[offset : offset + length]
+        offset += length
+        if len(comment) != length:
+            raise UnsupportedTagFormat('truncated vorbis comment')
+
+        key, sep, value = comment.partition(b'=')
+        if not sep:
+            continue
+        key_str = key.decode('ascii', 'replace').lower()
+        if key_str in TAG_KEYS and key_str not in values:
+            values[key_str] = value.decode('utf-8', 'replace')
+    return values
+
+
+def _read_id3(f: BinaryIO) -> dict[str, str] | None:
+    header = f.read(10)
+    if len(header) < 10 or not header.startswith(b'ID3'):
+        # No ID3v2 tag at the start of the file, which mutagen may still be able to handle
+        raise UnsupportedTagFormat('missing ID3v2 header')
+
+    major_version = header[3]
+    flags = header[5]
+    if major_version not in (3, 4):
+        raise UnsupportedTagFormat(f'unsupported ID3v2 version 2.{major_version}')
+    if flags & 0xC0:
+        # Unsynchronisation or extended header
+        raise UnsupportedTagFormat('unsupported ID3v2 flags')
+
+    data = _read_exactly(f, _syncsafe_int(header[6:10]))
+
+    values: dict[str, str] = {}
+    offset = 0
+    while offset + 10 <= len(data):
+        frame_id = data[offset : offset + 4]
+        if frame_id == b'\x00\x00\x00\x00':
+            break  # padding
+
+        size_bytes = data[offset + 4 : offset + 8]
+        frame_size = _syncsafe_int(size_bytes) if major_version == 4 else int.from_bytes(size_bytes, 'big')
+        frame_flags = int.from_bytes(data[offset + 8 : offset + 10], 'big')
+        frame_data = data[offset + 10 : offset + 10 + frame_size]
+        offset += 10 + frame_size
+        if len(frame_data) != frame_size:
+            raise UnsupportedTagFormat('truncated ID3v2 frame')
+
+        is_text_frame = frame_id in _ID3_TEXT_FRAMES
+        if not is_text_frame and frame_id != b'TXXX':
+            continue
+
+        # Grouping, compression, encryption, unsynchronisation or data length indicator
+        if frame_flags & (0x00E0 if major_version == 3 else 0x004F):
+            raise UnsupportedTagFormat('unsupported ID3v2 frame flags')
+
+        strings = _decode_id3_text(frame_data)
+        if is_text_frame:
+            if strings:
+                values.setdefault(_ID3_TEXT_FRAMES[frame_id], strings[0])
+        elif len(strings) >= 2:
+            key = _ID3_TXXX_DESCRIPTIONS.get(strings[0])
+            if key:
+                values.setdefault(key, strings[1])
+
+    return values
+
+
+def _syncsafe_int(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_id3_text(frame_data: bytes) -> list[str]:
+    if not frame_data:
+        return []
+
+    encoding = _ID3_ENCODINGS.get(frame_data[0])
+    if encoding is None:
+        raise UnsupportedTagFormat('unknown ID3v2 text encoding')
+    codec, terminator = encoding
+
+    # Split at terminators aligned to the code unit size
+    raw = frame_data[1:]
+    unit = len(terminator)
+    parts = []
+    start = 0
+    for i in range(0, len(raw) - unit + 1, unit):
+        if raw[i : i + unit] == terminator:
+            parts.append(raw[start:i])
+            start = i + unit
+    parts.append(raw[start:])
+    if len(parts) > 1 and not parts[-1]:
+        parts.pop()
+
+    return [part.decode(codec) for part in parts]
+
+
+def _read_mp4(f: BinaryIO) -> dict[str, str] | None:
+    f.seek(0, 2)
+    end = f.tell()
+
+    # Descend to the ilst atom, skipping unrelated atoms such as mdat
+    start = 0
+    for name in _MP4_CONTAINER_PATH:
+        atom = _find_mp4_atom(f, start, end, name)
+        if atom is None:
+            return None
+        start, end = atom
+        if name == b'meta':
+            start += 4  # full atom with version and flags
+
+    values: dict[str, str] = {}
+    for item_name, item_start, item_end in _iter_mp4_atoms(f, start, end):
+        if item_name in _MP4_TEXT_ATOMS:
+            data = _read_mp4_data(f, item_start, item_end)
+            if data:
+                values.setdefault(_MP4_TEXT_ATOMS[item_name], data[0].decode('utf-8', 'replace'))
+        elif item_name == b'trkn':
+            data = _read_mp4_data(f, item_start, item_end)
+            if data:
+                track, total = struct.unpack_from('>2xHH', data[0])
+                values.setdefault(TRACKNUMBER_TAG, f'{track}/{total}' if total else f'{track}')
+        elif item_name == b'----':
+            _read_mp4_freeform(f, item_start, item_end, values)
+
+    return values
+
+
+def _iter_mp4_atoms(f: BinaryIO, start: int, end: int):
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        size, name = struct.unpack('>I4s', _read_exactly(f, 8))
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack('>Q', _read_exactly(f, 8))
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size or offset + size > end:
+            raise UnsupportedTagFormat('invalid MP4 atom size')
+
+        yield name, offset + header_size, offset + size
+        offset += size
+
+
+def _find_mp4_atom(f: BinaryIO, start: int, end: int, name: bytes) -> tuple[int, int] | None:
+    for atom_name, atom_start, atom_end in _iter_mp4_atoms(f, start, end):
+        if atom_name == name:
+            return atom_start, atom_end
+    return None
+
+
+def _read_mp4_data(f: BinaryIO, start: int, end: int) -> list[bytes]:
+    result = []
+    for name, data_start, data_end in _iter_mp4_atoms(f, start, end):
+        if name != b'data':
+            continue
+        f.seek(data_start + 8)  # type and locale
+        result.append(_read_exactly(f, data_end - data_start - 8))
+    return result
+
+
+def _read_mp4_freeform(f: BinaryIO, start: int, end: int, values: dict[str, str]):
+    mean = name = None
+    data = []
+    for child_name, child_start, child_end in list(_iter_mp4_atoms(f, start, end)):
+        if child_name in (b'mean', b'name'):
+            f.seek(child_start + 4)  # version and flags
+            text = _read_exactly(f, child_end - child_start - 4).decode('utf-8', 'replace')
+            if child_name == b'mean':
+                mean = text
+            else:
+                name = text
+        elif child_name == b'data':
+            f.seek(child_start + 8)  # type and locale
+            data.append(_read_exactly(f, child_end - child_start - 8))
+
+    if mean != _MP4_FREEFORM_MEAN or name is None or not data:
+        return
+    key = _MP4_FREEFORM_NAMES.get(name)
+    if key:
+        values.setdefault(key, data[0].decode('utf-8', 'replace'))
+
+
+_READERS = {
+    '.flac': _read_flac,
+    '.mp3': _read_id3,
+    '.m4a': _read_mp4,
+}
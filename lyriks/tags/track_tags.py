@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+
+TITLE_TAG = 'title'
+ALBUM_TAG = 'album'
+TRACKNUMBER_TAG = 'tracknumber'
+ALBUMARTIST_TAG = 'albumartist'
+MB_RGID_TAG = 'musicbrainz_releasegroupid'
+MB_ALBUMID_TAG = 'musicbrainz_albumid'
+MB_RTID_TAG = 'musicbrainz_releasetrackid'
+MB_AAID_TAG = 'musicbrainz_albumartistid'
+
+TAG_KEYS = (
+    TITLE_TAG,
+    ALBUM_TAG,
+    TRACKNUMBER_TAG,
+    ALBUMARTIST_TAG,
+    MB_RGID_TAG,
+    MB_ALBUMID_TAG,
+    MB_RTID_TAG,
+    MB_AAID_TAG,
+)
+
+
+@dataclass(frozen=True)
+class TrackTags:
+    """
+    The subset of an audio file's tags that is relevant for fetching lyrics.
+
+    Tags that are missing from the file are None, tags that are present but empty are empty strings.
+    """
+
+    title: str | None = None
+    album: str | None = None
+    tracknumber: str | None = None
+    albumartist: str | None = None
+    rg_mbid: str | None = None
+    album_mbid: str | None = None
+    track_mbid: str | None = None
+    albumartist_mbid: str | None = None
+
+    @classmethod
+    def from_dict(cls, values: dict[str, str]) -> 'TrackTags':
+        """
+        Construct tags from a dict of tag names to (first) values.
+        """
+        return cls(
+            title=values.get(TITLE_TAG),
+            album=values.get(ALBUM_TAG),
+            tracknumber=values.get(TRACKNUMBER_TAG),
+            albumartist=values.get(ALBUMARTIST_TAG),
+            rg_mbid=values.get(MB_RGID_TAG),
+            album_mbid=values.get(MB_ALBUMID_TAG),
+            track_mbid=values.get(MB_RTID_TAG),
+            albumartist_mbid=values.get(MB_AAID_TAG),
+        )
@@ -0,0 +1,144 @@
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+import trio
+
+from .const import CACHE_DIR_ENVVAR, PROGNAME
+
+ItemT = TypeVar('ItemT')
+R = TypeVar('R')
+
+
+def get_cache_dir() -> Path:
+    """
+    Get the directory for persistent caches, creating it if necessary.
+
+    Uses the directory from the LYRIKS_CACHE_DIR environment variable if set,
+    or the lyriks subdirectory of the XDG cache directory otherwise.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENVVAR)
+    if cache_dir:
+        cache_path = Path(cache_dir).expanduser()
+    else:
+        xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        cache_path = Path(xdg_cache_home) / PROGNAME
+
+    cache_path.mkdir(parents=True, exist_ok=True)
+    return cache_path
+
+
+class _Call:
+    def __init__(self):
+        self.done = trio.Event()
+        self.result: Any = None
+        self.error: Exception | None = None
+        self.cancelled = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key.
+
+    The first caller for a key runs the function, while all callers for the same key that arrive before it finishes
+    wait for its result instead. Exceptions are passed on to all waiting callers. If the running call is cancelled,
+    the next waiting caller runs the function itself.
+    """
+
+    def __init__(self):
+        self.calls: dict[Hashable, _Call] = {}
+
+    async def run(self, key: Hashable, function: Callable[..., Awaitable[Any]], *args) -> Any:
+        while (call := self.calls.get(key)) is not None:
+            await call.done.wait()
+            if call.cancelled:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        call = self.calls[key] = _Call()
+        try:
+            call.result = await function(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.cancelled = True
+            raise
+        finally:
+            del self.calls[key]
+            call.done.set()
+
+
+class _Batch:
+    def __init__(self):
+        self.items: list = []
+        self.calls: list[_Call] = []
+        self.closed = trio.Event()
+
+
+class Batcher(Generic[ItemT, R]):
+    """
+    Collects items from concurrent callers and processes them together.
+
+    The first caller of a batch waits for up to window seconds for further items, or until max_size items have been
+    collected, and then processes the whole batch with a single call. Each caller receives the result for its item.
+    If processing raises an exception, it is passed on to all callers of the batch.
+    If the first caller is cancelled, the other callers submit their items again.
+    """
+
+    def __init__(self, process: Callable[[list[ItemT]], Awaitable[list[R]]], window: float, max_size: int):
+        self.process = process
+        self.window = window
+        self.max_size = max_size
+        self.current: _Batch | None = None
+
+    async def submit(self, item: ItemT) -> R:
+        batch = self.current
+        is_leader = batch is None
+        if batch is None:
+            batch = self.current = _Batch()
+
+        call = _Call()
+        batch.items.append(item)
+        batch.calls.append(call)
+        if len(batch.items) >= self.max_size:
+            self.current = None
+            batch.closed.set()
+
+        if not is_leader:
+            await call.done.wait()
+            if call.cancelled:
+                return await self.submit(item)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with trio.move_on_after(self.window):
+                await batch.closed.wait()
+            if self.current is batch:
+                self.current = None
+
+            results = await self.process(batch.items)
+            if len(results) != len(batch.items):
+                raise ValueError(f'Expected {len(batch.items)} results, got {len(results)}')
+            for batch_call, result in zip(batch.calls, results):
+                batch_call.result = result
+        except Exception as e:
+            for batch_call in batch.calls:
+                batch_call.error = e
+            raise
+        except BaseException:
+            for batch_call in batch.calls:
+                batch_call.cancelled = True
+            raise
+        finally:
+            if self.current is batch:
+                self.current = None
+            for batch_call in batch.calls:
+                batch_call.done.set()
+
+        return call.result
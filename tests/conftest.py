@@ -0,0 +1,3 @@
+# Import the package through its entry point, like the lyriks script does,
+# as importing lyriks.lyrics_fetcher or lyriks.mb_client first runs into a circular import with lyriks.cli
+import lyriks.cli  # noqa: F401
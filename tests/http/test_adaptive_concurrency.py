@@ -0,0 +1,107 @@
+import httpx
+import pytest
+import trio
+import trio.testing
+
+from lyriks.http.adaptive_concurrency import (
+    BACKOFF_COOLDOWN,
+    AdaptiveConcurrencyLimiter,
+    AdaptiveConcurrencyTransport,
+)
+
+
+def _run(main):
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+
+
+def test_invalid_bounds_are_rejected():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(min_limit=0)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(min_limit=4, max_limit=2)
+
+
+def test_limit_increases_by_one_per_window_of_fast_requests():
+    async def main():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=5, latency_threshold=1)
+        for _ in range(4):
+            limiter.on_success(0.5)
+        assert 4.9 < limiter.limit < 5
+        assert limiter.capacity_limiter.total_tokens == 4
+
+        limiter.on_success(0.5)
+        assert limiter.limit == 5
+        assert limiter.capacity_limiter.total_tokens == 5
+        limiter.on_success(0.5)
+        assert limiter.limit == 5
+
+        limiter.limit = 4.0
+        limiter.on_success(1.5)
+        assert limiter.limit == 4
+
+    trio.run(main)
+
+
+def test_failures_halve_limit_once_per_cooldown():
+    async def main():
+        limiter = AdaptiveConcurrencyLimiter(min_limit=2, initial_limit=16)
+        limiter.on_failure()
+        limiter.on_failure()
+        assert limiter.limit == 8
+
+        await trio.sleep(BACKOFF_COOLDOWN)
+        limiter.on_failure()
+        assert limiter.limit == 4
+
+        await trio.sleep(BACKOFF_COOLDOWN)
+        limiter.on_failure()
+        assert limiter.limit == 2
+        assert limiter.capacity_limiter.total_tokens == 2
+
+    _run(main)
+
+
+def test_transport_limits_concurrent_requests_per_domain():
+    concurrent = {'api.example.com': 0, 'other.com': 0}
+    max_concurrent = dict(concurrent)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        concurrent[host] += 1
+        max_concurrent[host] = max(max_concurrent[host], concurrent[host])
+        await trio.sleep(0.1)
+        concurrent[host] -= 1
+        return httpx.Response(200)
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+    transport = AdaptiveConcurrencyTransport(httpx.MockTransport(handler), {'example.com': limiter})
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with trio.open_nursery() as nursery:
+                for _ in range(6):
+                    nursery.start_soon(client.get, 'https://api.example.com/')
+                    nursery.start_soon(client.get, 'https://other.com/')
+
+    _run(main)
+
+    assert max_concurrent == {'api.example.com': 2, 'other.com': 6}
+    assert transport.get_limiter('example.com') is limiter
+    assert transport.get_limiter('notexample.com') is None
+
+
+def test_transport_backs_off_on_server_errors():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503)
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+    transport = AdaptiveConcurrencyTransport(httpx.MockTransport(handler), {'example.com': limiter})
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.get('https://example.com/')
+            assert response.status_code == 503
+
+    _run(main)
+
+    assert limiter.limit == 2
@@ -0,0 +1,130 @@
+import httpx
+import pytest
+import trio
+
+from lyriks.disk_cache import DiskCache
+from lyriks.http import cache_transport
+from lyriks.http.cache_transport import RevalidatingCacheTransport
+
+HEURISTIC_FRESHNESS = 60
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    with DiskCache(tmp_path / 'cache.sqlite3') as cache:
+        yield cache
+
+
+def _get_all(disk_cache: DiskCache, handler, requests: list[tuple[str, dict]]) -> list[httpx.Response]:
+    transport = RevalidatingCacheTransport(
+        httpx.MockTransport(handler), disk_cache, ('example.com',), HEURISTIC_FRESHNESS
+    )
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return [await client.get(url, headers=headers) for url, headers in requests]
+
+    return trio.run(main)
+
+
+def _counting_handler(headers: dict, json=None):
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if 'If-None-Match' in request.headers:
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, headers=headers, json=json if json is not None else {'count': len(requests)})
+
+    return handler, requests
+
+
+URL = 'https://api.example.com/album?id=1'
+
+
+@pytest.mark.parametrize(
+    ('headers', 'expected_requests'),
+    [
+        ({}, 1),
+        ({'Cache-Control': 'max-age=0'}, 2),
+        ({'Cache-Control': 'no-store'}, 2),
+        ({'Cache-Control': 'private, max-age=60'}, 2),
+        ({'Cache-Control': 'no-cache'}, 2),
+        ({'Vary': '*'}, 2),
+    ],
+)
+def test_cache_control_of_response_is_honoured(disk_cache, headers, expected_requests):
+    handler, requests = _counting_handler(headers)
+
+    responses = _get_all(disk_cache, handler, [(URL, {}), (URL, {})])
+
+    assert len(requests) == expected_requests
+    assert responses[1].json() == {'count': expected_requests}
+
+
+def test_response_with_validators_is_revalidated(disk_cache):
+    handler, requests = _counting_handler({'ETag': '"v1"'})
+
+    responses = _get_all(disk_cache, handler, [(URL, {}), (URL, {})])
+
+    assert len(requests) == 2
+    assert requests[1].headers['If-None-Match'] == '"v1"'
+    assert responses[1].status_code == 200
+    assert responses[1].json() == {'count': 1}
+
+
+def test_max_age_skips_revalidation_while_fresh(disk_cache):
+    handler, requests = _counting_handler({'ETag': '"v1"', 'Cache-Control': 'max-age=60'})
+
+    _get_all(disk_cache, handler, [(URL, {}), (URL, {})])
+
+    assert len(requests) == 1
+
+
+def test_response_is_only_served_for_same_vary_headers(disk_cache):
+    handler, requests = _counting_handler({'Vary': 'Accept-Language'})
+
+    responses = _get_all(
+        disk_cache,
+        handler,
+        [(URL, {'Accept-Language': 'ko'}), (URL, {'Accept-Language': 'en'}), (URL, {'Accept-Language': 'en'})],
+    )
+
+    assert len(requests) == 2
+    assert [response.json() for response in responses] == [{'count': 1}, {'count': 2}, {'count': 2}]
+
+
+def test_responses_are_cached_per_authorization(disk_cache):
+    handler, requests = _counting_handler({})
+
+    _get_all(
+        disk_cache,
+        handler,
+        [
+            (URL, {'Authorization': 'Bearer a'}),
+            (URL, {'Authorization': 'Bearer b'}),
+            (URL, {'Authorization': 'Bearer a'}),
+        ],
+    )
+
+    assert len(requests) == 2
+
+
+def test_ignored_query_params_share_cache_entry(disk_cache):
+    handler, requests = _counting_handler({})
+
+    _get_all(disk_cache, handler, [(f'{URL}&_=1&sign=a', {}), (f'{URL}&sign=b&_=2', {})])
+
+    assert len(requests) == 1
+
+
+def test_rejected_responses_are_not_cached(disk_cache, monkeypatch):
+    monkeypatch.setattr(cache_transport, 'response_validators', {})
+    cache_transport.register_response_validator(
+        'api.example.com', lambda request, response: response.json()['code'] == 0
+    )
+    handler, requests = _counting_handler({}, json={'code': 500})
+
+    _get_all(disk_cache, handler, [(URL, {}), (URL, {})])
+
+    assert len(requests) == 2
@@ -0,0 +1,177 @@
+import json
+import os
+import time
+
+import httpx
+import pytest
+import trio
+import trio.testing
+
+from lyriks.const import CACHE_DIR_ENVVAR
+from lyriks.providers.api import bugs_api
+from lyriks.providers.api.bugs_api import BugsApiAccessToken
+from lyriks.util import SingleFlight
+
+HOUR = 60 * 60
+
+
+@pytest.fixture(autouse=True)
+def token_state(monkeypatch, tmp_path):
+    monkeypatch.setenv(CACHE_DIR_ENVVAR, str(tmp_path))
+    monkeypatch.setattr(bugs_api, '_cached_token', None)
+    monkeypatch.setattr(bugs_api, '_token_refresh_at', 0)
+    monkeypatch.setattr(bugs_api, '_token_loaded', False)
+    monkeypatch.setattr(bugs_api, '_token_refresh', SingleFlight())
+    monkeypatch.setattr(bugs_api, '_background_refresh_running', False)
+
+
+class BugsServer:
+    """
+    Stand-in for the token endpoint and the API, which only accepts the latest token.
+    """
+
+    def __init__(self):
+        self.token_requests = 0
+        self.api_requests: list[str] = []
+
+    @property
+    def token(self) -> str:
+        return f'token-{self.token_requests}'
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.copy_with(query=None) == bugs_api.BUGS_ACCESS_TOKEN_URL:
+            self.token_requests += 1
+            return httpx.Response(200, json={'result': {'access_token': self.token, 'expires_in': HOUR}})
+
+        authorization = request.headers['Authorization']
+        self.api_requests.append(authorization)
+        if authorization != f'Bearer {self.token}':
+            return httpx.Response(401)
+        return httpx.Response(200, json={'list': [{call['id']: {}} for call in json.loads(request.content)]})
+
+
+def _set_cached_token(access_token: str, expires_in: int):
+    bugs_api._token_loaded = True
+    bugs_api._set_token(BugsApiAccessToken(access_token=access_token, expires_at=int(time.time()) + expires_in))
+
+
+def test_saved_token_is_only_readable_by_user(tmp_path):
+    token = BugsApiAccessToken(access_token='token', expires_at=1234)
+    bugs_api._save_token(token)
+
+    path = tmp_path / bugs_api.TOKEN_FILENAME
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert bugs_api._load_token() == token
+
+
+def test_saved_token_replaces_previous_token():
+    bugs_api._save_token(BugsApiAccessToken(access_token='old', expires_at=1))
+    bugs_api._save_token(BugsApiAccessToken(access_token='new', expires_at=2))
+    assert bugs_api._load_token() == BugsApiAccessToken(access_token='new', expires_at=2)
+
+
+@pytest.mark.parametrize('content', [None, 'invalid', '{}', '{"access_token": "token", "expires_at": "soon"}'])
+def test_invalid_token_file_is_ignored(tmp_path, content):
+    if content is not None:
+        (tmp_path / bugs_api.TOKEN_FILENAME).write_text(content, encoding='utf-8')
+    assert bugs_api._load_token() is None
+
+
+@pytest.mark.parametrize(
+    ('expires_in', 'refresh_in'),
+    [
+        (HOUR, HOUR - bugs_api.TOKEN_REFRESH_AHEAD),
+        # Short-lived tokens are refreshed halfway through their lifetime
+        (bugs_api.TOKEN_REFRESH_AHEAD, bugs_api.TOKEN_REFRESH_AHEAD // 2),
+    ],
+)
+def test_refresh_ahead_time(expires_in, refresh_in):
+    now = int(time.time())
+    _set_cached_token('token', expires_in)
+    assert bugs_api._token_refresh_at - now in (refresh_in, refresh_in + 1)
+
+
+def test_token_is_loaded_from_file():
+    server = BugsServer()
+    bugs_api._save_token(BugsApiAccessToken(access_token='saved', expires_at=int(time.time()) + HOUR))
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http_client:
+            return await bugs_api._get_cached_token(http_client)
+
+    assert trio.run(main) == 'saved'
+    assert server.token_requests == 0
+
+
+def test_expired_token_is_refreshed_before_use():
+    server = BugsServer()
+    _set_cached_token('expired', bugs_api.TOKEN_EXPIRY_MARGIN)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http_client:
+            return await bugs_api._get_cached_token(http_client)
+
+    assert trio.run(main) == 'token-1'
+    assert bugs_api._load_token().access_token == 'token-1'
+
+
+def test_token_is_refreshed_in_background():
+    server = BugsServer()
+    _set_cached_token('current', HOUR)
+    bugs_api._token_refresh_at = 0
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http_client:
+            # The current token is used while the new one is fetched
+            assert await bugs_api._get_cached_token(http_client) == 'current'
+            await trio.sleep(1)
+            assert await bugs_api._get_cached_token(http_client) == 'token-1'
+
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+    assert server.token_requests == 1
+    assert not bugs_api._background_refresh_running
+    assert bugs_api._load_token().access_token == 'token-1'
+
+
+def test_no_background_refresh_with_closed_client():
+    server = BugsServer()
+    _set_cached_token('current', HOUR)
+    bugs_api._token_refresh_at = 0
+
+    async def main():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+        await http_client.aclose()
+        assert await bugs_api._get_cached_token(http_client) == 'current'
+        await trio.sleep(1)
+
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+    assert server.token_requests == 0
+    assert not bugs_api._background_refresh_running
+
+
+def test_background_refresh_skipped_if_client_closed_before_start():
+    server = BugsServer()
+
+    async def main():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+        bugs_api._background_refresh_running = True
+        await http_client.aclose()
+        await bugs_api._refresh_token_in_background(http_client)
+
+    trio.run(main)
+    assert server.token_requests == 0
+    assert not bugs_api._background_refresh_running
+
+
+def test_request_is_retried_with_new_token_after_401():
+    server = BugsServer()
+    _set_cached_token('revoked', HOUR)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http_client:
+            return await bugs_api._bugs_request(http_client, [{'id': 'call'}])
+
+    assert trio.run(main) == [{'call': {}}]
+    assert server.api_requests == ['Bearer revoked', 'Bearer token-1']
+    assert server.token_requests == 1
+    assert bugs_api._load_token().access_token == 'token-1'
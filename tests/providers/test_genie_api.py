@@ -0,0 +1,68 @@
+import httpx
+import pytest
+import trio
+
+from lyriks.providers.api import genie_api
+
+ALBUM_ID = 85000000
+
+
+def _album_json(song_ids: list[int]) -> dict:
+    songs = [
+        {'SONG_ID': str(song_id), 'ALBUM_TRACK_NO': str(i + 1), 'SONG_NAME': f'Song%20{i + 1}', 'ALBUM_CD_NO': '1'}
+        for i, song_id in enumerate(song_ids)
+    ]
+    return {'DATA1': {'DATA': songs}}
+
+
+@pytest.fixture
+def genie_requests():
+    requests: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path == '/player/j_StmInfo.json':
+            return httpx.Response(200, json={'DataSet': {'DATA': [{'ALBUM_ID': str(ALBUM_ID)}]}})
+        return httpx.Response(200, json=_album_json([1, 2, 3]))
+
+    yield handler, requests
+    genie_api.stream_info_cache.clear()
+    genie_api.song_index.clear()
+
+
+def _run(handler, function, *args):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await function(client, *args)
+
+    return trio.run(main)
+
+
+def test_album_songs_are_not_indexed_during_sync(genie_requests):
+    handler, _ = genie_requests
+
+    songs = _run(handler, genie_api.get_album_songs, ALBUM_ID)
+
+    assert [song.title for song in songs] == ['Song 1', 'Song 2', 'Song 3']
+    assert genie_api.song_index == {}
+
+
+def test_song_lookup_indexes_songs_of_its_album(genie_requests):
+    handler, requests = genie_requests
+
+    song = _run(handler, genie_api.get_song_info, 2)
+    other_song = _run(handler, genie_api.get_song_info, 3)
+
+    assert (song.id, song.title) == (2, 'Song 2')
+    assert (other_song.id, other_song.title) == (3, 'Song 3')
+    assert requests == ['/player/j_StmInfo.json', '/song/j_AlbumSongList.json']
+
+
+def test_song_index_is_bounded(genie_requests, monkeypatch):
+    handler, _ = genie_requests
+    monkeypatch.setattr(genie_api, 'SONG_INDEX_SIZE', 2)
+
+    song = _run(handler, genie_api.get_song_info, 1)
+
+    assert song.id == 1
+    assert list(genie_api.song_index) == [2, 3]
@@ -0,0 +1,153 @@
+import pytest
+import trio
+import trio.testing
+
+from lyriks.lyrics import Lyrics
+from lyriks.providers.multi_provider import POLICY_PRIORITY, POLICY_SYNCED, MultiProvider
+
+RELEASE = None  # passed through to the providers unchanged
+RECORDING_MBID = 'recording'
+
+
+class StubProvider:
+    """
+    Answers with fixed lyrics or a fixed error after a delay, and records if it was cancelled.
+    """
+
+    def __init__(self, name: str, result: Lyrics | Exception | None, delay: float = 0, songs: dict | None = None):
+        self.name = name
+        self.result = result
+        self.delay = delay
+        self.songs = songs
+        self.missing_artists: dict = {}
+        self.missing_releases: dict = {}
+        self.finished = False
+        self.cancelled = False
+
+    async def get_mapped_provider_songs(self, track_release):
+        await trio.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.songs
+
+    async def fetch_recording_lyrics(self, track_release, recording_mbid):
+        try:
+            await trio.sleep(self.delay)
+        except trio.Cancelled:
+            self.cancelled = True
+            raise
+        self.finished = True
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def _lyrics(source: str, is_synced: bool) -> Lyrics:
+    return Lyrics(song_id=1, song_title='Song', lines=['line\n'], is_synced=is_synced, source=source)
+
+
+def _fetch(providers: list[StubProvider], policy: str) -> Lyrics | None:
+    multi_provider = MultiProvider(providers, policy)  # type: ignore[arg-type]
+    return trio.run(
+        multi_provider.fetch_recording_lyrics,
+        RELEASE,
+        RECORDING_MBID,
+        clock=trio.testing.MockClock(autojump_threshold=0),
+    )
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        MultiProvider([], 'unknown')
+
+
+def test_synced_policy_prefers_synced_lyrics_of_later_provider():
+    static = StubProvider('first', _lyrics('first', is_synced=False), delay=1)
+    synced = StubProvider('second', _lyrics('second', is_synced=True), delay=2)
+
+    lyrics = _fetch([static, synced], POLICY_SYNCED)
+    assert lyrics is not None and lyrics.source == 'second'
+
+
+def test_priority_policy_prefers_earlier_provider():
+    static = StubProvider('first', _lyrics('first', is_synced=False), delay=2)
+    synced = StubProvider('second', _lyrics('second', is_synced=True), delay=1)
+
+    lyrics = _fetch([static, synced], POLICY_PRIORITY)
+    assert lyrics is not None and lyrics.source == 'first'
+
+
+@pytest.mark.parametrize('policy', [POLICY_SYNCED, POLICY_PRIORITY])
+def test_order_decides_between_equal_lyrics(policy):
+    first = StubProvider('first', _lyrics('first', is_synced=True), delay=2)
+    second = StubProvider('second', _lyrics('second', is_synced=True), delay=1)
+
+    lyrics = _fetch([first, second], policy)
+    assert lyrics is not None and lyrics.source == 'first'
+    assert second.finished
+
+
+def test_synced_policy_cancels_slower_providers_after_synced_lyrics_of_first_provider():
+    first = StubProvider('first', _lyrics('first', is_synced=True), delay=1)
+    slow = StubProvider('slow', _lyrics('slow', is_synced=True), delay=10)
+
+    lyrics = _fetch([first, slow], POLICY_SYNCED)
+    assert lyrics is not None and lyrics.source == 'first'
+    assert slow.cancelled and not slow.finished
+
+
+def test_synced_policy_waits_for_earlier_providers_after_static_lyrics():
+    slow = StubProvider('slow', None, delay=10)
+    static = StubProvider('static', _lyrics('static', is_synced=False), delay=1)
+    synced = StubProvider('synced', _lyrics('synced', is_synced=True), delay=10)
+
+    lyrics = _fetch([slow, static, synced], POLICY_SYNCED)
+    assert lyrics is not None and lyrics.source == 'synced'
+    assert slow.finished and synced.finished
+
+
+def test_priority_policy_cancels_later_providers():
+    slow = StubProvider('slow', None, delay=2)
+    second = StubProvider('second', _lyrics('second', is_synced=False), delay=1)
+    later = StubProvider('later', _lyrics('later', is_synced=True), delay=10)
+
+    lyrics = _fetch([slow, second, later], POLICY_PRIORITY)
+    assert lyrics is not None and lyrics.source == 'second'
+    assert slow.finished
+    assert later.cancelled and not later.finished
+
+
+def test_failing_provider_doesnt_affect_others():
+    failing = StubProvider('failing', RuntimeError('boom'), delay=1)
+    working = StubProvider('working', _lyrics('working', is_synced=False), delay=2)
+
+    lyrics = _fetch([failing, working], POLICY_PRIORITY)
+    assert lyrics is not None and lyrics.source == 'working'
+
+
+def test_error_is_raised_if_no_provider_has_lyrics():
+    failing = StubProvider('failing', RuntimeError('boom'), delay=1)
+    empty = StubProvider('empty', None, delay=2)
+
+    with pytest.raises(RuntimeError, match='boom'):
+        _fetch([failing, empty], POLICY_SYNCED)
+
+
+def test_missing_lyrics_without_errors():
+    assert _fetch([StubProvider('first', None), StubProvider('second', None)], POLICY_SYNCED) is None
+
+
+def test_mapped_songs_of_all_providers():
+    with_songs = StubProvider('with songs', None, songs={'recording': 'song'})
+    without_songs = StubProvider('without songs', None)
+    failing = StubProvider('failing', RuntimeError('boom'))
+    multi_provider = MultiProvider([with_songs, without_songs, failing])  # type: ignore[list-item]
+
+    assert trio.run(multi_provider.get_mapped_provider_songs, RELEASE) == {with_songs: {'recording': 'song'}}
+
+
+def test_mapped_songs_error_without_songs():
+    multi_provider = MultiProvider([StubProvider('empty', None), StubProvider('failing', RuntimeError('boom'))])  # type: ignore[list-item]
+
+    with pytest.raises(RuntimeError, match='boom'):
+        trio.run(multi_provider.get_mapped_provider_songs, RELEASE)
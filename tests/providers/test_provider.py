@@ -0,0 +1,109 @@
+import pytest
+import trio
+
+from lyriks.disk_cache import DiskCache
+from lyriks.lyrics import Lyrics
+from lyriks.mb_client import Mbid, Release
+from lyriks.providers import cache as provider_cache
+from lyriks.providers.api.error import ProviderError
+from lyriks.providers.api.song import Song
+from lyriks.providers.cache import CACHE_ENTITY_NO_LYRICS, get_cached
+from lyriks.providers.provider import Provider
+
+
+class FakeProvider(Provider[int, Song]):
+    provider_domain = 'lyrics.example.com'
+    song_type = Song
+
+    def __init__(self, result: Lyrics | Exception | None = None):
+        super().__init__(None)
+        self.result = result
+        self.fetches = 0
+        self.album_fetches = 0
+
+    def extract_album_id(self, release):
+        return 1
+
+    async def fetch_album_songs(self, album_id):
+        self.album_fetches += 1
+        await trio.sleep(0.1)
+        return [Song(id=10 + i, album_index=i + 1, title=f'Song {i + 1}') for i in range(2)]
+
+    async def fetch_song_by_id(self, song_id):
+        return None
+
+    async def fetch_song_lyrics(self, song):
+        self.fetches += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+SONG = Song(id=1, album_index=1, title='Song')
+
+
+@pytest.fixture(autouse=True)
+def persistent_cache(tmp_path):
+    with DiskCache(tmp_path / 'cache.sqlite3') as cache:
+        provider_cache.set_cache(cache)
+        yield
+        provider_cache.set_cache(None)
+
+
+def test_missing_lyrics_are_cached():
+    provider = FakeProvider(None)
+
+    assert trio.run(provider.get_song_lyrics, SONG) is None
+    assert trio.run(provider.get_song_lyrics, SONG) is None
+    assert provider.fetches == 1
+    assert get_cached(CACHE_ENTITY_NO_LYRICS, provider.provider_domain, str(SONG.id)) is True
+
+
+def test_failed_request_is_not_cached_as_missing_lyrics():
+    provider = FakeProvider(ProviderError('server error'))
+
+    with pytest.raises(ProviderError):
+        trio.run(provider.get_song_lyrics, SONG)
+    assert get_cached(CACHE_ENTITY_NO_LYRICS, provider.provider_domain, str(SONG.id)) is None
+
+    provider.result = Lyrics(SONG.id, SONG.title, ['Line\n'], False, provider.provider_domain)
+    assert trio.run(provider.get_song_lyrics, SONG) == provider.result
+    assert provider.fetches == 2
+
+
+RELEASE = Release.from_json(
+    {
+        'id': 'release',
+        'title': 'Album',
+        'release-group': {'id': 'release-group'},
+        'media': [
+            {
+                'position': 1,
+                'track-count': 2,
+                'tracks': [
+                    {'id': f't{i}', 'number': str(i), 'position': i, 'recording': {'id': f'rec{i}'}} for i in (1, 2)
+                ],
+            }
+        ],
+        'relations': [],
+    }
+)
+
+
+def test_concurrent_jobs_of_same_release_map_songs_once():
+    provider = FakeProvider()
+    results = []
+
+    async def get_songs():
+        results.append(await provider.get_mapped_provider_songs(RELEASE))
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(get_songs)
+            nursery.start_soon(get_songs)
+
+    trio.run(main)
+
+    assert provider.album_fetches == 1
+    assert results[0] is results[1]
+    assert {mbid: song.id for mbid, song in results[0].items()} == {Mbid('rec1'): 10, Mbid('rec2'): 11}
@@ -0,0 +1,134 @@
+import json
+
+import httpx
+import pytest
+import trio
+import trio.testing
+
+from lyriks.const import CACHE_DIR_ENVVAR
+from lyriks.providers.api import qqm_api
+from lyriks.providers.api.qqm_api import QQMId
+
+ALBUM_MID = 'album'
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv(CACHE_DIR_ENVVAR, str(tmp_path))
+    monkeypatch.setattr(qqm_api, '_uin', None)
+    return tmp_path
+
+
+class AlbumServer:
+    """
+    Stand-in for the QQ Music API, serving the song list of an album in pages of at most max_page_size songs.
+    """
+
+    def __init__(self, song_count: int, total_num: int | None = None, max_page_size: int = 30):
+        self.song_count = song_count
+        self.total_num = song_count if total_num is None else total_num
+        self.max_page_size = max_page_size
+        self.requests: list[list[int]] = []
+        self.invalid_pages: set[int] = set()
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        modules = {key: module for key, module in body.items() if key.startswith('req_')}
+        self.requests.append(sorted(module['param']['begin'] for module in modules.values()))
+        return httpx.Response(200, json={'code': 0} | {key: self.get_page(module) for key, module in modules.items()})
+
+    def get_page(self, module: dict) -> dict:
+        param = module['param']
+        assert param['albumMid'] == ALBUM_MID
+        begin = param['begin']
+        if begin in self.invalid_pages:
+            return {'code': 0, 'data': {}}
+        end = min(begin + min(param['num'], self.max_page_size), self.song_count)
+        songs = [
+            {
+                'songInfo': {
+                    'id': i + 1,
+                    'mid': f'song-{i + 1}',
+                    'index_album': i + 1,
+                    'title': f'Song {i + 1}',
+                    'singer': [{'name': 'Artist'}],
+                }
+            }
+            for i in range(begin, end)
+        ]
+        return {'code': 0, 'data': {'songList': songs, 'totalNum': self.total_num}}
+
+
+def _get_album_songs(server: AlbumServer) -> list[qqm_api.QQMSong]:
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http_client:
+            return await qqm_api.get_album_songs(http_client, QQMId(ALBUM_MID))
+
+    return trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+
+
+def test_uin_is_persisted_across_runs(monkeypatch, cache_dir):
+    uin = qqm_api._get_uin()
+    assert len(uin) == 10 and uin.isdigit()
+    assert (cache_dir / qqm_api.UIN_FILENAME).read_text(encoding='utf-8') == uin
+
+    # A new run loads the ID from the file
+    monkeypatch.setattr(qqm_api, '_uin', None)
+    assert qqm_api._get_uin() == uin
+
+
+def test_invalid_uin_file_is_replaced(cache_dir):
+    (cache_dir / qqm_api.UIN_FILENAME).write_text('invalid', encoding='utf-8')
+
+    uin = qqm_api._get_uin()
+    assert len(uin) == 10 and uin.isdigit()
+    assert (cache_dir / qqm_api.UIN_FILENAME).read_text(encoding='utf-8') == uin
+
+
+def test_album_with_single_page(cache_dir):
+    server = AlbumServer(song_count=12)
+
+    songs = _get_album_songs(server)
+    assert [song.album_index for song in songs] == list(range(1, 13))
+    assert server.requests == [[0]]
+
+
+def test_album_pages_are_fetched_in_one_request(cache_dir):
+    server = AlbumServer(song_count=75)
+
+    songs = _get_album_songs(server)
+    assert [song.album_index for song in songs] == list(range(1, 76))
+    assert [song.mid for song in songs[29:31]] == ['song-30', 'song-31']
+    # The size of the first page determines the offsets of the remaining pages, which are batched together
+    assert server.requests == [[0], [30, 60]]
+
+
+def test_album_with_fewer_songs_than_total_num(cache_dir):
+    server = AlbumServer(song_count=50, total_num=70)
+
+    songs = _get_album_songs(server)
+    assert [song.album_index for song in songs] == list(range(1, 51))
+    assert server.requests == [[0], [30, 60]]
+
+
+def test_album_with_more_songs_than_total_num(cache_dir):
+    server = AlbumServer(song_count=50, total_num=30)
+
+    songs = _get_album_songs(server)
+    assert [song.album_index for song in songs] == list(range(1, 31))
+    assert server.requests == [[0]]
+
+
+def test_album_with_invalid_page_is_incomplete(cache_dir):
+    server = AlbumServer(song_count=75)
+    server.invalid_pages.add(30)
+
+    assert _get_album_songs(server) == []
+
+
+def test_invalid_album(cache_dir):
+    server = AlbumServer(song_count=10)
+    server.invalid_pages.add(0)
+
+    assert _get_album_songs(server) == []
+    assert server.requests == [[0]]
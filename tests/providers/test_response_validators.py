@@ -0,0 +1,40 @@
+import json
+
+import httpx
+import pytest
+
+from lyriks.providers.api import bugs_api, qqm_api
+
+
+def _post(url: str, body, response_json) -> tuple[httpx.Request, httpx.Response]:
+    request = httpx.Request('POST', url, content=json.dumps(body).encode('utf-8'))
+    return request, httpx.Response(200, json=response_json, request=request)
+
+
+@pytest.mark.parametrize(
+    ('response_json', 'expected'),
+    [
+        ({'code': 0, 'req_1': {'code': 0, 'data': {}}, 'req_2': {'code': 0, 'data': {}}}, True),
+        ({'code': 0, 'req_1': {'code': 0, 'data': {}}, 'req_2': {'code': 2001}}, False),
+        ({'code': 500001}, False),
+        ([], False),
+    ],
+)
+def test_qqm_error_responses_are_not_cached(response_json, expected):
+    request, response = _post(qqm_api.QQM_API_URL, {'comm': {}}, response_json)
+    assert qqm_api._is_successful_response(request, response) is expected
+
+
+@pytest.mark.parametrize(
+    ('response_json', 'expected'),
+    [
+        ({'list': [{'album_track': {}}, {'track_detail': {}}]}, True),
+        ({'list': [{'album_track': {}}, {'ret_code': 300, 'ret_msg': 'error'}]}, False),
+        ({'list': [{'album_track': {}}]}, False),
+        ({'ret_code': 401}, False),
+    ],
+)
+def test_bugs_error_responses_are_not_cached(response_json, expected):
+    calls = [{'id': 'album_track', 'args': {}}, {'id': 'track_detail', 'args': {}}]
+    request, response = _post(bugs_api.BUGS_API_URL, calls, response_json)
+    assert bugs_api._is_successful_response(request, response) is expected
@@ -0,0 +1,250 @@
+import struct
+from pathlib import Path
+
+import pytest
+from mutagen.id3 import ID3, TALB, TIT2, TPE2, TRCK, TXXX
+
+from lyriks.tags import TrackTags, read_tags, read_tags_mutagen
+from lyriks.tags.fast_reader import UnsupportedTagFormat, read_tags_fast
+
+RG_MBID = '0b5d4ff0-6bcb-4a5d-a42e-2e1f8bfa4b6e'
+TRACK_MBID = '2c1a0b43-6f1c-4d0e-9b1f-7e6a4a1e4f55'
+ALBUMARTIST_MBID = '89ad4ac3-39f7-470e-963a-56509c546377'
+
+# MPEG-1 Layer III frames at 128 kbit/s and 44.1 kHz, so that mutagen recognizes the file
+MPEG_FRAMES = (b'\xff\xfb\x90\x00' + b'\x00' * 413) * 8
+
+EXPECTED_TAGS = TrackTags(
+    title='노래',
+    album='Album',
+    tracknumber='3/12',
+    albumartist='Artist',
+    rg_mbid=RG_MBID,
+    track_mbid=TRACK_MBID,
+    albumartist_mbid=ALBUMARTIST_MBID,
+)
+
+
+def _syncsafe(value: int) -> bytes:
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def _id3_frame(frame_id: bytes, data: bytes, version: int, flags: int = 0) -> bytes:
+    size = _syncsafe(len(data)) if version == 4 else len(data).to_bytes(4, 'big')
+    return frame_id + size + flags.to_bytes(2, 'big') + data
+
+
+def _id3_text(text: str, encoding: int = 3) -> bytes:
+    codec = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be', 3: 'utf-8'}[encoding]
+    return bytes([encoding]) + text.encode(codec)
+
+
+def _id3_txxx(description: str, value: str, encoding: int = 3) -> bytes:
+    codec, terminator = {0: ('latin-1', b'\x00'), 1: ('utf-16', b'\x00\x00'), 3: ('utf-8', b'\x00')}[encoding]
+    return bytes([encoding]) + description.encode(codec) + terminator + value.encode(codec)
+
+
+def _id3_tag(frames: list[bytes], version: int, padding: int = 16, flags: int = 0) -> bytes:
+    body = b''.join(frames) + b'\x00' * padding
+    return b'ID3' + bytes([version, 0, flags]) + _syncsafe(len(body)) + body
+
+
+def _id3_frames(version: int, encoding: int = 3) -> list[bytes]:
+    return [
+        _id3_frame(b'TIT2', _id3_text('노래', encoding), version),
+        _id3_frame(b'TALB', _id3_text('Album', encoding), version),
+        _id3_frame(b'TRCK', _id3_text('3/12', encoding), version),
+        _id3_frame(b'TPE2', _id3_text('Artist', encoding), version),
+        _id3_frame(b'APIC', b'\x00image/png\x00\x03\x00' + b'\x89PNG' * 8, version),
+        _id3_frame(b'TXXX', _id3_txxx('MusicBrainz Release Group Id', RG_MBID, encoding), version),
+        _id3_frame(b'TXXX', _id3_txxx('MusicBrainz Release Track Id', TRACK_MBID, encoding), version),
+        _id3_frame(b'TXXX', _id3_txxx('MusicBrainz Album Artist Id', ALBUMARTIST_MBID, encoding), version),
+    ]
+
+
+def _vorbis_comment(comments: list[bytes]) -> bytes:
+    vendor = b'reference libFLAC 1.4.3'
+    data = struct.pack('<I', len(vendor)) + vendor + struct.pack('<I', len(comments))
+    return data + b''.join(struct.pack('<I', len(comment)) + comment for comment in comments)
+
+
+def _flac_block(block_type: int, data: bytes, is_last: bool = False) -> bytes:
+    return bytes([block_type | (0x80 if is_last else 0)]) + len(data).to_bytes(3, 'big') + data
+
+
+def _flac_file(comments: list[bytes] | None) -> bytes:
+    # 44.1 kHz, stereo, 16 bit, no samples
+    streaminfo = struct.pack('>HH', 4096, 4096) + b'\x00' * 6 + bytes([0x0A, 0xC4, 0x42, 0xF0]) + b'\x00' * 20
+    blocks = [_flac_block(0, streaminfo, is_last=comments is None)]
+    if comments is not None:
+        blocks.append(_flac_block(1, b'\x00' * 32))  # padding before the comments
+        blocks.append(_flac_block(4, _vorbis_comment(comments), is_last=True))
+    return b'fLaC' + b''.join(blocks)
+
+
+FLAC_COMMENTS = [
+    'TITLE=노래'.encode(),
+    b'album=Album',
+    b'TRACKNUMBER=3/12',
+    b'ALBUMARTIST=Artist',
+    f'MUSICBRAINZ_RELEASEGROUPID={RG_MBID}'.encode(),
+    f'MUSICBRAINZ_RELEASETRACKID={TRACK_MBID}'.encode(),
+    f'MUSICBRAINZ_ALBUMARTISTID={ALBUMARTIST_MBID}'.encode(),
+    b'TITLE=Second title',
+    b'COMMENT',
+]
+
+
+def _mp4_atom(name: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), name) + payload
+
+
+def _mp4_data(payload: bytes, data_type: int = 1) -> bytes:
+    return _mp4_atom(b'data', struct.pack('>II', data_type, 0) + payload)
+
+
+def _mp4_freeform(name: str, value: str) -> bytes:
+    return _mp4_atom(
+        b'----',
+        _mp4_atom(b'mean', b'\x00\x00\x00\x00com.apple.iTunes')
+        + _mp4_atom(b'name', b'\x00\x00\x00\x00' + name.encode())
+        + _mp4_data(value.encode()),
+    )
+
+
+def _mp4_file(items: list[bytes]) -> bytes:
+    ilst = _mp4_atom(b'ilst', b''.join(items))
+    meta = _mp4_atom(b'meta', b'\x00\x00\x00\x00' + _mp4_atom(b'hdlr', b'\x00' * 25) + ilst)
+    moov = _mp4_atom(b'moov', _mp4_atom(b'mvhd', b'\x00' * 100) + _mp4_atom(b'udta', meta))
+    return _mp4_atom(b'ftyp', b'M4A \x00\x00\x00\x00') + _mp4_atom(b'mdat', b'\x00' * 64) + moov
+
+
+MP4_ITEMS = [
+    _mp4_atom(b'\xa9nam', _mp4_data('노래'.encode())),
+    _mp4_atom(b'\xa9alb', _mp4_data(b'Album')),
+    _mp4_atom(b'aART', _mp4_data(b'Artist')),
+    _mp4_atom(b'trkn', _mp4_data(struct.pack('>HHHH', 0, 3, 12, 0), data_type=0)),
+    _mp4_atom(b'covr', _mp4_data(b'\x89PNG' * 8, data_type=14)),
+    _mp4_freeform('MusicBrainz Release Group Id', RG_MBID),
+    _mp4_freeform('MusicBrainz Release Track Id', TRACK_MBID),
+    _mp4_freeform('MusicBrainz Album Artist Id', ALBUMARTIST_MBID),
+]
+
+
+def _write(tmp_path: Path, filename: str, data: bytes) -> str:
+    filepath = tmp_path / filename
+    filepath.write_bytes(data)
+    return str(filepath)
+
+
+@pytest.mark.parametrize('version', [3, 4])
+@pytest.mark.parametrize('encoding', [1, 3])
+def test_id3(tmp_path, version, encoding):
+    filepath = _write(tmp_path, 'track.mp3', _id3_tag(_id3_frames(version, encoding), version) + MPEG_FRAMES)
+
+    assert read_tags_fast(filepath) == EXPECTED_TAGS
+    assert read_tags_mutagen(filepath) == EXPECTED_TAGS
+
+
+@pytest.mark.parametrize('version', [3, 4])
+def test_id3_matches_mutagen(tmp_path, version):
+    filepath = _write(tmp_path, 'track.mp3', MPEG_FRAMES)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text='노래'))
+    tags.add(TALB(encoding=1, text='Album'))
+    tags.add(TRCK(encoding=0, text='3/12'))
+    tags.add(TPE2(encoding=3, text=['Artist', 'Other artist']))
+    tags.add(TXXX(encoding=3, desc='MusicBrainz Release Group Id', text=RG_MBID))
+    tags.add(TXXX(encoding=1, desc='MusicBrainz Release Track Id', text=TRACK_MBID))
+    tags.save(filepath, v2_version=version)
+
+    assert read_tags_fast(filepath) == read_tags_mutagen(filepath)
+
+
+def test_flac(tmp_path):
+    filepath = _write(tmp_path, 'track.flac', _flac_file(FLAC_COMMENTS))
+
+    assert read_tags_fast(filepath) == EXPECTED_TAGS
+    assert read_tags_mutagen(filepath) == EXPECTED_TAGS
+
+
+def test_flac_without_comments(tmp_path):
+    filepath = _write(tmp_path, 'track.flac', _flac_file(None))
+
+    assert read_tags_fast(filepath) is None
+
+
+def test_mp4(tmp_path):
+    filepath = _write(tmp_path, 'track.m4a', _mp4_file(MP4_ITEMS))
+
+    assert read_tags_fast(filepath) == EXPECTED_TAGS
+
+
+def test_mp4_without_ilst(tmp_path):
+    filepath = _write(tmp_path, 'track.m4a', _mp4_atom(b'ftyp', b'M4A \x00\x00\x00\x00') + _mp4_atom(b'moov', b''))
+
+    assert read_tags_fast(filepath) is None
+
+
+def test_unsupported_extension(tmp_path):
+    filepath = _write(tmp_path, 'track.ogg', b'OggS')
+
+    with pytest.raises(UnsupportedTagFormat):
+        read_tags_fast(filepath)
+
+
+MALFORMED_FILES = {
+    'empty mp3': ('track.mp3', b''),
+    'mp3 without ID3v2 header': ('track.mp3', b'\xff\xfb\x90\x00' * 16),
+    'ID3v2.2': ('track.mp3', b'ID3\x02\x00\x00' + _syncsafe(0)),
+    'ID3v2 with unsynchronisation': ('track.mp3', _id3_tag(_id3_frames(4), 4, flags=0x80)),
+    'truncated ID3v2 tag': ('track.mp3', _id3_tag(_id3_frames(4), 4)[:50]),
+    'truncated ID3v2 frame': (
+        'track.mp3',
+        b'ID3\x04\x00\x00' + _syncsafe(20) + b'TIT2' + _syncsafe(1000) + b'\x00\x00' + b'\x03Title\x00',
+    ),
+    'compressed ID3v2 frame': ('track.mp3', _id3_tag([_id3_frame(b'TIT2', _id3_text('Title'), 4, flags=0x0008)], 4)),
+    'unknown ID3v2 text encoding': ('track.mp3', _id3_tag([_id3_frame(b'TIT2', b'\x07Title', 4)], 4)),
+    'invalid UTF-16 text': ('track.mp3', _id3_tag([_id3_frame(b'TIT2', b'\x01\xff\xfeT', 3)], 3)),
+    'flac without signature': ('track.flac', b'ID3\x04\x00\x00' + _syncsafe(0) + _flac_file(FLAC_COMMENTS)),
+    'truncated flac block header': ('track.flac', b'fLaC\x00\x00'),
+    'truncated vorbis comment block': ('track.flac', _flac_file(FLAC_COMMENTS)[:-10]),
+    'vorbis comment length beyond block': (
+        'track.flac',
+        b'fLaC' + _flac_block(4, struct.pack('<III', 0, 1, 0xFFFF) + b'A=b', is_last=True),
+    ),
+    'vorbis comment count beyond block': (
+        'track.flac',
+        b'fLaC' + _flac_block(4, struct.pack('<II', 0, 5) + struct.pack('<I', 3) + b'A=b', is_last=True),
+    ),
+    'mp4 atom size beyond file': ('track.m4a', struct.pack('>I4s', 1000, b'moov') + b'\x00' * 8),
+    'mp4 atom size below header': ('track.m4a', struct.pack('>I4s', 4, b'moov') + b'\x00' * 8),
+    'truncated mp4 data atom': (
+        'track.m4a',
+        _mp4_file([_mp4_atom(b'\xa9nam', struct.pack('>I4s', 12, b'data') + b'\x00\x00\x00\x01')]),
+    ),
+    'short mp4 track number': ('track.m4a', _mp4_file([_mp4_atom(b'trkn', _mp4_data(b'\x00\x03', data_type=0))])),
+}
+
+
+@pytest.mark.parametrize(('filename', 'data'), MALFORMED_FILES.values(), ids=MALFORMED_FILES.keys())
+def test_malformed(tmp_path, filename, data):
+    filepath = _write(tmp_path, filename, data)
+
+    with pytest.raises(UnsupportedTagFormat):
+        read_tags_fast(filepath)
+
+
+def test_read_tags_falls_back_to_mutagen(tmp_path):
+    filepath = _write(tmp_path, 'track.mp3', MPEG_FRAMES)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text='Title'))
+    tags.save(filepath, v2_version=3)
+    # Unsynchronised tags are only supported by mutagen
+    data = bytearray(Path(filepath).read_bytes())
+    data[5] |= 0x80
+    Path(filepath).write_bytes(data)
+
+    with pytest.raises(UnsupportedTagFormat):
+        read_tags_fast(filepath)
+    assert read_tags(filepath) == TrackTags(title='Title')
@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+
+from lyriks import collection_index
+from lyriks.collection_index import (
+    LYRICS_STATUS_NOT_FOUND,
+    LYRICS_STATUS_SYNCED,
+    LYRICS_STATUS_UNKNOWN,
+    LYRICS_STATUS_UNMAPPED,
+    CollectionIndex,
+    IndexEntry,
+)
+from lyriks.tags import TrackTags
+
+TAGS = TrackTags(title='Title', album='Album', tracknumber='1', rg_mbid='release-group', track_mbid='track')
+PROVIDERS = 'genie.co.kr'
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def track(tmp_path) -> str:
+    path = tmp_path / 'track.flac'
+    path.write_bytes(b'audio')
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path):
+    with CollectionIndex(tmp_path / 'index.sqlite3') as index:
+        yield index
+
+
+def test_lookup_returns_stored_tags_of_unchanged_file(index, track):
+    assert index.lookup(track, os.stat(track)) is None
+
+    index.update_tags(track, os.stat(track), TAGS)
+
+    assert index.lookup(track, os.stat(track)) == IndexEntry(TAGS, LYRICS_STATUS_UNKNOWN)
+
+
+def test_lookup_ignores_changed_file(index, track):
+    index.update_tags(track, os.stat(track), TAGS)
+
+    with open(track, 'ab') as file:
+        file.write(b' changed')
+
+    assert index.lookup(track, os.stat(track)) is None
+
+
+def test_file_without_tags_is_indexed(index, track):
+    index.update_tags(track, os.stat(track), None)
+
+    assert index.lookup(track, os.stat(track)) == IndexEntry(None)
+
+
+def test_lyrics_status_is_stored_and_reset_by_new_tags(index, track):
+    index.update_tags(track, os.stat(track), TAGS)
+    index.set_lyrics_status(track, LYRICS_STATUS_SYNCED, PROVIDERS)
+
+    entry = index.lookup(track, os.stat(track))
+    assert (entry.lyrics_status, entry.lyrics_providers) == (LYRICS_STATUS_SYNCED, PROVIDERS)
+    assert time.time() - entry.lyrics_checked < 60
+
+    index.update_tags(track, os.stat(track), TAGS)
+    assert index.lookup(track, os.stat(track)) == IndexEntry(TAGS, LYRICS_STATUS_UNKNOWN)
+
+
+def test_index_persists_across_connections(tmp_path, track):
+    with CollectionIndex(tmp_path / 'index.sqlite3') as index:
+        index.update_tags(track, os.stat(track), TAGS)
+
+    with CollectionIndex(tmp_path / 'index.sqlite3') as index:
+        assert index.lookup(track, os.stat(track)) is not None
+
+    with CollectionIndex(tmp_path / 'index.sqlite3', rebuild=True) as index:
+        assert index.lookup(track, os.stat(track)) is None
+
+
+def test_outdated_schema_is_dropped(tmp_path, track, monkeypatch):
+    with CollectionIndex(tmp_path / 'index.sqlite3') as index:
+        index.update_tags(track, os.stat(track), TAGS)
+
+    monkeypatch.setattr(collection_index, 'SCHEMA_VERSION', collection_index.SCHEMA_VERSION + 1)
+    with CollectionIndex(tmp_path / 'index.sqlite3') as index:
+        assert index.lookup(track, os.stat(track)) is None
+
+
+@pytest.mark.parametrize(
+    ('lyrics_status', 'providers', 'age', 'settled'),
+    [
+        (LYRICS_STATUS_NOT_FOUND, PROVIDERS, 60, True),
+        (LYRICS_STATUS_NOT_FOUND, PROVIDERS, 2 * DAY, False),
+        (LYRICS_STATUS_NOT_FOUND, f'{PROVIDERS},bugs.co.kr', 60, False),
+        (LYRICS_STATUS_UNMAPPED, PROVIDERS, 60, False),
+        (LYRICS_STATUS_UNKNOWN, None, None, False),
+    ],
+)
+def test_has_settled_lyrics(lyrics_status, providers, age, settled):
+    checked = time.time() - age if age is not None else None
+    entry = IndexEntry(TAGS, lyrics_status, providers, checked)
+
+    assert entry.has_settled_lyrics(PROVIDERS, DAY) is settled
@@ -0,0 +1,95 @@
+import itertools
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from lyriks import disk_cache
+from lyriks.disk_cache import DiskCache
+
+NAMESPACE = 'test'
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / 'cache.db'
+
+
+def _accessed_at(db_path, key: str) -> float:
+    connection = sqlite3.connect(db_path)
+    try:
+        (accessed_at,) = connection.execute(
+            'SELECT accessed_at FROM entries WHERE namespace = ? AND key = ?', (NAMESPACE, key)
+        ).fetchone()
+        return accessed_at
+    finally:
+        connection.close()
+
+
+def test_get_and_max_age(db_path):
+    with DiskCache(db_path) as cache:
+        cache.set(NAMESPACE, 'key', b'value')
+        assert cache.get(NAMESPACE, 'key') == b'value'
+        assert cache.get(NAMESPACE, 'key', max_age=60) == b'value'
+        assert cache.get(NAMESPACE, 'key', max_age=-1) is None
+        assert cache.get(NAMESPACE, 'missing') is None
+        assert cache.get('other', 'key') is None
+
+
+def test_get_doesnt_write_access_time(db_path):
+    with DiskCache(db_path) as cache:
+        cache.set(NAMESPACE, 'key', b'value')
+        stored_at = _accessed_at(db_path, 'key')
+
+        assert cache.get(NAMESPACE, 'key') == b'value'
+        assert _accessed_at(db_path, 'key') == stored_at
+        accessed_at = cache.pending_accesses[(NAMESPACE, 'key')]
+
+    # The access time is written when the cache is closed
+    assert _accessed_at(db_path, 'key') == accessed_at
+
+
+def test_access_times_are_flushed_in_batches(monkeypatch, db_path):
+    monkeypatch.setattr(disk_cache, 'ACCESS_FLUSH_SIZE', 2)
+    with DiskCache(db_path) as cache:
+        cache.set(NAMESPACE, 'a', b'value')
+        cache.set(NAMESPACE, 'b', b'value')
+
+        cache.get(NAMESPACE, 'a')
+        accessed_at = cache.pending_accesses[(NAMESPACE, 'a')]
+        cache.get(NAMESPACE, 'b')
+        assert not cache.pending_accesses
+        assert _accessed_at(db_path, 'a') == accessed_at
+
+
+def test_set_discards_pending_access(db_path):
+    with DiskCache(db_path) as cache:
+        cache.set(NAMESPACE, 'key', b'value')
+        cache.get(NAMESPACE, 'key')
+        cache.set(NAMESPACE, 'key', b'new value')
+        assert not cache.pending_accesses
+        assert cache.get(NAMESPACE, 'key') == b'new value'
+
+
+def test_eviction_uses_pending_access_times(monkeypatch, db_path):
+    clock = itertools.count()
+    monkeypatch.setattr(disk_cache, 'time', SimpleNamespace(time=lambda: float(next(clock))))
+    with DiskCache(db_path, max_size=30) as cache:
+        cache.set(NAMESPACE, 'old', b'x' * 10)
+        cache.set(NAMESPACE, 'new', b'x' * 10)
+        # Only known to the pending accesses, 'old' is now the most recently used entry
+        cache.get(NAMESPACE, 'old')
+
+        cache.set(NAMESPACE, 'third', b'x' * 15)
+        assert cache.get(NAMESPACE, 'old') is not None
+        assert cache.get(NAMESPACE, 'new') is None
+        assert cache.total_size == 25
+
+
+def test_json_roundtrip(db_path):
+    with DiskCache(db_path) as cache:
+        cache.set_json(NAMESPACE, 'key', {'a': [1, 2]})
+        assert cache.get_json(NAMESPACE, 'key') == {'a': [1, 2]}
+
+        cache.set(NAMESPACE, 'invalid', b'not compressed')
+        assert cache.get_json(NAMESPACE, 'invalid') is None
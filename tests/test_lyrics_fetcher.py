@@ -0,0 +1,105 @@
+import time
+
+import pytest
+import trio
+
+from lyriks.collection_index import (
+    LYRICS_STATUS_ERROR,
+    LYRICS_STATUS_NOT_FOUND,
+    LYRICS_STATUS_UNMAPPED,
+    IndexEntry,
+)
+from lyriks.lyrics_fetcher import LyricsFetcher, TrackJob
+from lyriks.mb_client import Mbid, Medium, Release
+from lyriks.scanner import TrackFile
+from lyriks.tags import TrackTags
+
+RELEASE = Release(
+    id=Mbid('release'),
+    title='Album',
+    rg_mbid=Mbid('release-group'),
+    media=(Medium(position=1, track_count=2, tracks=()),),
+    urls=(),
+)
+
+
+class FailingProvider:
+    async def get_mapped_provider_songs(self, release: Release):
+        raise RuntimeError('provider unavailable')
+
+
+class UnmappedProvider:
+    async def get_mapped_provider_songs(self, release: Release):
+        return None
+
+
+def provider_factory(http_client):
+    raise NotImplementedError
+
+
+provider_factory.api_domains = ('example.com',)
+
+
+def _jobs() -> list[tuple[TrackJob, Mbid]]:
+    jobs = []
+    for i in range(2):
+        track = TrackFile('/music', f'{i}.flac', False, False, False)
+        job = TrackJob(track, TrackTags(), f'Title {i}', 'Album', Mbid(f'track-{i}'))
+        jobs.append((job, Mbid(f'recording-{i}')))
+    return jobs
+
+
+def _fetch_release_lyrics(provider) -> tuple[list, list[tuple[str, str]]]:
+    fetcher = LyricsFetcher(provider_factory)
+    fetcher.provider = provider
+    statuses: list[tuple[str, str]] = []
+    fetcher.set_lyrics_status = lambda filepath, status: statuses.append((filepath, status))
+    emitted: list = []
+
+    async def emit(item):
+        emitted.append(item)
+
+    trio.run(fetcher.fetch_release_lyrics, (RELEASE, _jobs()), emit)
+    return emitted, statuses
+
+
+def test_release_error_is_reported_for_each_track():
+    emitted, statuses = _fetch_release_lyrics(FailingProvider())
+
+    assert emitted == []
+    assert statuses == [('/music/0.flac', LYRICS_STATUS_ERROR), ('/music/1.flac', LYRICS_STATUS_ERROR)]
+
+
+def test_unmapped_release_is_not_settled_as_missing_lyrics():
+    emitted, statuses = _fetch_release_lyrics(UnmappedProvider())
+
+    assert emitted == []
+    assert statuses == [('/music/0.flac', LYRICS_STATUS_UNMAPPED), ('/music/1.flac', LYRICS_STATUS_UNMAPPED)]
+
+
+TAGS = TrackTags(title='Title', album='Album', tracknumber='1', rg_mbid='release-group', track_mbid='track')
+
+
+def _read_track(lyrics_status: str, **options) -> TrackJob | None:
+    fetcher = LyricsFetcher(provider_factory, **options)
+    entry = IndexEntry(TAGS, lyrics_status, fetcher.providers_key, time.time())
+
+    async def get_index_entry(filepath: str) -> IndexEntry:
+        return entry
+
+    fetcher.get_index_entry = get_index_entry
+    return trio.run(fetcher.read_track, TrackFile('/music', '0.flac', False, False, False))
+
+
+@pytest.mark.parametrize(
+    ('lyrics_status', 'options', 'skipped'),
+    [
+        (LYRICS_STATUS_NOT_FOUND, {}, True),
+        (LYRICS_STATUS_NOT_FOUND, {'force': True}, False),
+        (LYRICS_STATUS_NOT_FOUND, {'report': True}, False),
+        (LYRICS_STATUS_UNMAPPED, {}, False),
+        (LYRICS_STATUS_ERROR, {}, False),
+    ],
+)
+def test_tracks_with_settled_lyrics_are_skipped(lyrics_status, options, skipped):
+    assert (_read_track(lyrics_status, **options) is None) is skipped
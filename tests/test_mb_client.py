@@ -0,0 +1,202 @@
+import httpx
+import pytest
+import trio
+import trio.testing
+
+from lyriks import mb_client
+from lyriks.disk_cache import DiskCache
+from lyriks.mb_client import Mbid, MusicBrainzError
+
+SERVER_URL = 'https://musicbrainz.example.com'
+
+
+def _release_json(release_id: str, track_ids: list[str]) -> dict:
+    return {
+        'id': release_id,
+        'title': f'Release {release_id}',
+        'release-group': {'id': 'release-group'},
+        'media': [
+            {
+                'position': 1,
+                'track-count': len(track_ids),
+                'tracks': [
+                    {'id': track_id, 'number': str(i + 1), 'position': i + 1, 'recording': {'id': f'rec-{track_id}'}}
+                    for i, track_id in enumerate(track_ids)
+                ],
+            }
+        ],
+        'relations': [],
+    }
+
+
+@pytest.fixture(autouse=True)
+def musicbrainz():
+    mb_client.set_server_url(SERVER_URL)
+    mb_client.set_rate_limit(0)
+    yield
+    for cache in (
+        mb_client.artist_cache,
+        mb_client.release_cache,
+        mb_client.release_group_cache,
+        mb_client.partial_release_groups,
+        mb_client.track_release_cache,
+    ):
+        cache.clear()
+    mb_client.set_server_url(mb_client.DEFAULT_MUSICBRAINZ_SERVER_URL)
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_concurrent_lookups_of_tracks_on_same_release_share_one_request():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={'releases': [_release_json('r1', ['t1', 't2'])], 'release-count': 1})
+
+    results = {}
+
+    async def main():
+        async with _client(handler) as client:
+
+            async def lookup(track_mbid: str):
+                results[track_mbid] = await mb_client.get_release_by_track(client, Mbid(track_mbid))
+
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(lookup, 't1')
+                nursery.start_soon(lookup, 't2')
+
+    trio.run(main)
+
+    assert len(requests) == 1
+    assert results['t1'] is results['t2']
+    assert results['t1'].id == 'r1'
+
+
+def test_recording_index_matches_last_track_of_repeated_recording():
+    data = _release_json('r1', ['t1', 't2', 't3'])
+    data['media'][0]['tracks'][2]['recording']['id'] = 'rec-t1'
+    release = mb_client.Release.from_json(data)
+
+    assert release.recording_index[Mbid('rec-t1')].id == 't3'
+    assert release.recording_index[Mbid('rec-t2')].id == 't2'
+    assert release.get_track(Mbid('t1')).recording_id == 'rec-t1'
+
+
+def test_release_group_is_only_cached_once_all_pages_arrived(tmp_path):
+    releases = [_release_json(f'r{i}', [f't{i}']) for i in range(150)]
+    fail = True
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        offset = int(request.url.params['offset'])
+        requests.append(offset)
+        if offset > 0 and fail:
+            return httpx.Response(503, json={'error': 'Service unavailable'})
+        page = releases[offset : offset + mb_client._BROWSE_LIMIT]
+        return httpx.Response(200, json={'releases': page, 'release-count': len(releases)})
+
+    async def get_release_group():
+        async with _client(handler) as client:
+            return await mb_client.get_releases_by_release_group(client, Mbid('release-group'))
+
+    with DiskCache(tmp_path / 'cache.sqlite3') as cache:
+        mb_client.set_cache(cache)
+        try:
+            with pytest.raises(MusicBrainzError):
+                trio.run(get_release_group)
+            assert Mbid('release-group') not in mb_client.release_group_cache
+            assert mb_client._load_persisted_release_group(Mbid('release-group')) is None
+
+            fail = False
+            result = trio.run(get_release_group)
+            assert [release.id for release in result] == [release['id'] for release in releases]
+            # The first page isn't fetched again
+            assert requests == [0, 100, 100]
+
+            mb_client.release_group_cache.clear()
+            persisted = mb_client._load_persisted_release_group(Mbid('release-group'))
+            assert persisted is not None and len(persisted) == 150
+        finally:
+            mb_client.set_cache(None)
+
+
+def _request_times(limiter: mb_client.RequestRateLimiter, count: int, duration: float = 0) -> list[float]:
+    times = []
+
+    async def request():
+        async with limiter:
+            times.append(trio.current_time())
+            await trio.sleep(duration)
+
+    async def main():
+        start = trio.current_time()
+        async with trio.open_nursery() as nursery:
+            for _ in range(count):
+                nursery.start_soon(request)
+        return [time - start for time in sorted(times)]
+
+    return trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+
+
+def test_rate_limiter_spaces_requests_by_delay():
+    assert _request_times(mb_client.RequestRateLimiter(delay=1), 3) == [0, 1, 2]
+
+
+def test_rate_limiter_allows_burst_after_idle_period():
+    limiter = mb_client.RequestRateLimiter(delay=1, burst=3, max_in_flight=3)
+    assert _request_times(limiter, 5) == [0, 0, 0, 1, 2]
+
+
+def test_rate_limiter_limits_requests_in_flight():
+    limiter = mb_client.RequestRateLimiter(delay=0, max_in_flight=2)
+    assert _request_times(limiter, 4, duration=5) == [0, 0, 5, 5]
+
+
+def test_persisted_releases_are_fetched_again_when_refreshing(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=_release_json('r1', ['t1']))
+
+    async def get_release():
+        async with _client(handler) as client:
+            return await mb_client.get_release(client, Mbid('r1'))
+
+    with DiskCache(tmp_path / 'cache.sqlite3') as cache:
+        try:
+            mb_client.set_cache(cache)
+            trio.run(get_release)
+            mb_client.release_cache.clear()
+            trio.run(get_release)
+            assert len(requests) == 1
+
+            mb_client.set_cache(cache, refresh=True)
+            mb_client.release_cache.clear()
+            assert trio.run(get_release).id == 'r1'
+            assert len(requests) == 2
+        finally:
+            mb_client.set_cache(None)
+
+
+@pytest.mark.parametrize(
+    ('status', 'cached'),
+    [(404, True), (503, False), (500, False)],
+)
+def test_only_unknown_releases_are_cached_as_missing(status, cached):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status, json={'error': 'Error'})
+
+    async def get_release():
+        async with _client(handler) as client:
+            return await mb_client.get_release(client, Mbid('r1'))
+
+    if cached:
+        assert trio.run(get_release) is None
+    else:
+        with pytest.raises(MusicBrainzError):
+            trio.run(get_release)
+    assert (Mbid('r1') in mb_client.release_cache) is cached
@@ -0,0 +1,153 @@
+import io
+import json
+import tarfile
+
+import pytest
+
+from lyriks import mb_dump
+from lyriks.mb_dump import InvalidDumpError, MusicBrainzDump
+
+URL_RELATION = {
+    'type': 'discography entry',
+    'target-type': 'url',
+    'ended': False,
+    'url': {'id': 'url-1', 'resource': 'https://www.genie.co.kr/detail/albumInfo?axnm=1'},
+}
+ARTIST_RELATION = {'type': 'member of band', 'target-type': 'artist', 'artist': {'id': 'artist-2'}}
+
+
+def _release(release_id: str, rg_id: str, status: str | None, track_ids: list[str]) -> dict:
+    return {
+        'id': release_id,
+        'title': f'Release {release_id}',
+        'status': status,
+        'barcode': '0123456789',
+        'release-group': {'id': rg_id, 'title': 'Release group'},
+        'media': [
+            {
+                'position': 1,
+                'format': 'CD',
+                'track-count': len(track_ids),
+                'tracks': [
+                    {
+                        'id': track_id,
+                        'number': str(i + 1),
+                        'position': i + 1,
+                        'title': f'Track {i + 1}',
+                        'recording': {'id': f'recording-{track_id}', 'title': f'Track {i + 1}'},
+                    }
+                    for i, track_id in enumerate(track_ids)
+                ],
+            }
+        ],
+        'relations': [URL_RELATION],
+    }
+
+
+ARTIST = {'id': 'artist-1', 'name': 'Artist', 'sort-name': 'Artist', 'relations': [URL_RELATION, ARTIST_RELATION]}
+RELEASES = [
+    _release('release-b', 'group-1', 'Official', ['track-1', 'track-2']),
+    _release('release-a', 'group-1', 'Official', ['track-3']),
+    _release('release-bootleg', 'group-1', 'Bootleg', ['track-4']),
+]
+
+
+def _add_member(archive: tarfile.TarFile, name: str, content: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    archive.addfile(info, io.BytesIO(content))
+
+
+def _write_dump(path, member: str, entities: list[dict]):
+    with tarfile.open(path, 'w:xz') as archive:
+        _add_member(archive, 'TIMESTAMP', b'2024-01-01 00:00:00.000000+00')
+        _add_member(archive, member, b''.join(json.dumps(entity).encode('utf-8') + b'\n' for entity in entities))
+
+
+@pytest.fixture
+def dump_path(tmp_path):
+    artist_archive = tmp_path / 'artist.tar.xz'
+    release_archive = tmp_path / 'release.tar.xz'
+    _write_dump(artist_archive, 'mbdump/artist', [ARTIST])
+    _write_dump(release_archive, 'mbdump/release', RELEASES)
+
+    db_path = tmp_path / 'mbdump.sqlite3'
+    with MusicBrainzDump(db_path, read_only=False) as dump:
+        assert dump.import_archive(artist_archive) == 1
+        assert dump.import_archive(release_archive) == len(RELEASES)
+    return db_path
+
+
+@pytest.fixture
+def dump(dump_path):
+    with MusicBrainzDump(dump_path) as dump:
+        yield dump
+
+
+def test_artist_is_slimmed_to_url_relations(dump):
+    assert dump.get_artist('artist-1') == {
+        'id': 'artist-1',
+        'name': 'Artist',
+        'relations': [{'target-type': 'url', 'ended': False, 'url': {'resource': URL_RELATION['url']['resource']}}],
+    }
+    assert dump.get_artist('missing') is None
+
+
+def test_release_keeps_fields_used_by_release(dump):
+    release = dump.get_release('release-b')
+    assert release['title'] == 'Release release-b'
+    assert release['status'] == 'Official'
+    assert release['release-group'] == {'id': 'group-1'}
+    assert 'barcode' not in release
+    assert release['media'] == [
+        {
+            'position': 1,
+            'track-count': 2,
+            'tracks': [
+                {'id': 'track-1', 'number': '1', 'position': 1, 'recording': {'id': 'recording-track-1'}},
+                {'id': 'track-2', 'number': '2', 'position': 2, 'recording': {'id': 'recording-track-2'}},
+            ],
+        }
+    ]
+    assert release['relations'] == [
+        {'target-type': 'url', 'ended': False, 'url': {'resource': URL_RELATION['url']['resource']}}
+    ]
+
+
+@pytest.mark.parametrize(
+    ('track_id', 'release_id'),
+    [('track-1', 'release-b'), ('track-2', 'release-b'), ('track-3', 'release-a'), ('track-4', None), ('other', None)],
+)
+def test_release_by_track(dump, track_id, release_id):
+    release = dump.get_release_by_track(track_id)
+    assert (release['id'] if release else None) == release_id
+
+
+def test_official_releases_by_release_group(dump):
+    releases = dump.get_releases_by_release_group('group-1')
+    assert [release['id'] for release in releases] == ['release-a', 'release-b']
+    assert dump.get_releases_by_release_group('other') == []
+
+
+def test_import_in_batches_with_progress(monkeypatch, tmp_path):
+    monkeypatch.setattr(mb_dump, 'IMPORT_BATCH_SIZE', 2)
+    archive_path = tmp_path / 'release.tar.gz'
+    with tarfile.open(archive_path, 'w:gz') as archive:
+        _add_member(archive, 'mbdump/release', b''.join(json.dumps(release).encode() + b'\n' for release in RELEASES))
+
+    progress: list[int] = []
+    with MusicBrainzDump(tmp_path / 'mbdump.sqlite3', read_only=False) as dump:
+        assert dump.import_archive(archive_path, progress.append) == 3
+        # Importing again replaces the existing releases
+        assert dump.import_archive(archive_path) == 3
+        assert dump.get_release_by_track('track-3')['id'] == 'release-a'
+    assert progress == [2, 3]
+
+
+def test_invalid_store(tmp_path):
+    db_path = tmp_path / 'other.sqlite3'
+    db_path.write_bytes(b'')
+    with pytest.raises(InvalidDumpError):
+        MusicBrainzDump(db_path)
+    with pytest.raises(InvalidDumpError):
+        MusicBrainzDump(tmp_path / 'missing.sqlite3')
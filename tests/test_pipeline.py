@@ -0,0 +1,71 @@
+import trio
+import trio.testing
+
+from lyriks.pipeline import Pipeline
+
+
+def test_items_pass_through_all_stages():
+    results = []
+
+    async def source(emit):
+        for item in range(10):
+            await emit(item)
+
+    async def double(item, emit):
+        await emit(item * 2)
+
+    async def collect(item, emit):
+        results.append(item)
+
+    pipeline = Pipeline(buffer_size=2)
+    pipeline.add_stage('double', 3, double)
+    pipeline.add_stage('collect', 1, collect)
+    trio.run(pipeline.run, source)
+
+    assert sorted(results) == [item * 2 for item in range(10)]
+    assert [stage.processed for stage in pipeline.stages] == [10, 10]
+
+
+def test_stage_can_emit_any_number_of_results():
+    results = []
+
+    async def source(emit):
+        await emit([1, 2, 3])
+        await emit([])
+
+    async def split(items, emit):
+        for item in items:
+            await emit(item)
+
+    async def collect(item, emit):
+        results.append(item)
+
+    pipeline = Pipeline()
+    pipeline.add_stage('split', 1, split)
+    pipeline.add_stage('collect', 1, collect)
+    trio.run(pipeline.run, source)
+
+    assert results == [1, 2, 3]
+
+
+def test_busy_time_excludes_time_blocked_on_next_stage():
+    async def source(emit):
+        for item in range(2):
+            await emit(item)
+
+    async def work(item, emit):
+        await trio.sleep(1)
+        await emit(item)
+
+    async def slow_consumer(item, emit):
+        await trio.sleep(10)
+
+    pipeline = Pipeline(buffer_size=0)
+    producer = pipeline.add_stage('work', 1, work)
+    consumer = pipeline.add_stage('consume', 1, slow_consumer)
+    trio.run(pipeline.run, source, clock=trio.testing.MockClock(autojump_threshold=0))
+
+    assert producer.busy_time == 2
+    assert consumer.busy_time == 20
+    assert pipeline.elapsed == 21
+    assert producer.utilization(pipeline.elapsed) == 2 / 21
@@ -0,0 +1,66 @@
+import os
+
+from lyriks.scanner import TrackFile, scan_collection
+
+
+def _create(root, *paths: str):
+    for relative_path in paths:
+        file = root / relative_path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.touch()
+
+
+def _scan(root) -> list[list[TrackFile]]:
+    return [sorted(tracks, key=lambda track: track.filename) for tracks in scan_collection(root)]
+
+
+def test_tracks_are_grouped_per_directory(tmp_path):
+    _create(tmp_path, 'A/1.flac', 'A/2.MP3', 'A/CD2/1.m4a', 'B/1.flac')
+
+    groups = _scan(tmp_path)
+
+    assert sorted([os.path.relpath(track.path, tmp_path) for track in tracks] for tracks in groups) == [
+        ['A/1.flac', 'A/2.MP3'],
+        ['A/CD2/1.m4a'],
+        ['B/1.flac'],
+    ]
+    assert all(len({track.dirname for track in tracks}) == 1 for tracks in groups)
+
+
+def test_non_audio_files_and_empty_directories_are_ignored(tmp_path):
+    _create(tmp_path, 'A/1.flac', 'A/cover.jpg', 'A/1.lrc', 'B/notes.txt')
+    (tmp_path / 'C').mkdir()
+
+    assert [[track.filename for track in tracks] for tracks in _scan(tmp_path)] == [['1.flac']]
+
+
+def test_sidecar_files_are_detected(tmp_path):
+    _create(tmp_path, '1.flac', '1.lrc', '2.flac', '2.txt', '3.flac', '3.nolyrics', '4.flac')
+
+    (tracks,) = _scan(tmp_path)
+
+    assert [(track.has_synced_lyrics, track.has_static_lyrics, track.excluded) for track in tracks] == [
+        (True, False, False),
+        (False, True, False),
+        (False, False, True),
+        (False, False, False),
+    ]
+    assert tracks[0].synced_lyrics_path == str(tmp_path / '1.lrc')
+    assert tracks[1].static_lyrics_path == str(tmp_path / '2.txt')
+
+
+def test_nolyrics_directory_is_skipped_with_subdirectories(tmp_path):
+    _create(tmp_path, 'A/1.flac', 'A/.nolyrics', 'A/CD2/1.flac', 'B/1.flac')
+
+    assert [[track.path for track in tracks] for tracks in _scan(tmp_path)] == [[str(tmp_path / 'B' / '1.flac')]]
+
+
+def test_symlinked_directories_are_not_followed(tmp_path):
+    _create(tmp_path, 'A/1.flac')
+    (tmp_path / 'link').symlink_to(tmp_path / 'A', target_is_directory=True)
+
+    assert len(_scan(tmp_path)) == 1
+
+
+def test_missing_collection_yields_nothing(tmp_path):
+    assert _scan(tmp_path / 'missing') == []
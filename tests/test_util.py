@@ -0,0 +1,219 @@
+import trio
+import trio.testing
+
+from lyriks.util import Batcher, SingleFlight
+
+
+def _run(main):
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+
+
+def test_batcher_processes_concurrent_items_together():
+    batches = []
+
+    async def process(items: list[int]) -> list[int]:
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    batcher = Batcher(process, window=1, max_size=10)
+    results = {}
+
+    async def submit(item: int):
+        results[item] = await batcher.submit(item)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for item in range(3):
+                nursery.start_soon(submit, item)
+
+    _run(main)
+
+    assert [sorted(items) for items in batches] == [[0, 1, 2]]
+    assert results == {0: 0, 1: 2, 2: 4}
+
+
+def test_batcher_closes_full_batch_before_window():
+    batches = []
+
+    async def process(items: list[int]) -> list[int]:
+        batches.append((trio.current_time(), items))
+        return items
+
+    batcher = Batcher(process, window=1, max_size=2)
+
+    async def main():
+        start = trio.current_time()
+        async with trio.open_nursery() as nursery:
+            for item in range(3):
+                nursery.start_soon(batcher.submit, item)
+        assert [(time - start, len(items)) for time, items in batches] == [(0, 2), (1, 1)]
+
+    _run(main)
+
+
+def test_batcher_passes_errors_to_all_callers():
+    async def process(items: list[int]) -> list[int]:
+        raise RuntimeError('failed')
+
+    batcher = Batcher(process, window=1, max_size=10)
+    errors = []
+
+    async def submit(item: int):
+        try:
+            await batcher.submit(item)
+        except RuntimeError as e:
+            errors.append(e)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for item in range(3):
+                nursery.start_soon(submit, item)
+
+    _run(main)
+
+    assert len(errors) == 3
+
+
+def test_batcher_rejects_missing_results():
+    async def process(items: list[int]) -> list[int]:
+        return items[:1]
+
+    batcher = Batcher(process, window=1, max_size=2)
+    errors = []
+
+    async def submit(item: int):
+        try:
+            await batcher.submit(item)
+        except ValueError as e:
+            errors.append(e)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(submit, 0)
+            nursery.start_soon(submit, 1)
+
+    _run(main)
+
+    assert len(errors) == 2
+
+
+def test_batcher_resubmits_items_if_leader_is_cancelled():
+    clock = trio.testing.MockClock()
+    batches = []
+
+    async def process(items: list[int]) -> list[int]:
+        batches.append(items)
+        return items
+
+    batcher = Batcher(process, window=1, max_size=10)
+    leader_scope = trio.CancelScope()
+    results = []
+
+    async def leader():
+        with leader_scope:
+            await batcher.submit(0)
+
+    async def follower():
+        results.append(await batcher.submit(1))
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(leader)
+            await trio.testing.wait_all_tasks_blocked()
+            nursery.start_soon(follower)
+            await trio.testing.wait_all_tasks_blocked()
+            leader_scope.cancel()
+            await trio.testing.wait_all_tasks_blocked()
+            clock.jump(1)
+
+    trio.run(main, clock=clock)
+
+    assert batches == [[1]]
+    assert results == [1]
+
+
+def test_single_flight_shares_result_of_concurrent_calls():
+    single_flight = SingleFlight()
+    calls = []
+    results = []
+
+    async def fetch(key: str) -> str:
+        calls.append(key)
+        await trio.sleep(1)
+        return key.upper()
+
+    async def run(key: str):
+        results.append(await single_flight.run(key, fetch, key))
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for key in ('a', 'a', 'b'):
+                nursery.start_soon(run, key)
+
+    _run(main)
+
+    assert sorted(calls) == ['a', 'b']
+    assert sorted(results) == ['A', 'A', 'B']
+    assert single_flight.calls == {}
+
+
+def test_single_flight_passes_errors_to_waiting_callers():
+    single_flight = SingleFlight()
+    calls = []
+    errors = []
+
+    async def fetch():
+        calls.append(None)
+        await trio.sleep(1)
+        raise RuntimeError('failed')
+
+    async def run():
+        try:
+            await single_flight.run('key', fetch)
+        except RuntimeError as e:
+            errors.append(e)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(run)
+            nursery.start_soon(run)
+
+    _run(main)
+
+    assert len(calls) == 1
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_single_flight_runs_function_again_if_running_call_is_cancelled():
+    clock = trio.testing.MockClock()
+    single_flight = SingleFlight()
+    first_scope = trio.CancelScope()
+    calls = []
+    results = []
+
+    async def fetch(caller: str) -> str:
+        calls.append(caller)
+        await trio.sleep(1)
+        return caller
+
+    async def first():
+        with first_scope:
+            await single_flight.run('key', fetch, 'first')
+
+    async def second():
+        results.append(await single_flight.run('key', fetch, 'second'))
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(first)
+            await trio.testing.wait_all_tasks_blocked()
+            nursery.start_soon(second)
+            await trio.testing.wait_all_tasks_blocked()
+            first_scope.cancel()
+            await trio.testing.wait_all_tasks_blocked()
+            clock.jump(1)
+
+    trio.run(main, clock=clock)
+
+    assert calls == ['first', 'second']
+    assert results == ['second']